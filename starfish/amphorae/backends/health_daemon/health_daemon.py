@@ -0,0 +1,129 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import csv
+import os
+import queue
+import socket
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from starfish.amphorae.backends.health_daemon import health_sender
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+SEQ = 0
+_STATS_SOCKET_SUFFIX = '.sock'
+_STATS_SOCKET_TIMEOUT = 5
+
+
+def list_sock_stat_files(hadir=None):
+    """Returns the haproxy stats sockets, by load balancer id."""
+    hadir = hadir or CONF.haproxy_amphora.base_path
+    try:
+        names = os.listdir(hadir)
+    except FileNotFoundError:
+        return {}
+    return {name[:-len(_STATS_SOCKET_SUFFIX)]: os.path.join(hadir, name)
+            for name in names if name.endswith(_STATS_SOCKET_SUFFIX)}
+
+
+def show_stat(stat_sock_file):
+    """Returns the rows of haproxy's 'show stat' as dicts."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(_STATS_SOCKET_TIMEOUT)
+    try:
+        sock.connect(stat_sock_file)
+        sock.sendall(b'show stat\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    lines = b''.join(chunks).decode('utf-8').splitlines()
+    if not lines or not lines[0].startswith('# '):
+        return []
+    # The header line is '# pxname,svname,...'.
+    lines[0] = lines[0][2:]
+    return list(csv.DictReader(line for line in lines if line))
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_stats_message():
+    """Returns the heartbeat of the amphora.
+
+    The frontends of haproxy are named after the listeners, their status
+    and counters make up the listener status and stats.
+    """
+    global SEQ
+    msg = {'id': CONF.amphora_agent.amphora_id, 'seq': SEQ,
+           'listeners': {}, 'ver': 1}
+    SEQ += 1
+    for lb_id, stat_sock_file in list_sock_stat_files().items():
+        try:
+            rows = show_stat(stat_sock_file)
+        except OSError as e:
+            LOG.warning('Unable to query the stats of load balancer %s: '
+                        '%s', lb_id, e)
+            continue
+        for row in rows:
+            if row.get('svname') != 'FRONTEND':
+                continue
+            msg['listeners'][row['pxname']] = {
+                'status': row.get('status'),
+                'stats': {'rx': _int(row.get('bin')),
+                          'tx': _int(row.get('bout')),
+                          'conns': _int(row.get('scur')),
+                          'totconns': _int(row.get('stot')),
+                          'ereq': _int(row.get('ereq'))}}
+    return msg
+
+
+def run_sender(cmd_queue):
+    """Sends a heartbeat every heartbeat_interval until told to stop.
+
+    :param cmd_queue: a queue of commands, 'shutdown' stops the sender and
+                      'reload' reloads the mutable options.
+    """
+    LOG.info('Health Manager Sender starting.')
+    sender = health_sender.UDPStatusSender()
+    try:
+        while True:
+            try:
+                sender.dosend(build_stats_message())
+            except Exception:
+                LOG.exception('Failed to send health heartbeat.')
+
+            try:
+                cmd = cmd_queue.get(
+                    timeout=CONF.health_manager.heartbeat_interval)
+            except queue.Empty:
+                continue
+            if cmd == 'shutdown':
+                break
+            if cmd == 'reload':
+                LOG.info('Reloading configuration')
+                CONF.mutate_config_files()
+    finally:
+        sender.close()
+        LOG.info('Health Manager Sender stopped.')
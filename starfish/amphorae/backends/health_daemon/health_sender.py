@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from starfish.amphorae.backends.health_daemon import status_message
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+class UDPStatusSender(object):
+    """Sends the heartbeats to the health managers, in turn.
+
+    Each heartbeat goes to the next controller of [health_manager]
+    controller_ip_port_list, which is mutable and read again before every
+    heartbeat.
+    """
+
+    def __init__(self):
+        self._controllers = None
+        self.dests = []
+        self.next_dest = 0
+        self.v4sock = None
+        self.v6sock = None
+
+    def _update_dests(self):
+        controllers = list(CONF.health_manager.controller_ip_port_list)
+        if controllers == self._controllers:
+            return
+        self._controllers = controllers
+        self.dests = []
+        for ipport in controllers:
+            try:
+                ip, port = ipport.rsplit(':', 1)
+                addrinfo = socket.getaddrinfo(
+                    ip.strip('[]'), port, 0, socket.SOCK_DGRAM)[0]
+            except (ValueError, socket.gaierror):
+                LOG.error('Invalid controller_ip_port_list entry %s, '
+                          'skipping it.', ipport)
+                continue
+            self.dests.append(addrinfo)
+
+    def _get_sock(self, family):
+        if family == socket.AF_INET:
+            if self.v4sock is None:
+                self.v4sock = socket.socket(socket.AF_INET,
+                                            socket.SOCK_DGRAM)
+            return self.v4sock
+        if self.v6sock is None:
+            self.v6sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        return self.v6sock
+
+    def dosend(self, obj):
+        """Encodes and sends a heartbeat to the next controller.
+
+        :returns: the number of bytes sent, None without any controller.
+        """
+        self._update_dests()
+        if not self.dests:
+            LOG.warning('No controller_ip_port_list configured, the '
+                        'heartbeat was not sent.')
+            return None
+        envelope = status_message.wrap_envelope(
+            obj, CONF.health_manager.heartbeat_key,
+            encoding=CONF.health_manager.heartbeat_encoding,
+            compress=CONF.health_manager.heartbeat_compression)
+        dest = self.dests[self.next_dest % len(self.dests)]
+        self.next_dest += 1
+        return self._get_sock(dest[0]).sendto(envelope, dest[4])
+
+    def close(self):
+        for sock in (self.v4sock, self.v6sock):
+            if sock is not None:
+                sock.close()
+        self.v4sock = self.v6sock = None
@@ -0,0 +1,171 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Encoding of the heartbeats the amphorae send to the health managers.
+
+Two encodings are understood:
+
+* json: a zlib compressed JSON object followed by the HMAC-SHA256 digest
+  of the compressed bytes, keyed with [health_manager] heartbeat_key.
+* binary: a version byte, a flags byte, the heartbeat as a msgpack array
+  with the UUIDs packed in 16 bytes, optionally zlib compressed, and the
+  HMAC-SHA256 digest of everything before it. Unsigned binary heartbeats
+  can be built but are rejected.
+
+A zlib stream never starts with the binary version byte, so the receivers
+tell them apart from the first byte.
+"""
+
+import hashlib
+import hmac
+import json
+import re
+import zlib
+
+import msgpack
+
+from starfish.common import exceptions
+
+HMAC_SIZE = hashlib.sha256().digest_size
+
+ENCODING_JSON = 'json'
+ENCODING_BINARY = 'binary'
+
+BINARY_VERSION = 2
+_BINARY_HEADER_SIZE = 2
+_FLAG_COMPRESSED = 0x01
+_FLAG_SIGNED = 0x02
+
+# The usual listener statuses are sent as small integers, the others as
+# they are.
+_STATUS_CODES = {'OPEN': 0, 'FULL': 1, 'DOWN': 2, 'MAINT': 3}
+_STATUS_NAMES = {code: name for name, code in _STATUS_CODES.items()}
+# The order of the listener statistics in the binary encoding.
+_STATS = ('rx', 'tx', 'conns', 'totconns', 'ereq')
+# Only the canonical form of the UUIDs survives their packing.
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                      r'[0-9a-f]{12}\Z')
+
+
+def encode_obj(obj):
+    return zlib.compress(json.dumps(obj).encode('utf-8'), 9)
+
+
+def decode_obj(binary_array):
+    return json.loads(zlib.decompress(binary_array).decode('utf-8'))
+
+
+def get_hmac(payload, key):
+    """Returns the HMAC-SHA256 digest of payload.
+
+    :param payload: the bytes to sign.
+    :param key: the shared key, a str.
+    """
+    return hmac.new(key.encode('utf-8'), payload, hashlib.sha256).digest()
+
+
+def _pack_id(value):
+    # Faster than going through uuid.UUID.
+    if isinstance(value, str) and _UUID_RE.match(value):
+        return bytes.fromhex(value.replace('-', ''))
+    return value
+
+
+def _unpack_id(value):
+    if isinstance(value, bytes):
+        value = value.hex()
+        return '{}-{}-{}-{}-{}'.format(value[:8], value[8:12], value[12:16],
+                                       value[16:20], value[20:])
+    return value
+
+
+def _pack(obj):
+    listeners = []
+    for listener_id, listener in obj.get('listeners', {}).items():
+        stats = listener.get('stats') or {}
+        status = listener.get('status')
+        listeners.append([_pack_id(listener_id),
+                          _STATUS_CODES.get(status, status)] +
+                         [stats.get(name, 0) for name in _STATS])
+    return msgpack.packb([_pack_id(obj['id']), obj.get('seq', 0),
+                          listeners])
+
+
+def _unpack(payload):
+    amphora_id, seq, listeners = msgpack.unpackb(payload)
+    return {
+        'id': _unpack_id(amphora_id), 'seq': seq, 'ver': BINARY_VERSION,
+        'listeners': {
+            _unpack_id(listener[0]): {
+                'status': _STATUS_NAMES.get(listener[1], listener[1]),
+                'stats': dict(zip(_STATS, listener[2:]))}
+            for listener in listeners}}
+
+
+def wrap_envelope(obj, key, encoding=ENCODING_JSON, compress=True):
+    """Returns a heartbeat ready to be sent.
+
+    :param obj: the heartbeat, a dict with the amphora 'id', the 'seq'
+                number and the 'listeners' with their 'status' and
+                'stats'. The binary encoding only keeps these.
+    :param key: the shared key, a str. The json encoding requires it, the
+                binary one is not signed without it, and then rejected by
+                the receivers.
+    :param encoding: ENCODING_JSON or ENCODING_BINARY.
+    :param compress: whether to compress a binary heartbeat, json ones
+                     always are.
+    """
+    if encoding == ENCODING_JSON:
+        payload = encode_obj(obj)
+        return payload + get_hmac(payload, key)
+
+    payload = _pack(obj)
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 9)
+        flags |= _FLAG_COMPRESSED
+    if key:
+        flags |= _FLAG_SIGNED
+    envelope = bytes((BINARY_VERSION, flags)) + payload
+    if key:
+        envelope += get_hmac(envelope, key)
+    return envelope
+
+
+def _unwrap_binary_envelope(envelope, key):
+    flags = envelope[1]
+    # Unsigned heartbeats are never accepted, whoever can reach the
+    # health managers could report the health of any amphora.
+    if not key or not flags & _FLAG_SIGNED:
+        raise exceptions.InvalidHMACException()
+    end = len(envelope) - HMAC_SIZE
+    if not hmac.compare_digest(envelope[end:],
+                               get_hmac(envelope[:end], key)):
+        raise exceptions.InvalidHMACException()
+    payload = envelope[_BINARY_HEADER_SIZE:end]
+    if flags & _FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+    return _unpack(payload)
+
+
+def unwrap_envelope(envelope, key):
+    """Returns the object of a heartbeat, once its signature is checked.
+
+    :raises InvalidHMACException: if the signature does not match.
+    """
+    if envelope[:1] == bytes((BINARY_VERSION,)):
+        return _unwrap_binary_envelope(envelope, key)
+    payload = envelope[:-HMAC_SIZE]
+    if not hmac.compare_digest(envelope[-HMAC_SIZE:],
+                               get_hmac(payload, key)):
+        raise exceptions.InvalidHMACException()
+    return decode_obj(payload)
@@ -0,0 +1,262 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import asyncio
+import functools
+import random
+import threading
+import time
+
+import aiohttp
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+
+from starfish.amphorae import exceptions as exc
+from starfish.amphorae.driver_exceptions import exceptions as driver_except
+from starfish.amphorae.drivers import rest_api_driver
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+class AmphoraResponse(object):
+    """A fully read amphora agent response.
+
+    Exposes the parts of requests.Response that the callers and
+    exceptions.check_exception rely on.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return jsonutils.loads(self.content)
+
+
+class _AgentNotReady(Exception):
+    """The agent answered, but its API is not up yet."""
+
+
+class AsyncAmphoraAPIClientBase(object):
+    """asyncio flavour of AmphoraAPIClientBase.
+
+    A single aiohttp session is shared by all requests of the client, so
+    connections to each amphora are pooled and kept alive between calls.
+    Waiting between retries yields to the event loop instead of blocking a
+    thread, and every request is bounded by an overall deadline.
+    """
+
+    def __init__(self):
+        super(AsyncAmphoraAPIClientBase, self).__init__()
+
+        self.get = functools.partial(self.request, 'get')
+        self.post = functools.partial(self.request, 'post')
+        self.put = functools.partial(self.request, 'put')
+        self.delete = functools.partial(self.request, 'delete')
+        self.head = functools.partial(self.request, 'head')
+
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _get_session(self):
+        # The session binds to the running loop, so it is only created once
+        # the first request runs.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=0,
+                limit_per_host=CONF.haproxy_amphora.rest_request_pool_size,
+                keepalive_timeout=(
+                    CONF.haproxy_amphora.rest_request_keepalive_timeout))
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': rest_api_driver.OCTAVIA_API_CLIENT})
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _backoff(attempt):
+        """Returns a jittered, exponentially growing retry delay."""
+        interval = CONF.haproxy_amphora.connection_retry_interval
+        ceiling = min(CONF.haproxy_amphora.connection_retry_max_interval,
+                      interval * 2 ** min(attempt, 32))
+        return random.uniform(0, ceiling)  # nosec
+
+    @staticmethod
+    def _check_agent_ready(response):
+        # A 404 is also what we get while the network in the amphora is not
+        # up yet, in which case we retry.
+        content_type = response.headers.get('content-type', '')
+        if content_type.find("application/json") == -1:
+            LOG.debug("Amphora agent not ready.")
+            raise _AgentNotReady()
+        try:
+            json_data = response.json().get('details', '')
+        except ValueError:
+            return
+        if 'No suitable network interface found' in json_data:
+            LOG.debug("Amphora network interface not found.")
+            raise _AgentNotReady()
+
+    async def request(self, method, setting, path='/', retry_404=True,
+                      raise_retry_exception=False, **kwargs):
+        conn_timeout = CONF.haproxy_amphora.rest_request_conn_timeout
+        read_timeout = CONF.haproxy_amphora.rest_request_read_timeout
+        conn_max_retries = CONF.haproxy_amphora.connection_max_retries
+        deadline = (time.monotonic() +
+                    CONF.haproxy_amphora.rest_request_deadline)
+
+        url = rest_api_driver._base_url(setting['ip'], setting['port']) + path
+        session = self._get_session()
+        exception = None
+        for attempt in range(conn_max_retries):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = aiohttp.ClientTimeout(
+                total=remaining, sock_connect=min(conn_timeout, remaining),
+                sock_read=read_timeout)
+            try:
+                async with session.request(method, url, timeout=timeout,
+                                           ssl=False, **kwargs) as r:
+                    response = AmphoraResponse(r.status, r.headers,
+                                               await r.read())
+                LOG.debug('Connected to amphora %(url)s. Response: '
+                          '%(status)s', {'url': url,
+                                         'status': response.status_code})
+                if response.status_code == 404:
+                    if not retry_404:
+                        raise exc.NotFound()
+                    self._check_agent_ready(response)
+                return response
+            except (aiohttp.ClientError, asyncio.TimeoutError,
+                    _AgentNotReady) as e:
+                exception = e
+                if raise_retry_exception:
+                    # For taskflow persistence cause attribute should
+                    # be serializable to JSON. Pass None, as cause exception
+                    # is described in the expection message.
+                    raise driver_except.AmpConnectionRetry(
+                        exception=str(e)) from None
+                delay = self._backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    break
+                LOG.warning('Could not connect to amphora %(url)s. Retrying '
+                            'in %(delay).1f seconds.',
+                            {'url': url, 'delay': delay})
+                await asyncio.sleep(delay)
+        LOG.error("Connection to amphora %(url)s failed after %(attempts)s "
+                  "attempts or %(deadline)s seconds. The amphora is "
+                  "unavailable. Reason: %(exception)s",
+                  {'url': url, 'attempts': conn_max_retries,
+                   'deadline': CONF.haproxy_amphora.rest_request_deadline,
+                   'exception': exception})
+        raise driver_except.TimeOutException()
+
+    async def fan_out(self, func, settings, concurrency=None):
+        """Calls func(setting) for several amphorae concurrently.
+
+        :param func: coroutine function taking an amphora setting, for
+                     example functools.partial(client.get_version, '/').
+        :param settings: the amphora settings ({'ip': ..., 'port': ...}).
+        :param concurrency: the maximum number of calls in flight, defaults
+                            to [haproxy_amphora] rest_request_concurrency.
+        :returns: the results in the order of settings. A call that failed
+                  has its exception in place of its result.
+        """
+        semaphore = asyncio.Semaphore(
+            concurrency or CONF.haproxy_amphora.rest_request_concurrency)
+
+        async def _call(setting):
+            async with semaphore:
+                return await func(setting)
+
+        return await asyncio.gather(*[_call(setting) for setting in settings],
+                                    return_exceptions=True)
+
+
+class AsyncAmphoraAPIClient1_0(AsyncAmphoraAPIClientBase):
+    def __init__(self):
+        super(AsyncAmphoraAPIClient1_0, self).__init__()
+
+    async def get_version(self, path, bind_ip_port):
+        r = await self.get(bind_ip_port, path)
+        if exc.check_exception(r):
+            return r.json()
+        return None
+
+    async def delete_listener(self, path, setting):
+        r = await self.delete(setting, path)
+        return exc.check_exception(r, (404,))
+
+
+class AsyncRestDriverTest(object):
+    """Blocking facade running the asyncio client on a private loop.
+
+    Lets synchronous callers, such as taskflow tasks, query many amphorae
+    at once. The loop runs in a thread of its own, started on first use,
+    and the calls of every thread are submitted to it, so the calls of
+    concurrent callers are in flight at the same time instead of taking
+    turns.
+    """
+
+    def __init__(self):
+        super(AsyncRestDriverTest, self).__init__()
+        self.loop = asyncio.new_event_loop()
+        self.client = AsyncAmphoraAPIClient1_0()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _start_loop(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self.loop.run_forever, name='amphora-rest-loop',
+                    daemon=True)
+                self._thread.start()
+
+    def _run(self, coro):
+        if self._thread is None:
+            self._start_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get_version_info(self, msg='/', bind_ip_port={}, timeout=None):
+        try:
+            return self._run(asyncio.wait_for(
+                self.client.get_version(msg, bind_ip_port), timeout))
+        except asyncio.TimeoutError:
+            raise driver_except.TimeOutException()
+
+    def get_version_info_many(self, bind_ip_ports, msg='/'):
+        return self._run(self.client.fan_out(
+            functools.partial(self.client.get_version, msg), bind_ip_ports))
+
+    def delete(self, msg, ip='127.0.0.1', port='8976'):
+        self._run(self.client.delete_listener(msg, {'ip': ip, "port": port}))
+
+    def close(self):
+        if self._thread is not None:
+            self._run(self.client.close())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self._thread = None
+        self.loop.close()
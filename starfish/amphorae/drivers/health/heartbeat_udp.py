@@ -0,0 +1,265 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import concurrent.futures
+import datetime
+import os
+import selectors
+import socket
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from starfish.amphorae.backends.health_daemon import status_message
+from starfish.db import api as db_api
+from starfish.db import repositories
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+UDP_MAX_SIZE = 64 * 1024
+# The most datagrams read in a row, so that a flood of heartbeats does not
+# delay the flushes.
+_MAX_RECV_BATCH = 1024
+
+
+# Heartbeat stats -> listener statistics columns.
+_STATS_COLUMNS = (('rx', 'bytes_in'), ('tx', 'bytes_out'),
+                  ('conns', 'active_connections'),
+                  ('totconns', 'total_connections'),
+                  ('ereq', 'request_errors'))
+
+
+def _check_heartbeat(obj):
+    """Raises TypeError unless the heartbeat has the shape flush expects.
+
+    The signature only proves who sent it, a heartbeat of an unexpected
+    shape must not reach the flush, where it would stop the receiver.
+    """
+    if not isinstance(obj['id'], str):
+        raise TypeError(obj['id'])
+    listeners = obj.get('listeners') or {}
+    if not isinstance(listeners, dict):
+        raise TypeError(listeners)
+    for listener_id, listener in listeners.items():
+        if not isinstance(listener_id, str):
+            raise TypeError(listener_id)
+        if not isinstance(listener, dict):
+            raise TypeError(listener)
+        listener_stats = listener.get('stats') or {}
+        if not isinstance(listener_stats, dict):
+            raise TypeError(listener_stats)
+        for stat, _column in _STATS_COLUMNS:
+            if not isinstance(listener_stats.get(stat, 0), int):
+                raise TypeError(listener_stats[stat])
+
+
+class _BatchWriter(object):
+    """Upserts batches of rows with a pool of threads.
+
+    A batch is split in one shard per thread, each shard is written in its
+    own transaction, retried when another health manager inserted one of
+    its rows first. The rows of a failed shard are lost, the next
+    heartbeats of their amphorae write them again.
+    """
+
+    def __init__(self, repo, threads, name):
+        self.repo = repo
+        self.threads = threads or os.cpu_count() or 1
+        self.name = name
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix=name)
+        self.futures = []
+        self.rows = 0
+        self.batches = 0
+
+    def busy(self):
+        return not all(future.done() for future in self.futures)
+
+    def write(self, rows):
+        if not rows:
+            return
+        self.batches += 1
+        self.rows += len(rows)
+        shard_size = -(-len(rows) // self.threads)
+        self.futures = [
+            self.executor.submit(self._upsert, rows[start:start + shard_size])
+            for start in range(0, len(rows), shard_size)]
+
+    def _upsert(self, rows):
+        try:
+            self.repo.upsert_many(db_api.get_session(), rows)
+        except Exception:
+            LOG.exception('Writing %(count)d %(name)s rows failed.',
+                          {'count': len(rows), 'name': self.name})
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class UDPStatusGetter(object):
+    """Receives the heartbeats of the amphorae and stores them in batches.
+
+    The socket is non-blocking and drained by a single loop. The heartbeats
+    are coalesced per amphora, keeping the one with the highest sequence
+    number, and every [health_manager] heartbeat_flush_interval the
+    coalesced amphora health and listener statistics are written with bulk
+    upserts, whatever the number of heartbeats received.
+    """
+
+    def __init__(self):
+        self.key = CONF.health_manager.heartbeat_key
+        self.ip = CONF.health_manager.bind_ip
+        self.port = CONF.health_manager.bind_port
+        self.sockaddr = None
+        self.sock = None
+        self.update(self.key, self.ip, self.port)
+        # amphora id -> (seq, receive time, heartbeat)
+        self.pending = {}
+        self.received = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.repositories = repositories.Repositories()
+        self.health_writer = _BatchWriter(
+            self.repositories.amphorahealth,
+            CONF.health_manager.health_update_threads, 'amphora-health')
+        self.stats_writer = _BatchWriter(
+            self.repositories.listener_stats,
+            CONF.health_manager.stats_update_threads, 'listener-stats')
+
+    def update(self, key, ip, port):
+        """Update the running config for the udp socket server
+
+        :param key: The hmac key used to verify the UDP packets. String
+        :param ip: The ip address the UDP server will read from
+        :param port: The port the UDP server will read from
+        :return: None
+        """
+        self.key = key
+        for addrinfo in socket.getaddrinfo(ip, port, 0, socket.SOCK_DGRAM):
+            ai_family = addrinfo[0]
+            self.sockaddr = addrinfo[4]
+            if self.sock is not None:
+                self.sock.close()
+            self.sock = socket.socket(ai_family, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+            if CONF.health_manager.sock_rlimit > 0:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                     CONF.health_manager.sock_rlimit)
+            self.sock.bind(self.sockaddr)
+            # Port 0 binds an ephemeral port.
+            self.sockaddr = self.sock.getsockname()
+            break  # just used the first addr getaddrinfo finds
+
+    def dorecv(self):
+        """Reads the heartbeats waiting on the socket.
+
+        :returns: the number of datagrams read.
+        """
+        count = 0
+        while count < _MAX_RECV_BATCH:
+            try:
+                data, srcaddr = self.sock.recvfrom(UDP_MAX_SIZE)
+            except BlockingIOError:
+                break
+            count += 1
+            self._coalesce(data, srcaddr, time.time())
+        return count
+
+    def _coalesce(self, data, srcaddr, received_at):
+        try:
+            obj = status_message.unwrap_envelope(data, self.key)
+            _check_heartbeat(obj)
+            amphora_id = obj['id']
+            seq = int(obj.get('seq', 0))
+        except Exception as e:
+            # Logged once per flush, there may be many.
+            LOG.debug('Rejected a heartbeat from %(addr)s: %(err)r',
+                      {'addr': srcaddr, 'err': e})
+            self.rejected += 1
+            return
+        self.received += 1
+        current = self.pending.get(amphora_id)
+        if current is None or seq >= current[0]:
+            self.pending[amphora_id] = (seq, received_at, obj)
+
+    def flush(self):
+        """Writes the coalesced heartbeats.
+
+        Nothing is written while the previous batch is being written, the
+        heartbeats keep being coalesced until the next flush.
+
+        :returns: True if a batch was started.
+        """
+        if self.rejected:
+            LOG.warning('Rejected %d heartbeats with an invalid signature '
+                        'or content.', self.rejected)
+            self.rejected = 0
+        if not self.pending:
+            return False
+        if self.health_writer.busy() or self.stats_writer.busy():
+            LOG.debug('The previous heartbeats are still being written, '
+                      'deferring the flush of %d amphorae.',
+                      len(self.pending))
+            return False
+        batch, self.pending = self.pending, {}
+        health = []
+        stats = []
+        for amphora_id, (seq, received_at, obj) in batch.items():
+            health.append({
+                'amphora_id': amphora_id,
+                'last_update': datetime.datetime.utcfromtimestamp(
+                    received_at)})
+            # The shape was checked by _coalesce.
+            for listener_id, listener in (obj.get('listeners') or
+                                          {}).items():
+                listener_stats = listener.get('stats')
+                if not listener_stats:
+                    continue
+                row = {'listener_id': listener_id, 'amphora_id': amphora_id}
+                for stat, column in _STATS_COLUMNS:
+                    row[column] = listener_stats.get(stat, 0)
+                stats.append(row)
+        self.health_writer.write(health)
+        self.stats_writer.write(stats)
+        self.flushes += 1
+        return True
+
+    def run(self, exit_event):
+        """Receives and flushes the heartbeats until exit_event is set."""
+        interval = CONF.health_manager.heartbeat_flush_interval
+        next_flush = time.monotonic() + interval
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.sock, selectors.EVENT_READ)
+            while not exit_event.is_set():
+                timeout = next_flush - time.monotonic()
+                if timeout > 0 and selector.select(timeout):
+                    self.dorecv()
+                now = time.monotonic()
+                if now >= next_flush:
+                    # The key is mutable.
+                    self.key = CONF.health_manager.heartbeat_key
+                    self.flush()
+                    next_flush += interval
+                    if next_flush < now:
+                        next_flush = now + interval
+        self.stop()
+
+    def stop(self):
+        """Writes the pending heartbeats and waits for the writes."""
+        for writer in (self.health_writer, self.stats_writer):
+            concurrent.futures.wait(writer.futures)
+        self.flush()
+        self.health_writer.shutdown()
+        self.stats_writer.shutdown()
+        self.sock.close()
@@ -38,8 +38,8 @@ class RestDriverTest(object):
         super(RestDriverTest, self).__init__()
         self.client = AmphoraAPIClient1_0()
 
-    def get_version_info(self, msg='/', bind_ip_port={}):
-        info = self.client.get_version(msg, bind_ip_port)
+    def get_version_info(self, msg='/', bind_ip_port={}, timeout=None):
+        info = self.client.get_version(msg, bind_ip_port, timeout=timeout)
         return info
 
     def delete(self, msg, ip='127.0.0.1', port='8976'):
@@ -66,16 +66,22 @@ class AmphoraAPIClientBase(object):
         self.session = requests.Session()
 
     def request(self, method, setting, path='/', retry_404=True,
-                raise_retry_exception=False, **kwargs):
-        req_conn_timeout = 10
-        req_read_timeout = 60
-        conn_max_retries = 120
-        conn_retry_interval = 5
+                raise_retry_exception=False, deadline=None, **kwargs):
+        """Sends a request to the agent, retrying until it answers.
+
+        :param deadline: optional total time in seconds to spend on the
+                         request, retries included, overriding the
+                         configured number of retries when it runs out
+                         first.
+        """
+        req_conn_timeout = CONF.haproxy_amphora.rest_request_conn_timeout
+        req_read_timeout = CONF.haproxy_amphora.rest_request_read_timeout
+        conn_max_retries = CONF.haproxy_amphora.connection_max_retries
+        conn_retry_interval = CONF.haproxy_amphora.connection_retry_interval
 
-        print("request path", path)
         _request = getattr(self.session, method.lower())
         _url = _base_url(setting['ip'], setting['port']) + path
-        print("request url", _url)
+        LOG.debug("request url %s", _url)
         reqargs = {
             'url': _url,
             'timeout': (req_conn_timeout, req_read_timeout)}
@@ -85,8 +91,13 @@ class AmphoraAPIClientBase(object):
 
         headers['User-Agent'] = OCTAVIA_API_CLIENT
         exception = None
+        start = time.monotonic()
         # Keep retrying
         for dummy in six.moves.xrange(conn_max_retries):
+            if deadline is not None:
+                remaining = deadline - (time.monotonic() - start)
+                reqargs['timeout'] = (min(req_conn_timeout, remaining),
+                                      min(req_read_timeout, remaining))
             try:
                 with warnings.catch_warnings():
                     warnings.filterwarnings(
@@ -94,7 +105,8 @@ class AmphoraAPIClientBase(object):
                         message="A true SSLContext object is not available"
                     )
                     r = _request(**reqargs)
-                print('Connected to amphora. Response:', r)
+                LOG.debug('Connected to amphora. Response: %(resp)s',
+                          {'resp': r})
 
                 content_type = r.headers.get('content-type', '')
                 # Check the 404 to see if it is just that the network in the
@@ -103,25 +115,27 @@ class AmphoraAPIClientBase(object):
                 if r.status_code == 404:
                     if not retry_404:
                         raise exc.NotFound()
-                    print('Got a 404 (content-type: %(content_type)s) -- '
-                          'connection data: %(content)s',
-                          {'content_type': content_type,
-                           'content': r.content})
+                    LOG.debug('Got a 404 (content-type: %(content_type)s) -- '
+                              'connection data: %(content)s',
+                              {'content_type': content_type,
+                               'content': r.content})
                     if content_type.find("application/json") == -1:
-                        print("Amphora agent not ready.")
+                        LOG.debug("Amphora agent not ready.")
                         raise requests.ConnectionError
                     try:
                         json_data = r.json().get('details', '')
                         if 'No suitable network interface found' in json_data:
-                            print("Amphora network interface not found.")
+                            LOG.debug("Amphora network interface not found.")
                             raise requests.ConnectionError
                     except simplejson.JSONDecodeError:  # if r.json() fails
                         pass  # TODO(rm_work) Should we do something?
                 return r
             except (requests.ConnectionError, requests.Timeout) as e:
                 exception = e
-                print(e)
-                print("Could not connect to instance. Retrying.")
+                if (deadline is not None and time.monotonic() - start +
+                        conn_retry_interval >= deadline):
+                    break
+                LOG.warning("Could not connect to instance. Retrying.")
                 time.sleep(conn_retry_interval)
                 if raise_retry_exception:
                     # For taskflow persistence cause attribute should
@@ -130,11 +144,11 @@ class AmphoraAPIClientBase(object):
                     six.raise_from(
                         driver_except.AmpConnectionRetry(exception=str(e)),
                         None)
-        print("Connection retries (currently set to %(max_retries)s) "
-              "exhausted.  The amphora is unavailable. Reason: "
-              "%(exception)s",
-              {'max_retries': conn_max_retries,
-               'exception': exception})
+        LOG.error("Connection retries (currently set to %(max_retries)s) "
+                  "exhausted.  The amphora is unavailable. Reason: "
+                  "%(exception)s",
+                  {'max_retries': conn_max_retries,
+                   'exception': exception})
         raise driver_except.TimeOutException()
 
 
@@ -142,8 +156,8 @@ class AmphoraAPIClient1_0(AmphoraAPIClientBase):
     def __init__(self):
         super(AmphoraAPIClient1_0, self).__init__()
 
-    def get_version(self, path, bind_ip_port):
-        r = self.get(bind_ip_port, path)
+    def get_version(self, path, bind_ip_port, timeout=None):
+        r = self.get(bind_ip_port, path, deadline=timeout)
         if exc.check_exception(r):
             return r.json()
         return None
@@ -14,7 +14,6 @@
 
 # make sure PYTHONPATH includes the home directory if you didn't install
 
-import gunicorn.app.base
 import multiprocessing as multiproc
 # import ssl
 import sys
@@ -23,30 +22,24 @@ from oslo_reports import guru_meditation_report as gmr
 
 from starfish import version
 from starfish.amphorae.backends.agent.api_server import server
-# from health_daemon import health_daemon
+from starfish.amphorae.backends.health_daemon import health_daemon
 from starfish.common import service
 from starfish.common import utils
+from starfish.common import wsgi
 
 CONF = cfg.CONF
 
 HM_SENDER_CMD_QUEUE = multiproc.Queue()
-HM_SENDER_CMD_QUEUE.put("shutdown")
 
 
-class AmphoraAgent(gunicorn.app.base.BaseApplication):
-    def __init__(self, app, options=None):
-        self.options = options or {}
-        self.application = app
-        super(AmphoraAgent, self).__init__()
+class AmphoraAgent(wsgi.GunicornApplication):
+    pass
 
-    def load_config(self):
-        config = {key: value for key, value in self.options.items()
-                  if key in self.cfg.settings and value is not None}
-        for key, value in config.items():
-            self.cfg.set(key.lower(), value)
 
-    def load(self):
-        return self.application
+def _reload_health_sender(arbiter):
+    # gunicorn handles the SIGHUP of the agent, it calls this once it
+    # reloaded its own configuration.
+    HM_SENDER_CMD_QUEUE.put('reload')
 
 
 # start api server
@@ -56,6 +49,12 @@ def main():
 
     gmr.TextGuruMeditation.setup_autorun(version)
 
+    health_sender_proc = multiproc.Process(name='HM_sender',
+                                           target=health_daemon.run_sender,
+                                           args=(HM_SENDER_CMD_QUEUE,))
+    health_sender_proc.daemon = True
+    health_sender_proc.start()
+
     # Initiate server class
     server_instance = server.Server()
 
@@ -74,9 +73,12 @@ def main():
         'syslog_facility': 'local{}'.format(
             CONF.amphora_agent.administrative_log_facility),
         # 'syslog_addr': 'unix://run/rsyslog/octavia/log#dgram',
-
+        'on_reload': _reload_health_sender,
     }
-    AmphoraAgent(server_instance.app, options).run()
-
-
-main()
+    try:
+        AmphoraAgent(server_instance.app, options).run()
+    finally:
+        # The sender is a daemon process, killed when the agent exits
+        # unless it stopped first.
+        HM_SENDER_CMD_QUEUE.put('shutdown')
+        health_sender_proc.join(CONF.health_manager.heartbeat_interval)
@@ -12,38 +12,101 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import multiprocessing
 import sys
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_reports import guru_meditation_report as gmr
-from wsgiref import simple_server
+from oslo_reports.models import base as report_model
+from oslo_reports.views.text import generic as generic_views
 
 from starfish import version
-# from frame_api import app as api_app
+from starfish.common import cache
+from starfish.common import rpc
+from starfish.common import utils
+from starfish.common import wsgi
+from starfish.db import api as db_api
 from starfish.frame_api import app as api_app
+from starfish.frame_api.common import pagination
 
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
+class StarfishAPI(wsgi.GunicornApplication):
+    pass
+
+
+def _post_fork(server, worker):
+    # The transport set up while the app was preloaded belongs to the
+    # master process, each worker needs its own broker connections.
+    rpc.cleanup()
+    rpc.init()
+
+
+def _db_pool_report():
+    return report_model.ReportModel(
+        data=db_api.get_pool_metrics(),
+        attached_view=generic_views.KeyValueView())
+
+
+def _entity_cache_report():
+    return report_model.ReportModel(
+        data=cache.get_entity_cache_stats(),
+        attached_view=generic_views.KeyValueView())
+
+
+def get_server_options():
+    """Returns the gunicorn settings of the API from [api_settings]."""
+    api_settings = CONF.api_settings
+    return {
+        'bind': utils.ip_port_str(api_settings.bind_host,
+                                  api_settings.bind_port),
+        'workers': api_settings.workers or multiprocessing.cpu_count(),
+        'worker_class': 'gthread',
+        'threads': api_settings.threads,
+        'keepalive': api_settings.keepalive,
+        'backlog': api_settings.backlog,
+        'timeout': api_settings.request_timeout,
+        'graceful_timeout': api_settings.graceful_timeout,
+        'preload_app': True,
+        'post_fork': _post_fork,
+        'proc_name': 'starfish-api',
+    }
+
+
 def main():
+    gmr.TextGuruMeditation.register_section('Database Pool',
+                                            _db_pool_report)
+    gmr.TextGuruMeditation.register_section('Entity Cache',
+                                            _entity_cache_report)
     gmr.TextGuruMeditation.setup_autorun(version)
 
     app = api_app.setup_app(argv=sys.argv)
+    # Generated before the workers fork, so that a pagination link handed
+    # out by one worker is valid for all of them.
+    pagination._get_cursor_key()
 
-    # host = cfg.CONF.api_settings.bind_host
-    # port = cfg.CONF.api_settings.bind_port
-    # bind your local ip and port
-    host = '192.168.240.147'
-    port = 1895
-    LOG.info("Starting API server on %(host)s:%(port)s",
-             {"host": host, "port": port})
+    options = get_server_options()
+    if (options['workers'] > 1 and CONF.api_settings.response_cache_backend ==
+            cache.MEMORY_BACKEND):
+        LOG.warning("The 'memory' response cache is private to each of the "
+                    "%(workers)s API workers, a worker serves its cached "
+                    "responses for up to %(expiration)s seconds after "
+                    "another worker changed them. Use a shared "
+                    "[api_settings] response_cache_backend or a single "
+                    "worker.",
+                    {'workers': options['workers'],
+                     'expiration':
+                         CONF.api_settings.response_cache_expiration_time})
+    LOG.info("Starting API server on %(bind)s with %(workers)s workers of "
+             "%(threads)s threads", options)
     # if cfg.CONF.api_settings.auth_strategy != constants.KEYSTONE:
     #     LOG.warning('Octavia configuration [api_settings] auth_strategy is '
     #                 'not set to "keystone". This is not a normal '
     #                 'configuration and you may get "Missing project ID" '
     #                 'errors from API calls."')
-    srv = simple_server.make_server(host, port, app)
-
-    srv.serve_forever()
+    StarfishAPI(app, options).run()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,80 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import signal
+import sys
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_reports import guru_meditation_report as gmr
+
+from starfish import version
+from starfish.amphorae.drivers.health import heartbeat_udp
+from starfish.common import service
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+hm_listener_thread_event = threading.Event()
+
+
+def hm_listener():
+    """Receive the heartbeats of the amphorae."""
+    udp_getter = heartbeat_udp.UDPStatusGetter()
+    LOG.info("Listening for heartbeats on %s", udp_getter.sockaddr)
+    udp_getter.run(hm_listener_thread_event)
+
+
+def _mutate_config(*args, **kwargs):
+    LOG.info("Health Manager received HUP signal, mutating config.")
+    CONF.mutate_config_files()
+
+
+def _stop(*args, **kwargs):
+    # The listener flushes the heartbeats it coalesced before returning,
+    # main() waits for it.
+    LOG.info("Health Manager received TERM signal, stopping.")
+    hm_listener_thread_event.set()
+
+
+def main():
+    service.prepare_service(sys.argv)
+
+    # The heartbeats could not be authenticated.
+    if not CONF.health_manager.heartbeat_key:
+        raise cfg.RequiredOptError('heartbeat_key',
+                                   cfg.OptGroup('health_manager'))
+
+    gmr.TextGuruMeditation.setup_autorun(version)
+
+    LOG.info("Starting health manager")
+
+    hm_listener_thread = threading.Thread(target=hm_listener)
+    hm_listener_thread.daemon = True
+    hm_listener_thread.start()
+
+    signal.signal(signal.SIGHUP, _mutate_config)
+    signal.signal(signal.SIGTERM, _stop)
+
+    try:
+        while hm_listener_thread.is_alive():
+            hm_listener_thread.join(1)
+    except KeyboardInterrupt:
+        LOG.info("Attempting to gracefully terminate Health Manager")
+        hm_listener_thread_event.set()
+        hm_listener_thread.join()
+    LOG.info("Health Manager process terminated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import signal
+import sys
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_reports import guru_meditation_report as gmr
+
+from starfish import version
+from starfish.common import service
+from starfish.controller.housekeeping import house_keeping
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+db_cleanup_thread_event = threading.Event()
+cert_rotate_thread_event = threading.Event()
+
+
+def db_cleanup():
+    """Perform db cleanup for old resources."""
+    interval = CONF.house_keeping.cleanup_interval
+    LOG.info("DB cleanup interval is set to %d sec", interval)
+    LOG.info('Amphora expiry age is %s seconds',
+             CONF.house_keeping.amphora_expiry_age)
+    LOG.info('Load balancer expiry age is %s seconds',
+             CONF.house_keeping.load_balancer_expiry_age)
+    db_cleanup = house_keeping.DatabaseCleanup(db_cleanup_thread_event)
+    while not db_cleanup_thread_event.is_set():
+        LOG.debug("Initiating the cleanup of old resources...")
+        try:
+            db_cleanup.cleanup()
+        except Exception:
+            LOG.exception('DB cleanup failed.')
+        db_cleanup_thread_event.wait(interval)
+
+
+def cert_rotation():
+    """Perform certificate rotation."""
+    interval = CONF.house_keeping.cert_interval
+    LOG.info("Expiring certificate check interval is set to %d sec",
+             interval)
+    cert_rotate = house_keeping.CertRotation()
+    while not cert_rotate_thread_event.is_set():
+        LOG.debug("Initiating certificate rotation ...")
+        try:
+            cert_rotate.rotate()
+        except Exception:
+            LOG.exception('Certificate rotation failed.')
+        cert_rotate_thread_event.wait(interval)
+
+
+def _mutate_config(*args, **kwargs):
+    LOG.info("Housekeeping received HUP signal, mutating config.")
+    CONF.mutate_config_files()
+
+
+def main():
+    service.prepare_service(sys.argv)
+
+    gmr.TextGuruMeditation.setup_autorun(version)
+
+    LOG.info("Starting house keeping")
+
+    db_cleanup_thread = threading.Thread(target=db_cleanup)
+    db_cleanup_thread.daemon = True
+    db_cleanup_thread.start()
+
+    cert_rotate_thread = threading.Thread(target=cert_rotation)
+    cert_rotate_thread.daemon = True
+    cert_rotate_thread.start()
+
+    signal.signal(signal.SIGHUP, _mutate_config)
+
+    try:
+        while db_cleanup_thread.is_alive() or cert_rotate_thread.is_alive():
+            db_cleanup_thread.join(1)
+            cert_rotate_thread.join(1)
+    except KeyboardInterrupt:
+        LOG.info("Attempting to gracefully terminate House-Keeping")
+        db_cleanup_thread_event.set()
+        cert_rotate_thread_event.set()
+        db_cleanup_thread.join()
+        cert_rotate_thread.join()
+        LOG.info("House-Keeping process terminated")
+
+
+if __name__ == "__main__":
+    main()
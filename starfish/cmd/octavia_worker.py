@@ -17,17 +17,28 @@ import sys
 from cotyledon import oslo_config_glue
 from oslo_config import cfg
 from oslo_reports import guru_meditation_report as gmr
+from oslo_reports.models import base as report_model
+from oslo_reports.views.text import generic as generic_views
 
 from starfish import version
+from starfish.common import cache
 from starfish.common import service as octavia_service
 from starfish.controller.queue.v1 import consumer as consumer_v1
 
 CONF = cfg.CONF
 
 
+def _entity_cache_report():
+    return report_model.ReportModel(
+        data=cache.get_entity_cache_stats(),
+        attached_view=generic_views.KeyValueView())
+
+
 def main():
     octavia_service.prepare_service(sys.argv)
 
+    gmr.TextGuruMeditation.register_section('Entity Cache',
+                                            _entity_cache_report)
     gmr.TextGuruMeditation.setup_autorun(version)
 
     sm = cotyledon.ServiceManager()
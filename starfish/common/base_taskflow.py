@@ -13,8 +13,11 @@
 # under the License.
 #
 
+import collections
 import concurrent.futures
+import contextlib
 import datetime
+import threading
 from oslo_config import cfg
 from taskflow import engines as tf_engines
 
@@ -33,6 +36,10 @@ class BaseTaskFlowEngine(object):
         datetime.datetime.strptime('2014-06-19 22:47:16', '%Y-%m-%d %H:%M:%S')
         self.executor = concurrent.futures.ThreadPoolExecutor(
             max_workers=CONF.task_flow.max_workers)
+        # Idle, already compiled engines by flow key, least recently used
+        # key first.
+        self._engines = collections.OrderedDict()
+        self._engines_lock = threading.Lock()
 
     def _taskflow_load(self, flow, **kwargs):
         eng = tf_engines.load(
@@ -45,3 +52,42 @@ class BaseTaskFlowEngine(object):
         eng.prepare()
 
         return eng
+
+    @contextlib.contextmanager
+    def _taskflow_load_cached(self, key, flow_factory, store=None, **kwargs):
+        """Lends a loaded engine for a flow, reusing a previous one if idle.
+
+        Loading an engine compiles the flow and prepares its storage, which
+        costs far more than running short flows. Engines that ran to
+        completion are reset, kept per key and given the new store for
+        the next run, so key must identify the flow structure built by
+        flow_factory (its name and the parameters shaping it), while the
+        values that vary between runs must come from the store.
+
+        :param key: hashable identifying the flow flow_factory builds
+        :param flow_factory: callable without arguments building the flow
+        :param store: values injected into the engine storage
+        """
+        engine = None
+        with self._engines_lock:
+            idle = self._engines.get(key)
+            if idle:
+                engine = idle.pop()
+        if engine is None:
+            engine = self._taskflow_load(flow_factory(), store=store,
+                                         **kwargs)
+        elif store:
+            engine.storage.inject(store)
+
+        yield engine
+
+        # Only hand back engines that did not raise, a failed run is not
+        # worth the risk of reusing its state. Resetting here keeps the
+        # cost of it off the path of the next request.
+        if CONF.task_flow.engine_cache_size:
+            engine.reset()
+            with self._engines_lock:
+                self._engines.setdefault(key, []).append(engine)
+                self._engines.move_to_end(key)
+                while len(self._engines) > CONF.task_flow.engine_cache_size:
+                    self._engines.popitem(last=False)
@@ -0,0 +1,401 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Caches of API responses and of the entities read by the repositories.
+
+Responses are cached per resource type (the name of the mapped class, for
+example 'TestEntity'). Every resource has a generation token that is part
+of the key of its entries; the repositories replace the token once a
+transaction that changed the resource is committed, so that all the cached
+responses of that resource are dropped at once, by every API worker
+sharing the backend. The 'memory' backend is not shared: only the worker
+that committed the change drops its responses, the other workers keep
+serving theirs until they expire.
+
+Entities are cached the same way, with a version token per entity instead
+of per resource.
+"""
+
+import collections
+import hashlib
+import pickle
+import threading
+import time
+
+import cachetools
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import uuidutils
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+MEMORY_BACKEND = 'memory'
+
+# Keys of the session.info sets of the resources and of the (resource, id)
+# pairs to invalidate on commit.
+PENDING_INVALIDATIONS = 'starfish_pending_cache_invalidations'
+PENDING_ENTITY_INVALIDATIONS = 'starfish_pending_entity_invalidations'
+
+_RESPONSE_CACHE = None
+_RESPONSE_CACHE_LOCK = threading.Lock()
+_ENTITY_CACHES = {}
+_ENTITY_CACHE_BACKEND = None
+_ENTITY_CACHE_LOCK = threading.Lock()
+
+
+class MemoryBackend(object):
+    """In-process backend, private to each API worker.
+
+    Invalidations made by one worker are not seen by the others.
+    """
+
+    def __init__(self, size, expiration_time):
+        self._cache = cachetools.TTLCache(size, expiration_time)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+
+class LRUBackend(object):
+    """In-process backend bounded in entries, in bytes and in time.
+
+    The least recently used entries are evicted first once either bound is
+    reached. Values must be bytes or str, their len() is their size.
+    """
+
+    def __init__(self, max_entries, max_bytes, expiration_time):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.expiration_time = expiration_time
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _pop(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                self._pop(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(value)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + self.expiration_time,
+                                  value)
+            self._bytes += size
+            while (len(self._entries) > self.max_entries or
+                   self._bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'evictions': self.evictions,
+                    'expirations': self.expirations}
+
+
+class DogpileBackend(object):
+    """dogpile.cache backend, memcached or redis can share it across hosts.
+
+    Values are pickled by the backend.
+    """
+
+    def __init__(self, backend, arguments, expiration_time):
+        # Only needed when a shared cache is configured.
+        from dogpile.cache import api as dogpile_api
+        from dogpile.cache import region as dogpile_region
+
+        self._no_value = dogpile_api.NO_VALUE
+        self._region = dogpile_region.make_region().configure(
+            backend, expiration_time=expiration_time, arguments=arguments)
+
+    def get(self, key):
+        value = self._region.get(key)
+        if value is self._no_value:
+            return None
+        return value
+
+    def set(self, key, value):
+        self._region.set(key, value)
+
+    def stats(self):
+        # Evictions happen in the cache server, they are not visible here.
+        return {}
+
+
+class ResponseCache(object):
+    """Stores API responses until their resource changes."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def _hash(*parts):
+        return hashlib.sha256(
+            '\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _generation(self, resource):
+        key = self._hash('generation', resource)
+        generation = self.backend.get(key)
+        if generation is None:
+            # Unknown or evicted, anything cached under the previous token
+            # is unreachable from now on.
+            generation = uuidutils.generate_uuid()
+            self.backend.set(key, generation)
+        return generation
+
+    def get(self, resource, key):
+        """Returns the value cached for key of resource, or None."""
+        return self.backend.get(
+            self._hash(resource, self._generation(resource), key))
+
+    def set(self, resource, key, value):
+        self.backend.set(
+            self._hash(resource, self._generation(resource), key), value)
+
+    def invalidate(self, resource):
+        """Drops every cached response of resource."""
+        self.backend.set(self._hash('generation', resource),
+                         uuidutils.generate_uuid())
+
+
+class EntityCache(object):
+    """Read-through cache of the data models of one mapped class.
+
+    Keys are versioned twice. The schema version changes with the fields
+    of the data model, so that processes running another release never
+    read each other's entries. The version token of each entity is stored
+    in the backend next to the entities, and replaced when a commit
+    changes the entity. A reader fetches the token before loading the
+    entity from the database and stores the entity under it, so an entity
+    loaded before a concurrent commit is never found after it. That holds
+    as long as the load reads the database after the token, the entities
+    read by a transaction begun earlier are not stored. With a
+    shared backend this holds across all processes; the in-process
+    backend of another process keeps serving its entry until it expires.
+    Data models are pickled, callers get their own copy.
+    """
+
+    def __init__(self, resource, backend, schema_version):
+        self.resource = resource
+        self.backend = backend
+        self.schema_version = schema_version
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, *parts):
+        return hashlib.sha256('\n'.join(
+            ('entity', self.resource, self.schema_version) + parts
+        ).encode('utf-8')).hexdigest()
+
+    def _version(self, id):
+        key = self._key('version', id)
+        version = self.backend.get(key)
+        if version is None:
+            version = uuidutils.generate_uuid()
+            self.backend.set(key, version)
+        return version
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_or_load(self, id, load, store=True):
+        """Returns the cached data model of id, or the one load() returns.
+
+        :param id: the id of the entity.
+        :param load: callable reading the data model from the database, it
+                     is cached unless it returns None. It must read the
+                     database, not an instance loaded earlier.
+        :param store: whether to cache what load() returns, False when it
+                      may read a snapshot older than the version token.
+        """
+        version = self._version(id)
+        key = self._key(version, id)
+        value = self.backend.get(key)
+        self._count(value is not None)
+        if value is not None:
+            return pickle.loads(value)
+        data_model = load()
+        if data_model is not None and store:
+            self.backend.set(key, pickle.dumps(data_model,
+                                               pickle.HIGHEST_PROTOCOL))
+        return data_model
+
+    def invalidate(self, id):
+        self.backend.set(self._key('version', id),
+                         uuidutils.generate_uuid())
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+def _schema_version(model_class):
+    data_model = model_class.__data_model__
+    return hashlib.sha256(repr((
+        data_model.__name__, getattr(data_model, '_fields', ()),
+        getattr(data_model, '_relations', ()))).encode('utf-8')
+    ).hexdigest()[:16]
+
+
+def _make_entity_cache_backend():
+    backend = CONF.entity_cache.backend
+    expiration_time = CONF.entity_cache.expiration_time
+    if backend == MEMORY_BACKEND:
+        return LRUBackend(CONF.entity_cache.max_entries,
+                          CONF.entity_cache.max_memory_mb * 2 ** 20,
+                          expiration_time)
+    arguments = dict(argument.split(':', 1)
+                     for argument in CONF.entity_cache.backend_argument)
+    LOG.info('Caching entities in %s.', backend)
+    return DogpileBackend(backend, arguments, expiration_time)
+
+
+def get_entity_cache(model_class):
+    """Returns the entity cache of model_class, or None if not enabled."""
+    resource = model_class.__name__
+    if resource not in CONF.entity_cache.enabled_models:
+        return None
+    entity_cache = _ENTITY_CACHES.get(resource)
+    if entity_cache is None:
+        global _ENTITY_CACHE_BACKEND
+        with _ENTITY_CACHE_LOCK:
+            if _ENTITY_CACHE_BACKEND is None:
+                _ENTITY_CACHE_BACKEND = _make_entity_cache_backend()
+            entity_cache = _ENTITY_CACHES.setdefault(resource, EntityCache(
+                resource, _ENTITY_CACHE_BACKEND,
+                _schema_version(model_class)))
+    return entity_cache
+
+
+def get_entity_cache_stats():
+    """Returns the counters of the entity caches of this process."""
+    backend = _ENTITY_CACHE_BACKEND
+    stats = dict(backend.stats()) if backend is not None else {}
+    for resource, entity_cache in sorted(_ENTITY_CACHES.items()):
+        for name, value in entity_cache.stats().items():
+            stats['{}_{}'.format(resource, name)] = value
+    return stats
+
+
+def reset_entity_caches():
+    """Drops the entity caches, they are rebuilt from the config on use."""
+    global _ENTITY_CACHE_BACKEND
+    with _ENTITY_CACHE_LOCK:
+        _ENTITY_CACHES.clear()
+        _ENTITY_CACHE_BACKEND = None
+
+
+def _make_response_cache():
+    backend = CONF.api_settings.response_cache_backend
+    expiration_time = CONF.api_settings.response_cache_expiration_time
+    if backend == MEMORY_BACKEND:
+        return ResponseCache(MemoryBackend(
+            CONF.api_settings.response_cache_size, expiration_time))
+    arguments = dict(
+        argument.split(':', 1)
+        for argument in CONF.api_settings.response_cache_backend_argument)
+    LOG.info('Caching API responses in %s.', backend)
+    return ResponseCache(DogpileBackend(backend, arguments, expiration_time))
+
+
+def get_response_cache():
+    """Returns the response cache, or None when it is disabled."""
+    global _RESPONSE_CACHE
+    if not CONF.api_settings.response_cache_backend:
+        return None
+    if _RESPONSE_CACHE is None:
+        with _RESPONSE_CACHE_LOCK:
+            if _RESPONSE_CACHE is None:
+                _RESPONSE_CACHE = _make_response_cache()
+    return _RESPONSE_CACHE
+
+
+def reset_response_cache():
+    """Drops the response cache, it is rebuilt from the config on use."""
+    global _RESPONSE_CACHE
+    _RESPONSE_CACHE = None
+
+
+def invalidate_on_commit(session, resource):
+    """Invalidates the cached responses of resource once session commits.
+
+    Invalidating earlier would let a concurrent request cache the data it
+    read before the commit under the new generation.
+    """
+    if get_response_cache() is None:
+        return
+    session.info.setdefault(PENDING_INVALIDATIONS, set()).add(resource)
+
+
+def invalidate_entities_on_commit(session, model_class, ids):
+    """Invalidates the cached entities of ids once session commits."""
+    if get_entity_cache(model_class) is None:
+        return
+    resource = model_class.__name__
+    # Ids generated on flush are unknown to the callers until then.
+    session.info.setdefault(PENDING_ENTITY_INVALIDATIONS, set()).update(
+        (resource, id) for id in ids if id is not None)
+
+
+def is_invalidation_pending(session, model_class, id):
+    """Whether session changed the entity id and did not commit yet.
+
+    The cached entity is outdated for such a session.
+    """
+    pending = session.info.get(PENDING_ENTITY_INVALIDATIONS)
+    return bool(pending) and (model_class.__name__, id) in pending
+
+
+def invalidate_pending(session):
+    """Invalidates what was recorded by the invalidate_*on_commit calls."""
+    pending = session.info.pop(PENDING_INVALIDATIONS, None)
+    response_cache = get_response_cache()
+    if pending and response_cache is not None:
+        for resource in pending:
+            response_cache.invalidate(resource)
+    pending = session.info.pop(PENDING_ENTITY_INVALIDATIONS, None)
+    if pending:
+        for resource, id in pending:
+            entity_cache = _ENTITY_CACHES.get(resource)
+            if entity_cache is not None:
+                entity_cache.invalidate(id)
@@ -54,6 +54,26 @@ api_opts = [
               help=_("The host IP to bind to")),
     cfg.PortOpt('bind_port', default=9876,
                 help=_("The port to bind to")),
+    cfg.IntOpt('workers', min=1,
+               help=_("The number of API worker processes. Defaults to "
+                      "the number of CPUs.")),
+    cfg.IntOpt('threads', default=4, min=1,
+               help=_("The number of request handling threads in each API "
+                      "worker process.")),
+    cfg.IntOpt('keepalive', default=5, min=0,
+               help=_("The time in seconds an idle client connection is "
+                      "kept open. 0 closes connections after each "
+                      "response.")),
+    cfg.IntOpt('backlog', default=2048, min=1,
+               help=_("The maximum number of connections waiting to be "
+                      "accepted by the API.")),
+    cfg.IntOpt('request_timeout', default=60, min=1,
+               help=_("The time in seconds an API worker may spend on a "
+                      "request before it is restarted.")),
+    cfg.IntOpt('graceful_timeout', default=30, min=0,
+               help=_("The time in seconds the API workers are given to "
+                      "finish their current requests when shutting "
+                      "down.")),
     cfg.StrOpt('auth_strategy', default=constants.KEYSTONE,
                choices=[constants.NOAUTH,
                         constants.KEYSTONE,
@@ -72,10 +92,51 @@ api_opts = [
                help=_("The maximum number of items returned in a single "
                       "response. The string 'infinite' or a negative "
                       "integer value means 'no limit'")),
+    cfg.IntOpt('bulk_batch_size', default=500, min=1,
+               help=_("The maximum number of rows inserted, updated or "
+                      "deleted by a single statement of a bulk request.")),
+    cfg.IntOpt('stream_batch_size', default=1000, min=1,
+               help=_("The number of rows fetched from the database at a "
+                      "time when a list is streamed as newline delimited "
+                      "JSON.")),
+    cfg.StrOpt('pagination_cursor_key', secret=True,
+               help=_("Key used to sign the pagination markers handed out "
+                      "in 'next' and 'previous' links. All API processes "
+                      "must share the same key. If unset, a random key is "
+                      "generated per process.")),
     cfg.StrOpt('api_base_uri',
                help=_("Base URI for the API for use in pagination links. "
                       "This will be autodetected from the request if not "
                       "overridden here.")),
+    cfg.StrOpt('response_cache_backend',
+               help=_("Cache the responses of the read endpoints in this "
+                      "backend. 'memory' keeps them in each API process: "
+                      "a change only drops the responses cached by the "
+                      "process that made it, the other processes serve "
+                      "stale responses for up to "
+                      "response_cache_expiration_time, so only use it "
+                      "with a single API worker. Any other value is the "
+                      "name of a dogpile.cache backend, such as "
+                      "dogpile.cache.memcached, shared by all the API "
+                      "processes. Responses are not cached if unset.")),
+    cfg.MultiStrOpt('response_cache_backend_argument', default=[],
+                    secret=True,
+                    help=_("Arguments of the dogpile.cache response cache "
+                           "backend, in the format <argname>:<value>. "
+                           "Repeat the option for each argument.")),
+    cfg.IntOpt('response_cache_expiration_time', default=60, min=1,
+               help=_("The time in seconds a cached response is kept.")),
+    cfg.IntOpt('response_cache_size', default=1024, min=1,
+               help=_("The maximum number of responses kept by the "
+                      "'memory' response cache backend of each API "
+                      "process.")),
+    cfg.IntOpt('policy_cache_size', default=4096, min=0,
+               help=_("The maximum number of policy decisions kept by "
+                      "each API process, 0 disables the cache.")),
+    cfg.IntOpt('policy_cache_expiration_time', default=60, min=1,
+               help=_("The time in seconds a cached policy decision is "
+                      "kept. Decisions are also dropped when the policy "
+                      "rules are reloaded.")),
     cfg.BoolOpt('allow_tls_terminated_listeners', default=True,
                 help=_("Allow users to create TLS Terminated listeners?")),
     cfg.BoolOpt('allow_ping_health_monitors', default=True,
@@ -227,7 +288,8 @@ healthmanager_opts = [
     cfg.StrOpt('heartbeat_key',
                mutable=True,
                help=_('key used to validate amphora sending '
-                      'the message'), secret=True),
+                      'the message. The health manager does not start '
+                      'without it.'), secret=True),
     cfg.IntOpt('heartbeat_timeout',
                default=60,
                help=_('Interval, in seconds, to wait before failing over an '
@@ -237,6 +299,12 @@ healthmanager_opts = [
                help=_('Sleep time between health checks in seconds.')),
     cfg.IntOpt('sock_rlimit', default=0,
                help=_(' sets the value of the heartbeat recv buffer')),
+    cfg.FloatOpt('heartbeat_flush_interval', default=1.0, min=0.01,
+                 help=_('Interval, in seconds, between the writes of the '
+                        'received heartbeats to the database. The '
+                        'heartbeats of an amphora received within an '
+                        'interval are coalesced, only the latest one is '
+                        'written.')),
 
     # Used by the health manager on the amphora
     cfg.ListOpt('controller_ip_port_list',
@@ -249,6 +317,19 @@ healthmanager_opts = [
                default=10,
                mutable=True,
                help=_('Sleep time between sending heartbeats.')),
+    cfg.StrOpt('heartbeat_encoding',
+               default='binary', choices=['json', 'binary'],
+               mutable=True,
+               help=_('Encoding of the heartbeats sent by the amphorae. '
+                      'json is a compressed JSON object, binary a compact '
+                      'msgpack encoding. The health managers accept '
+                      'both.')),
+    cfg.BoolOpt('heartbeat_compression',
+                default=False,
+                mutable=True,
+                help=_('Whether to compress the binary heartbeats. It only '
+                       'makes the heartbeats of amphorae with many '
+                       'listeners smaller.')),
 
     # Used for updating health and stats
     cfg.StrOpt('health_update_driver', default='health_db',
@@ -259,6 +340,12 @@ healthmanager_opts = [
 
 oslo_messaging_opts = [
     cfg.StrOpt('topic'),
+    cfg.IntOpt('cast_batch_size', default=50, min=1,
+               help=_('The maximum number of API casts coalesced into one '
+                      'batch message. 1 sends every cast on its own.')),
+    cfg.FloatOpt('cast_batch_interval', default=0.05, min=0,
+                 help=_('The time in seconds a coalesced API cast may wait '
+                        'for others before its batch message is sent.')),
 ]
 
 haproxy_amphora_opts = [
@@ -278,6 +365,11 @@ haproxy_amphora_opts = [
                default=5,
                help=_('Retry timeout between connection attempts in '
                       'seconds.')),
+    cfg.IntOpt('connection_retry_max_interval',
+               default=30,
+               help=_('Upper bound in seconds of the exponential backoff '
+                      'between connection attempts of the asynchronous '
+                      'REST client.')),
     cfg.IntOpt('active_connection_max_retries',
                default=15,
                help=_('Retry threshold for connecting to active amphorae.')),
@@ -326,6 +418,18 @@ haproxy_amphora_opts = [
     cfg.FloatOpt('rest_request_read_timeout', default=60,
                  help=_("The time in seconds to wait for a REST API "
                         "response.")),
+    cfg.FloatOpt('rest_request_deadline', default=600,
+                 help=_("The total time in seconds the asynchronous REST "
+                        "client spends on a request, retries included.")),
+    cfg.IntOpt('rest_request_pool_size', default=4, min=1,
+               help=_("The maximum number of connections the asynchronous "
+                      "REST client keeps open to a single amphora.")),
+    cfg.FloatOpt('rest_request_keepalive_timeout', default=30,
+                 help=_("The time in seconds an idle connection to an "
+                        "amphora is kept open for reuse.")),
+    cfg.IntOpt('rest_request_concurrency', default=64, min=1,
+               help=_("The maximum number of amphorae queried at the same "
+                      "time by a fan-out of the asynchronous REST client.")),
     cfg.IntOpt('timeout_client_data',
                default=constants.DEFAULT_TIMEOUT_CLIENT_DATA,
                help=_('Frontend client inactivity timeout.')),
@@ -354,6 +458,13 @@ controller_worker_opts = [
     cfg.IntOpt('workers',
                default=1, min=1,
                help='Number of workers for the controller-worker service.'),
+    cfg.ListOpt('agent_endpoints', default=[],
+                help=_('The ip:port of the backend agents queried when a '
+                       'request for agent info does not name any.')),
+    cfg.FloatOpt('agent_request_timeout', default=30,
+                 help=_('The time in seconds one backend agent query, '
+                        'retries included, may take before that agent is '
+                        'reported as failed.')),
     cfg.IntOpt('amp_active_retries',
                default=30,
                help=_('Retry attempts to wait for Amphora to become active')),
@@ -444,6 +555,11 @@ task_flow_opts = [
     cfg.IntOpt('max_workers',
                default=5,
                help=_('The maximum number of workers')),
+    cfg.IntOpt('engine_cache_size',
+               default=32, min=0,
+               help=_('The number of distinct flows whose loaded engines '
+                      'are kept for reuse between requests. 0 disables '
+                      'the reuse.')),
     cfg.BoolOpt('disable_revert', default=False,
                 help=_('If True, disables the controller worker taskflow '
                        'flows from reverting.  This will leave resources in '
@@ -479,6 +595,31 @@ certificate_opts = [
     cfg.BoolOpt('insecure',
                 default=False,
                 help=_('Disable certificate validation on SSL connections ')),
+    cfg.IntOpt('parsed_cert_cache_size', default=1024, min=0,
+               help=_('The maximum number of parsed certificates kept in '
+                      'memory by each process, 0 disables the cache.')),
+    cfg.BoolOpt('cache_private_keys', default=False,
+                help=_('Also keep the decrypted private keys of the '
+                       'certificates in the parsed certificate cache, '
+                       'which saves decrypting them again but holds key '
+                       'material in memory.')),
+    cfg.IntOpt('cert_fetch_concurrency', default=10, min=1,
+               help=_('The maximum number of certificates retrieved from '
+                      'the cert manager at the same time by each process.')),
+    cfg.IntOpt('cert_fetch_timeout', default=30, min=1,
+               help=_('The time in seconds to wait for the retrieval of a '
+                      'certificate from the cert manager.')),
+    cfg.IntOpt('batch_workers', min=1,
+               help=_('The number of processes validating and parsing '
+                      'batches of certificates. Defaults to the number of '
+                      'CPUs.')),
+    cfg.IntOpt('batch_process_threshold', default=16, min=1,
+               help=_('Batches of fewer certificates are validated and '
+                      'parsed in the calling thread instead of the batch '
+                      'processes.')),
+    cfg.FloatOpt('batch_cpu_budget', default=2.0, min=0.01,
+                 help=_('The CPU time in seconds that the validation or the '
+                        'parsing of one certificate of a batch may take.')),
 ]
 
 house_keeping_opts = [
@@ -497,6 +638,15 @@ house_keeping_opts = [
     cfg.IntOpt('load_balancer_expiry_age',
                default=604800,
                help=_('Load balancer expiry age in seconds')),
+    cfg.IntOpt('cleanup_batch_size',
+               default=500, min=1,
+               help=_('The maximum number of expired deleted rows purged '
+                      'in one transaction.')),
+    cfg.FloatOpt('cleanup_batch_interval',
+                 default=0.1, min=0,
+                 help=_('Time in seconds to sleep between two batches of '
+                        'the DB cleanup, leaving the tables to the other '
+                        'transactions.')),
     cfg.IntOpt('cert_interval',
                default=3600,
                help=_('Certificate check interval in seconds')),
@@ -507,7 +657,16 @@ house_keeping_opts = [
     cfg.IntOpt('cert_rotate_threads',
                default=10,
                help=_('Number of threads performing amphora certificate'
-                      ' rotation'))
+                      ' rotation')),
+    cfg.IntOpt('cert_claim_timeout',
+               default=1800, min=1,
+               help=_('Seconds after which a certificate claimed for '
+                      'rotation and not released, for instance because '
+                      'the housekeeping service was restarted meanwhile, '
+                      'is claimed again by the next scan. It must exceed '
+                      'the time a scan takes to rotate its certificates, '
+                      'or some may be rotated twice. The certificates '
+                      'that were not renewed are also retried after it.')),
 ]
 
 keepalived_vrrp_opts = [
@@ -715,6 +874,37 @@ driver_agent_opts = [
                        'will launch these agents at startup.'))
 ]
 
+entity_cache_opts = [
+    cfg.ListOpt('enabled_models', default=[],
+                help=_("Names of the mapped classes, such as TestEntity, "
+                       "whose entities are cached when the repositories "
+                       "get them by id. Only enable it for classes whose "
+                       "data model does not embed other entities, as "
+                       "changes to those do not invalidate the cache.")),
+    cfg.StrOpt('backend', default='memory',
+               help=_("Backend of the entity cache. 'memory' is a LRU "
+                      "cache private to each process, bounded by "
+                      "max_entries and max_memory_mb; other processes may "
+                      "serve a changed entity until it expires. Any other "
+                      "value is the name of a dogpile.cache backend, such "
+                      "as dogpile.cache.memcached, shared by all the "
+                      "processes, or dogpile.cache.memory_pickle as a "
+                      "local stand-in for one.")),
+    cfg.MultiStrOpt('backend_argument', default=[], secret=True,
+                    help=_("Arguments of the dogpile.cache backend, in the "
+                           "format <argname>:<value>. Repeat the option "
+                           "for each argument.")),
+    cfg.IntOpt('expiration_time', default=30, min=1,
+               help=_("The time in seconds an entity is kept in the "
+                      "cache.")),
+    cfg.IntOpt('max_entries', default=10000, min=1,
+               help=_("The maximum number of entries of the 'memory' "
+                      "backend.")),
+    cfg.IntOpt('max_memory_mb', default=32, min=1,
+               help=_("The maximum size in MiB of the pickled entities "
+                      "kept by the 'memory' backend.")),
+]
+
 # Register the configuration options
 cfg.CONF.register_opts(core_opts)
 cfg.CONF.register_opts(api_opts, group='api_settings')
@@ -736,6 +926,7 @@ cfg.CONF.register_opts(neutron_opts, group='neutron')
 cfg.CONF.register_opts(quota_opts, group='quotas')
 cfg.CONF.register_opts(audit_opts, group='audit')
 cfg.CONF.register_opts(driver_agent_opts, group='driver_agent')
+cfg.CONF.register_opts(entity_cache_opts, group='entity_cache')
 
 cfg.CONF.register_opts(local.certgen_opts, group='certificates')
 cfg.CONF.register_opts(local.certmgr_opts, group='certificates')
@@ -744,7 +935,9 @@ cfg.CONF.register_opts(local.certmgr_opts, group='certificates')
 messaging.set_transport_defaults(control_exchange='octavia')
 _SQL_CONNECTION_DEFAULT = 'sqlite:////tmp/starfish.db'
 # Update the default QueuePool parameters. These can be tweaked by the
-# configuration variables - max_pool_size, max_overflow and pool_timeout
+# configuration variables - max_pool_size, max_overflow, pool_timeout and
+# connection_recycle_time. oslo.db pings every connection checked out of
+# the pool and reconnects the dropped ones.
 db_options.set_defaults(cfg.CONF, connection=_SQL_CONNECTION_DEFAULT,
                         max_pool_size=10, max_overflow=20, pool_timeout=10)
 
@@ -294,6 +294,9 @@ SUPPORTED_TASKFLOW_ENGINE_TYPES = ['serial', 'parallel']
 # Task/Flow constants
 ACTIVE_CONNECTIONS = 'active_connections'
 ADDED_PORTS = 'added_ports'
+AGENT_INFO = 'agent_info'
+AGENT_INFOS = 'agent_infos'
+AGENT_TARGET = 'agent_target'
 AMP_DATA = 'amp_data'
 AMPHORA = 'amphora'
 AMPHORA_ID = 'amphora_id'
@@ -426,6 +429,9 @@ UPDATE_L7RULE_FLOW = 'octavia-update-l7rule-flow'
 UPDATE_AMPS_SUBFLOW = 'octavia-update-amps-subflow'
 UPDATE_AMPHORA_CONFIG_FLOW = 'octavia-update-amp-config-flow'
 
+GET_BACKEND_INFO_FLOW = 'starfish-get-backend-info-flow'
+GET_BACKEND_INFO_SUBFLOW = 'starfish-get-backend-info-subflow'
+
 POST_MAP_AMP_TO_LB_SUBFLOW = 'octavia-post-map-amp-to-lb-subflow'
 CREATE_AMP_FOR_LB_SUBFLOW = 'octavia-create-amp-for-lb-subflow'
 AMP_PLUG_NET_SUBFLOW = 'octavia-plug-net-subflow'
@@ -466,6 +472,8 @@ APPLY_QOS_AMP = 'octavia-amp-apply-qos'
 UPDATE_AMPHORA_VIP_DATA = 'ocatvia-amp-update-vip-data'
 GET_AMP_NETWORK_CONFIG = 'octavia-amp-get-network-config'
 AMP_POST_VIP_PLUG = 'octavia-amp-post-vip-plug'
+GET_VERSION_INFO = 'starfish-get-version-info'
+GATHER_AGENT_INFO = 'starfish-gather-agent-info'
 GENERATE_SERVER_PEM_TASK = 'GenerateServerPEMTask'
 AMPHORA_CONFIG_UPDATE_TASK = 'AmphoraConfigUpdateTask'
 
@@ -637,6 +645,7 @@ CENTOS = 'centos'
 
 # Pagination, sorting, filtering values
 APPLICATION_JSON = 'application/json'
+APPLICATION_NDJSON = 'application/x-ndjson'
 PAGINATION_HELPER = 'pagination_helper'
 ASC = 'asc'
 DESC = 'desc'
@@ -28,17 +28,30 @@ class Context(common_context.RequestContext):
         if project_id:
             kwargs['tenant'] = project_id
 
-        super(Context, self).__init__(**kwargs)
+        super(Context, self).__init__(user_id=user_id, **kwargs)
 
         # self.is_admin = (policy.get_enforcer().check_is_admin(self) or
         #                  CONF.api_settings.auth_strategy == constants.NOAUTH)
 
     @property
     def session(self):
+        """The database session of the request.
+
+        It is opened on first use, in a transaction that lasts until
+        DBSessionHook commits or rolls it back once the request is done.
+        """
         if self._session is None:
-            self._session = db_api.get_session()
+            self._session = db_api.get_session(autocommit=False)
         return self._session
 
+    def release_session(self):
+        """Detaches the session from the context and returns it.
+
+        :returns: the session, or None if the request never used one.
+        """
+        session, self._session = self._session, None
+        return session
+
     @property
     def project_id(self):
         return self.tenant
@@ -14,71 +14,143 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import operator
 import re
 
 import six
 from sqlalchemy.orm import collections
 
 
+def _make_getter(fields):
+    """Returns a function reading fields off an object as a tuple."""
+    if len(fields) > 1:
+        return operator.attrgetter(*fields)
+    if fields:
+        single = operator.attrgetter(fields[0])
+
+        def getter(obj):
+            return (single(obj),)
+    else:
+        def getter(obj):
+            return ()
+    return getter
+
+
+def _merge_fields(bases, dct, name):
+    merged = []
+    for base in bases:
+        for field in getattr(base, name, ()):
+            if field not in merged:
+                merged.append(field)
+    inherited = len(merged)
+    for field in dct.get(name, ()):
+        if field not in merged:
+            merged.append(field)
+    return tuple(merged), tuple(merged[inherited:])
+
+
+def _placeholder(value):
+    if isinstance(value, BaseDataModel):
+        return None
+    if isinstance(value, list):
+        return ()
+    return value
+
+
+class DataModelMeta(type):
+    """Builds data model classes from their declared fields.
+
+    Each class lists the attributes it adds in _fields, and those of them
+    that hold other data models (or lists of them) in _relations. They
+    become its __slots__, so instances carry no __dict__, and both tuples
+    are extended with the inherited fields. The plain fields are read in
+    one go by an attrgetter kept per class.
+    """
+
+    def __new__(mcs, name, bases, dct):
+        fields, own_fields = _merge_fields(bases, dct, '_fields')
+        relations, _ = _merge_fields(bases, dct, '_relations')
+        dct['__slots__'] = own_fields
+        dct['_fields'] = fields
+        dct['_relations'] = tuple(field for field in fields
+                                  if field in relations)
+        dct['_plain_fields'] = tuple(field for field in fields
+                                     if field not in relations)
+        dct['_get_plain_values'] = staticmethod(
+            _make_getter(dct['_plain_fields']))
+        dct['_get_values'] = staticmethod(_make_getter(fields))
+        return super(DataModelMeta, mcs).__new__(mcs, name, bases, dct)
+
+
+@six.add_metaclass(DataModelMeta)
 class BaseDataModel(object):
+    _fields = ()
+    _relations = ()
+
     def to_dict(self, calling_classes=None, recurse=False, **kwargs):
         """Converts a data model to a dictionary."""
-        calling_classes = calling_classes or []
-        ret = {}
-        for attr in self.__dict__:
-            if attr.startswith('_') or not kwargs.get(attr, True):
-                continue
-            value = self.__dict__[attr]
-            if attr == 'tags':
-                # tags is a list, it doesn't need recurse
-                ret[attr] = value
-                continue
-
-            if recurse:
-                if isinstance(getattr(self, attr), list):
-                    ret[attr] = []
+        ret = dict(zip(self._plain_fields, self._get_plain_values(self)))
+        if self._relations:
+            self._add_relations(ret, set(calling_classes or ()), recurse)
+        for attr, keep in kwargs.items():
+            if not keep:
+                ret.pop(attr, None)
+        return ret
+
+    def _to_dict(self, calling_classes, recurse):
+        ret = dict(zip(self._plain_fields, self._get_plain_values(self)))
+        if self._relations:
+            self._add_relations(ret, calling_classes, recurse)
+        return ret
+
+    def _add_relations(self, ret, calling_classes, recurse):
+        # calling_classes holds the classes of the models being converted
+        # up the current path. It is shared by the whole traversal, each
+        # level adds its class before descending and removes it afterwards.
+        cls = type(self)
+        expand = recurse and cls not in calling_classes
+        if expand:
+            calling_classes.add(cls)
+        try:
+            for attr in self._relations:
+                value = getattr(self, attr)
+                if isinstance(value, BaseDataModel):
+                    ret[attr] = (value._to_dict(calling_classes, recurse)
+                                 if expand else None)
+                elif isinstance(value, list):
+                    if not recurse:
+                        ret[attr] = []
+                        continue
+                    items = []
                     for item in value:
                         if isinstance(item, BaseDataModel):
-                            if type(self) not in calling_classes:
-                                ret[attr].append(
-                                    item.to_dict(calling_classes=(
-                                            calling_classes + [type(self)]),
-                                        recurse=recurse))
-                            else:
-                                # TODO(rm_work): Is the idea that if this list
-                                #  contains ANY BaseDataModel, that all of them
-                                #  are data models, and we may as well quit?
-                                #  Or, were we supposed to append a `None` for
-                                #  each one? I assume the former?
-                                ret[attr] = None
+                            if not expand:
+                                # A list holding data models is dropped as
+                                # a whole when it cannot be expanded.
+                                items = None
                                 break
+                            items.append(item._to_dict(calling_classes,
+                                                       recurse))
                         else:
-                            ret[attr].append(item)
-                elif isinstance(getattr(self, attr), BaseDataModel):
-                    if type(self) not in calling_classes:
-                        ret[attr] = value.to_dict(
-                            calling_classes=calling_classes + [type(self)],
-                            recurse=recurse)
-                    else:
-                        ret[attr] = None
-                elif six.PY2 and isinstance(value, six.text_type):
-                    ret[attr.encode('utf8')] = value.encode('utf8')
-                else:
-                    ret[attr] = value
-            else:
-                if isinstance(getattr(self, attr), BaseDataModel):
-                    ret[attr] = None
-                elif isinstance(getattr(self, attr), list):
-                    ret[attr] = []
+                            items.append(item)
+                    ret[attr] = items
                 else:
                     ret[attr] = value
-
-        return ret
+        finally:
+            if expand:
+                calling_classes.discard(cls)
 
     def __eq__(self, other):
-        if isinstance(other, self.__class__):
-            return self.to_dict() == other.to_dict()
-        return False
+        if not isinstance(other, self.__class__):
+            return False
+        if self._get_plain_values(self) != other._get_plain_values(other):
+            return False
+        # Without recursion, to_dict renders related data models as None
+        # and lists as [], so only the other relation values count.
+        return ([_placeholder(getattr(self, attr))
+                 for attr in self._relations] ==
+                [_placeholder(getattr(other, attr))
+                 for attr in other._relations])
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -130,10 +202,7 @@ class BaseDataModel(object):
         if mykey == key:
             return self
         _visited_nodes.append(mykey)
-        attr_names = [attr_name for attr_name in dir(self)
-                      if not attr_name.startswith('_')]
-        for attr_name in attr_names:
-            attr = getattr(self, attr_name)
+        for attr in self._get_values(self):
             if isinstance(attr, BaseDataModel):
                 result = attr._find_in_graph(
                     key, _visited_nodes=_visited_nodes)
@@ -159,6 +228,8 @@ class BaseDataModel(object):
 
 
 class TestEntity(BaseDataModel):
+    _fields = ('id', 'name', 'manage_ip', 'created_at', 'updated_at')
+
     def __init__(self, id=None, name=None, manage_ip=None,
                  created_at=None, updated_at=None):
         self.id = id
@@ -168,6 +239,62 @@ class TestEntity(BaseDataModel):
         self.updated_at = updated_at
 
 
+class CertificateExpiry(BaseDataModel):
+    _fields = ('id', 'project_id', 'cert_ref', 'expiration', 'rotating',
+               'claimed_at', 'created_at', 'updated_at')
+
+    def __init__(self, id=None, project_id=None, cert_ref=None,
+                 expiration=None, rotating=False, claimed_at=None,
+                 created_at=None, updated_at=None):
+        self.id = id
+        self.project_id = project_id
+        self.cert_ref = cert_ref
+        self.expiration = expiration
+        self.rotating = rotating
+        self.claimed_at = claimed_at
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+class AmphoraHealth(BaseDataModel):
+    _fields = ('amphora_id', 'last_update', 'busy')
+
+    def __init__(self, amphora_id=None, last_update=None, busy=False):
+        self.amphora_id = amphora_id
+        self.last_update = last_update
+        self.busy = busy
+
+
+class ListenerStatistics(BaseDataModel):
+    _fields = ('listener_id', 'amphora_id', 'bytes_in', 'bytes_out',
+               'active_connections', 'total_connections', 'request_errors')
+
+    def __init__(self, listener_id=None, amphora_id=None, bytes_in=0,
+                 bytes_out=0, active_connections=0, total_connections=0,
+                 request_errors=0):
+        self.listener_id = listener_id
+        self.amphora_id = amphora_id
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.active_connections = active_connections
+        self.total_connections = total_connections
+        self.request_errors = request_errors
+
+
+class TLSContainer(BaseDataModel):
+    _fields = ('id', 'primary_cn', 'certificate', 'private_key', 'passphrase',
+               'intermediates')
+
+    def __init__(self, id=None, primary_cn=None, certificate=None,
+                 private_key=None, passphrase=None, intermediates=None):
+        self.id = id
+        self.primary_cn = primary_cn
+        self.certificate = certificate
+        self.private_key = private_key
+        self.passphrase = passphrase
+        self.intermediates = intermediates or []
+
+
 # class TestEntity1(BaseDataModel):
 #     def __init__(self):
 #         pass
@@ -182,6 +309,12 @@ class LoadBalancer(BaseDataModel):
     !!! This data model is for reference!!!
     !!! Not For Using !!!
     """
+    _fields = ('id', 'project_id', 'name', 'description',
+               'provisioning_status', 'operating_status', 'enabled', 'vip',
+               'vrrp_group', 'topology', 'listeners', 'amphorae', 'pools',
+               'server_group_id', 'created_at', 'updated_at', 'provider',
+               'tags', 'flavor_id', 'availability_zone')
+    _relations = ('vip', 'vrrp_group', 'listeners', 'amphorae', 'pools')
 
     def __init__(self, id=None, project_id=None, name=None, description=None,
                  provisioning_status=None, operating_status=None, enabled=None,
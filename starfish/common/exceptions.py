@@ -138,6 +138,11 @@ class MisMatchedKey(OctaviaException):
     message = _("Key and x509 certificate do not match")
 
 
+class CertificateCPUBudgetExceeded(OctaviaException):
+    message = _("Processing the certificate took more than %(budget)s "
+                "seconds of CPU time")
+
+
 class CertificateRetrievalException(APIException):
     msg = _('Could not retrieve certificate: %(ref)s')
     code = 400
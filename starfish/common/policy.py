@@ -13,6 +13,10 @@
 """Policy Engine For Octavia."""
 
 import sys
+import threading
+import time
+
+import cachetools
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_policy import policy as oslo_policy
@@ -21,9 +25,22 @@ from oslo_utils import excutils
 from starfish import policies
 from starfish.common import config, exceptions
 
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 OCTAVIA_POLICY = None
 
+# Credentials that change with every request and that rules do not use,
+# they are left out of the decision cache keys.
+_PER_REQUEST_CREDENTIALS = frozenset(['auth_token', 'request_id',
+                                      'global_request_id'])
+_MISSING = object()
+# The attributes of the targets that the rules look at, authorize_many
+# evaluates an action once per distinct combination of them.
+TARGET_ATTRIBUTES = ('project_id', 'owner')
+# How often the decision cache looks for changed policy files, in seconds.
+# Looking for them takes longer than evaluating most rules.
+_RULES_CHECK_INTERVAL = 1
+
 
 def get_enforcer():
     global OCTAVIA_POLICY
@@ -64,11 +81,80 @@ class Policy(oslo_policy.Enforcer):
                               rules from config file.
         """
 
+        self._decisions = None
+        self._decisions_lock = threading.Lock()
+        # Bumped whenever the rules change, decisions made under former
+        # rules are not cached.
+        self._rules_generation = 0
+        self._rules_check_due = 0
+        if CONF.api_settings.policy_cache_size:
+            self._decisions = cachetools.TTLCache(
+                CONF.api_settings.policy_cache_size,
+                CONF.api_settings.policy_cache_expiration_time)
+
         super(Policy, self).__init__(conf, policy_file, rules, default_rule,
                                      use_conf, overwrite)
 
         self.register_defaults(policies.list_rules())
 
+    def _clear_decisions(self):
+        with self._decisions_lock:
+            self._rules_generation += 1
+            if self._decisions is not None:
+                self._decisions.clear()
+
+    def set_rules(self, rules, overwrite=True, use_conf=False):
+        # Also called when load_rules finds that a policy file changed.
+        super(Policy, self).set_rules(rules, overwrite=overwrite,
+                                      use_conf=use_conf)
+        self._clear_decisions()
+
+    def register_default(self, default):
+        super(Policy, self).register_default(default)
+        self._clear_decisions()
+
+    @staticmethod
+    def _freeze(values):
+        """Returns a hashable copy of a dict of credentials or target.
+
+        Lists, such as the roles, are sorted. Returns None when a value
+        cannot be part of a cache key.
+        """
+        frozen = []
+        for key, value in values.items():
+            if key in _PER_REQUEST_CREDENTIALS:
+                continue
+            if isinstance(value, (list, tuple, set, frozenset)):
+                if not all(isinstance(item, str) for item in value):
+                    return None
+                value = tuple(sorted(value))
+            elif not isinstance(value, (str, int, float, bool,
+                                        type(None))):
+                return None
+            frozen.append((key, value))
+        return tuple(sorted(frozen))
+
+    def _decide(self, key, decide):
+        """Returns the cached decision for key, or the one decide makes."""
+        if key is None or self._decisions is None:
+            return decide()
+        now = time.monotonic()
+        if now >= self._rules_check_due:
+            self._rules_check_due = now + _RULES_CHECK_INTERVAL
+            # Reloads the rules, and drops the decisions, if a policy file
+            # changed.
+            self.load_rules()
+        with self._decisions_lock:
+            result = self._decisions.get(key, _MISSING)
+            generation = self._rules_generation
+        if result is not _MISSING:
+            return result
+        result = decide()
+        with self._decisions_lock:
+            if generation == self._rules_generation:
+                self._decisions[key] = result
+        return result
+
     def authorize(self, action, target, context, do_raise=True, exc=None):
         """Verifies that the action is valid on the target in this context.
 
@@ -107,9 +193,18 @@ class Policy(oslo_policy.Enforcer):
         if not exc:
             exc = exceptions.PolicyForbidden
 
+        frozen_target = self._freeze(target)
+        frozen_credentials = self._freeze(credentials)
+        key = None
+        if frozen_target is not None and frozen_credentials is not None:
+            key = (action, frozen_target, frozen_credentials)
+
         try:
-            return super(Policy, self).authorize(
-                action, target, credentials, do_raise=do_raise, exc=exc)
+            result = self._decide(key, lambda: super(Policy, self).authorize(
+                action, target, credentials, do_raise=False))
+            if do_raise and not result:
+                raise exc()
+            return result
         except oslo_policy.PolicyNotRegistered:
             with excutils.save_and_reraise_exception():
                 LOG.exception('Policy not registered')
@@ -120,12 +215,49 @@ class Policy(oslo_policy.Enforcer):
                           'credentials %(credentials)s',
                           {'action': action, 'credentials': credentials})
 
+    def authorize_many(self, action, targets, context):
+        """Verifies that the action is valid on each of the targets.
+
+        Meant to filter listings: the targets are grouped by their
+        TARGET_ATTRIBUTES and the action is evaluated once per group, so
+        the rules must not depend on other attributes of the targets. An
+        admin context is allowed everything without evaluating the action,
+        and the objects of a single project cost one evaluation.
+
+        :param action: the action, as for authorize.
+        :param targets: an iterable of target dicts, it is consumed lazily.
+        :param context: The oslo context for this request.
+        :returns: an iterator of a boolean per target, in order.
+        """
+        if context.is_admin or self.check_is_admin(context):
+            return (True for _ in targets)
+        return self._authorize_groups(action, targets, context)
+
+    def _authorize_groups(self, action, targets, context):
+        decisions = {}
+        for target in targets:
+            group = tuple(target.get(attr) for attr in TARGET_ATTRIBUTES)
+            allowed = decisions.get(group)
+            if allowed is None:
+                group_target = {
+                    attr: value for attr, value in zip(TARGET_ATTRIBUTES,
+                                                       group)
+                    if value is not None}
+                allowed = decisions[group] = bool(self.authorize(
+                    action, group_target, context, do_raise=False))
+            yield allowed
+
     def check_is_admin(self, context):
         """Does roles contains 'admin' role according to policy setting.
 
         """
         credentials = context.to_dict()
-        return self.enforce('context_is_admin', credentials, credentials)
+        frozen_credentials = self._freeze(credentials)
+        key = None
+        if frozen_credentials is not None:
+            key = ('context_is_admin', frozen_credentials)
+        return self._decide(key, lambda: self.enforce(
+            'context_is_admin', credentials, credentials))
 
     def get_rules(self):
         return self.rules
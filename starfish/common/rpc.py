@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 import oslo_messaging as messaging
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -64,3 +66,58 @@ def get_server(target, endpoints, executor='threading',
 
 def create_transport(url):
     return messaging.get_rpc_transport(cfg.CONF, url=url)
+
+
+class CastBatcher(object):
+    """Coalesces the casts of one RPC method into batch casts.
+
+    cast() only buffers its keyword arguments. They are sent together, as
+    the items argument of a single cast of batch_method, once max_size of
+    them are buffered or max_delay seconds after the first of them was,
+    whichever comes first. The broker thus carries one message per batch
+    instead of one per call.
+    """
+
+    def __init__(self, client, batch_method, max_size=None, max_delay=None,
+                 context=None):
+        self.client = client
+        self.batch_method = batch_method
+        self.max_size = (max_size or
+                         cfg.CONF.oslo_messaging.cast_batch_size)
+        self.max_delay = (cfg.CONF.oslo_messaging.cast_batch_interval
+                          if max_delay is None else max_delay)
+        self.context = context or {}
+        self._items = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def cast(self, **kwargs):
+        with self._lock:
+            self._items.append(kwargs)
+            if len(self._items) < self.max_size and self.max_delay > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            items = self._take()
+        self._send(items)
+
+    def flush(self):
+        """Sends the buffered casts now, if there are any."""
+        with self._lock:
+            items = self._take()
+        if items:
+            self._send(items)
+
+    def _take(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        return items
+
+    def _send(self, items):
+        LOG.debug('Casting %(method)s with %(count)d coalesced items.',
+                  {'method': self.batch_method, 'count': len(items)})
+        self.client.cast(self.context, self.batch_method, items=items)
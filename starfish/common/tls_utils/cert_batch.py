@@ -0,0 +1,210 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Validation and parsing of batches of certificates.
+
+Parsing certificates, and PKCS7 bundles in particular, is CPU bound and
+holds the GIL, so large batches are handed to a pool of processes and the
+calling process stays responsive. Batches smaller than [certificates]
+batch_process_threshold are not worth the round trips and are processed in
+the calling thread.
+
+Results are yielded in the order of the certificates, as soon as they and
+the ones before them are done. Each certificate may use up to
+[certificates] batch_cpu_budget seconds of CPU time; the batch processes
+interrupt the ones that take longer, the calling thread can only report
+them once they are done.
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import logging as std_logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from starfish.common import exceptions
+from starfish.common.tls_utils import cert_parser
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+# The result of one certificate of a batch, error is the exception raised
+# by its validation or parsing, if any.
+CertResult = collections.namedtuple('CertResult', ['value', 'error'])
+ParsedCert = collections.namedtuple(
+    'ParsedCert', ['cn', 'dns_names', 'expiration', 'intermediates'])
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+class _CPUBudgetExpired(BaseException):
+    """Raised by the profiling timer.
+
+    Not an Exception, so that the 'except Exception' blocks of cert_parser
+    do not turn it into an UnreadableCert.
+    """
+
+
+def _on_cpu_budget_expired(signum, frame):
+    raise _CPUBudgetExpired()
+
+
+def _init_worker():
+    # The errors are returned to the caller, which decides what to log.
+    std_logging.getLogger().addHandler(std_logging.NullHandler())
+    signal.signal(signal.SIGPROF, _on_cpu_budget_expired)
+
+
+def _run_in_worker(func, cpu_budget, item):
+    signal.setitimer(signal.ITIMER_PROF, cpu_budget)
+    try:
+        try:
+            return func(item)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+    except _CPUBudgetExpired:
+        # Also when the timer fired while it was being disarmed.
+        raise exceptions.CertificateCPUBudgetExceeded(budget=cpu_budget)
+
+
+def _run_in_thread(func, cpu_budget, item):
+    start = time.thread_time()
+    try:
+        value = func(item)
+    except Exception as e:
+        return CertResult(None, e)
+    if time.thread_time() - start > cpu_budget:
+        return CertResult(None, exceptions.CertificateCPUBudgetExceeded(
+            budget=cpu_budget))
+    return CertResult(value, None)
+
+
+def _get_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                # Forking a threaded API process is unsafe.
+                _EXECUTOR = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=CONF.certificates.batch_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker)
+    return _EXECUTOR
+
+
+def shutdown():
+    """Stops the batch processes, they are started again on use."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _discard_broken_executor(executor):
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is executor:
+            LOG.warning('A certificate batch process died, restarting the '
+                        'batch processes.')
+            _EXECUTOR = None
+    executor.shutdown(wait=False)
+
+
+def _map(func, items):
+    cpu_budget = CONF.certificates.batch_cpu_budget
+    items = iter(items)
+    head = list(itertools.islice(
+        items, CONF.certificates.batch_process_threshold))
+    if len(head) < CONF.certificates.batch_process_threshold:
+        for item in head:
+            yield _run_in_thread(func, cpu_budget, item)
+        return
+
+    executor = _get_executor()
+    # Enough certificates in flight to keep every process busy while the
+    # results are consumed, without queueing the whole batch.
+    window = 2 * (CONF.certificates.batch_workers or os.cpu_count() or 1)
+    pending = collections.deque()
+    try:
+        for item in itertools.chain(head, items):
+            pending.append(executor.submit(_run_in_worker, func, cpu_budget,
+                                           item))
+            if len(pending) >= window:
+                yield _get_result(executor, pending.popleft())
+        while pending:
+            yield _get_result(executor, pending.popleft())
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _get_result(executor, future):
+    try:
+        return CertResult(future.result(), None)
+    except concurrent.futures.process.BrokenProcessPool as e:
+        _discard_broken_executor(executor)
+        return CertResult(None, e)
+    except Exception as e:
+        return CertResult(None, e)
+
+
+def _validate(item):
+    return cert_parser.validate_cert(**item)
+
+
+def _parse(item):
+    certificate = item['certificate']
+    if isinstance(certificate, str):
+        certificate = certificate.encode('utf-8')
+    cert_info = cert_parser._parse_cert_info(certificate)
+    cn, dns_names = cert_info.host_names
+    intermediates = item.get('intermediates')
+    if intermediates:
+        intermediates = list(cert_parser.get_intermediates_pems(
+            intermediates))
+    return ParsedCert(cn=cn, dns_names=list(dns_names),
+                      expiration=cert_info.expiration,
+                      intermediates=intermediates or [])
+
+
+def validate_many(certificates):
+    """Validates a batch of certificates, see cert_parser.validate_cert.
+
+    :param certificates: an iterable of dicts of the arguments of
+                         validate_cert: certificate and optionally
+                         private_key, private_key_passphrase and
+                         intermediates.
+    :returns: an iterator of a CertResult per certificate, in order. The
+              value is True for the valid ones.
+    """
+    return _map(_validate, certificates)
+
+
+def parse_many(certificates):
+    """Parses a batch of certificates and their intermediates.
+
+    :param certificates: an iterable of dicts with the PEM certificate and
+                         optionally its PEM or PKCS7 intermediates.
+    :returns: an iterator of a CertResult per certificate, in order. The
+              value is a ParsedCert, with the intermediates as a list of
+              PEM certificates.
+    """
+    return _map(_parse, certificates)
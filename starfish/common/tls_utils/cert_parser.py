@@ -14,11 +14,19 @@
 #    under the License.
 
 import base64
+import binascii
+import collections
+import concurrent.futures
 import hashlib
+import re
 import six
+import threading
+
+import cachetools
 from cryptography import x509
 from cryptography.hazmat import backends
 from cryptography.hazmat.primitives import serialization
+from oslo_config import cfg
 from oslo_context import context as oslo_context
 from oslo_log import log as logging
 from pyasn1.codec.der import decoder as der_decoder
@@ -33,8 +41,130 @@ X509_END = b'-----END CERTIFICATE-----'
 PKCS7_BEG = b'-----BEGIN PKCS7-----'
 PKCS7_END = b'-----END PKCS7-----'
 
+_LF = ord('\n')
+_CR = frozenset(b'\r')
+# What str.strip() removes around the PKCS7 markers, line feeds aside.
+_WHITESPACE = frozenset(b' \t\x0b\x0c\r\x1c\x1d\x1e\x1f')
+_PEM_CHUNK_SIZE = 65536
+
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
+# What is parsed out of a certificate; host_names is a (cn, dns_names)
+# tuple so that cached entries can be shared.
+CertInfo = collections.namedtuple('CertInfo', ['host_names', 'expiration'])
+
+_PARSED_CERT_CACHE = None
+_PARSED_CERT_CACHE_LOCK = threading.Lock()
+_FETCH_EXECUTOR = None
+_FETCH_EXECUTOR_LOCK = threading.Lock()
+
+
+class _LRUCache(cachetools.LRUCache):
+    """LRUCache counting its evictions."""
+
+    def __init__(self, maxsize):
+        super(_LRUCache, self).__init__(maxsize)
+        self.evictions = 0
+
+    def popitem(self):
+        item = super(_LRUCache, self).popitem()
+        self.evictions += 1
+        return item
+
+
+class ParsedCertCache(object):
+    """Bounded cache of parsed certificates.
+
+    The same certificates are parsed again and again, for every listener
+    and SNI container conversion. Their host names and expiration are kept
+    in a LRU keyed by the SHA-256 of the PEM bytes. Decrypted private keys
+    are only kept, keyed by the SHA-256 of the encrypted key and its
+    passphrase, when cache_private_keys is set.
+    """
+
+    def __init__(self, max_entries, cache_private_keys=False):
+        self._certs = _LRUCache(max_entries)
+        self._keys = _LRUCache(max_entries) if cache_private_keys else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, lru, key, parse):
+        with self._lock:
+            value = lru.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+        # Parsing is slow, concurrent misses of one entry may both parse.
+        value = parse()
+        with self._lock:
+            lru[key] = value
+        return value
+
+    def get_cert_info(self, certificate_pem):
+        return self._get(self._certs,
+                         hashlib.sha256(certificate_pem).digest(),
+                         lambda: _parse_cert_info(certificate_pem))
+
+    def get_private_key(self, private_key, passphrase=None):
+        if self._keys is None:
+            return prepare_private_key(private_key, passphrase)
+        digest = hashlib.sha256(private_key)
+        digest.update(b'\0' + (passphrase or b''))
+        return self._get(self._keys, digest.digest(),
+                         lambda: prepare_private_key(private_key,
+                                                     passphrase))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            evictions = self._certs.evictions
+            entries = len(self._certs)
+            if self._keys is not None:
+                evictions += self._keys.evictions
+                entries += len(self._keys)
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': evictions, 'entries': entries}
+
+
+def get_parsed_cert_cache():
+    """Returns the parsed certificate cache, or None when it is disabled."""
+    global _PARSED_CERT_CACHE
+    if not CONF.certificates.parsed_cert_cache_size:
+        return None
+    if _PARSED_CERT_CACHE is None:
+        with _PARSED_CERT_CACHE_LOCK:
+            if _PARSED_CERT_CACHE is None:
+                _PARSED_CERT_CACHE = ParsedCertCache(
+                    CONF.certificates.parsed_cert_cache_size,
+                    CONF.certificates.cache_private_keys)
+    return _PARSED_CERT_CACHE
+
+
+def reset_parsed_cert_cache():
+    """Drops the parsed certificate cache, it is rebuilt on use."""
+    global _PARSED_CERT_CACHE
+    _PARSED_CERT_CACHE = None
+
+
+def _get_cert_info(certificate):
+    if isinstance(certificate, six.string_types):
+        certificate = certificate.encode('utf-8')
+    parsed_cert_cache = get_parsed_cert_cache()
+    if parsed_cert_cache is None:
+        return _parse_cert_info(certificate)
+    return parsed_cert_cache.get_cert_info(certificate)
+
+
+def _get_private_key(private_key, passphrase=None):
+    parsed_cert_cache = get_parsed_cert_cache()
+    if parsed_cert_cache is None:
+        return prepare_private_key(private_key, passphrase)
+    return parsed_cert_cache.get_private_key(private_key, passphrase)
+
 
 def validate_cert(certificate, private_key=None,
                   private_key_passphrase=None, intermediates=None):
@@ -131,26 +261,13 @@ def _prepare_x509_cert(cert=None):
 def _split_x509s(xstr):
     """Split the input string into individual x509 text blocks
 
-    :param xstr: A large multi x509 certificate blcok
+    :param xstr: A large multi x509 certificate blcok, as bytes, str, an
+                 mmap or a file object
     :returns: A list of strings where each string represents an
     X509 pem block surrounded by BEGIN CERTIFICATE,
     END CERTIFICATE block tags
     """
-    curr_pem_block = []
-    inside_x509 = False
-    if type(xstr) == six.binary_type:
-        xstr = xstr.decode('utf-8')
-    for line in xstr.replace("\r", "").split("\n"):
-        if inside_x509:
-            curr_pem_block.append(line)
-            if line == X509_END.decode('utf-8'):
-                yield six.b("\n".join(curr_pem_block))
-                curr_pem_block = []
-                inside_x509 = False
-            continue
-        if line == X509_BEG.decode('utf-8'):
-            curr_pem_block.append(line)
-            inside_x509 = True
+    return _scan_pem_blocks(xstr, X509_BEG, X509_END, _CR, _get_pem_block)
 
 
 def _parse_pkcs7_bundle(pkcs7):
@@ -181,37 +298,106 @@ def _read_pem_blocks(data):
     This method is based on pyasn1-modules.pem.readPemBlocksFromFile, but
     eliminates the need to operate on a file handle and is a generator.
 
-    :param data: A long text string containing one or more PEM-encoded blocks
-    :param markers: A tuple containing the test strings that indicate the
-                    start and end of the PEM-encoded blocks
+    :param data: One or more PEM-encoded blocks, as bytes, str, an mmap or
+                 a file object
     :returns: An ASN1 substrate suitable for DER decoding.
 
     """
-    stSpam, stHam, stDump = 0, 1, 2
-    startMarkers = {PKCS7_BEG.decode('utf-8'): 0}
-    stopMarkers = {PKCS7_END.decode('utf-8'): 0}
-    idx = -1
-    state = stSpam
-    if type(data) == six.binary_type:
-        data = data.decode('utf-8')
-    for certLine in data.replace('\r', '').split('\n'):
-        if not certLine:
-            continue
-        certLine = certLine.strip()
-        if state == stSpam:
-            if certLine in startMarkers:
-                certLines = []
-                idx = startMarkers[certLine]
-                state = stHam
-                continue
-        if state == stHam:
-            if certLine in stopMarkers and stopMarkers[certLine] == idx:
-                state = stDump
-            else:
-                certLines.append(certLine)
-        if state == stDump:
-            yield b''.join([base64.b64decode(x) for x in certLines])
-            state = stSpam
+    return _scan_pem_blocks(data, PKCS7_BEG, PKCS7_END, _WHITESPACE,
+                            _decode_pem_block)
+
+
+def _find_marker_line(buf, marker, pos, stop, skip):
+    """Finds the first line of buf[pos:stop] made of marker.
+
+    The marker may be surrounded by the bytes of skip on its line.
+
+    :returns: (line start, marker start, marker end), or None
+    """
+    while True:
+        start = buf.find(marker, pos, stop)
+        if start < 0:
+            return None
+        line_start = start
+        while line_start > 0 and buf[line_start - 1] in skip:
+            line_start -= 1
+        end = start + len(marker)
+        line_end = end
+        while line_end < stop and buf[line_end] in skip:
+            line_end += 1
+        if ((line_start == 0 or buf[line_start - 1] == _LF) and
+                (line_end == stop or buf[line_end] == _LF)):
+            return line_start, start, end
+        pos = start + 1
+
+
+def _scan_pem_region(buf, begin, end, skip, stop, convert):
+    """Yields convert(buf, ...) for each block of buf[:stop].
+
+    buf starts at the start of a line and buf[:stop] ends at the end of
+    one. Returns where the next region starts: the line of a block that
+    is not terminated yet, or stop.
+    """
+    pos = 0
+    while True:
+        found = _find_marker_line(buf, begin, pos, stop, skip)
+        if found is None:
+            return stop
+        line_start, begin_start, begin_end = found
+        found = _find_marker_line(buf, end, begin_end, stop, skip)
+        if found is None:
+            return line_start
+        _, end_start, end_end = found
+        yield convert(buf, begin_start, begin_end, end_start, end_end)
+        pos = end_end
+
+
+def _scan_pem_blocks(data, begin, end, skip, convert):
+    """Yields the PEM blocks of data, one at a time.
+
+    The markers are searched for in the bytes of data, which are neither
+    decoded nor split into lines. File objects are read in chunks, only
+    the block being read is kept in memory.
+    """
+    if isinstance(data, six.text_type):
+        data = data.encode('utf-8')
+    if not hasattr(data, 'read'):
+        yield from _scan_pem_region(data, begin, end, skip, len(data),
+                                    convert)
+        return
+
+    buf = bytearray()
+    while True:
+        chunk = data.read(_PEM_CHUNK_SIZE)
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode('utf-8')
+        buf += chunk
+        # Only complete lines are scanned until the end of the file.
+        stop = len(buf) if not chunk else buf.rfind(b'\n') + 1
+        resume = yield from _scan_pem_region(buf, begin, end, skip, stop,
+                                             convert)
+        if not chunk:
+            return
+        del buf[:resume]
+
+
+def _get_pem_block(buf, begin_start, begin_end, end_start, end_end):
+    return bytes(buf[begin_start:end_end]).replace(b'\r', b'')
+
+
+# Padding followed by more base64, the decoder would stop at the padding.
+_MID_BODY_PADDING = re.compile(br'=[\s=]*[^\s=]')
+
+
+def _decode_pem_block(buf, begin_start, begin_end, end_start, end_end):
+    if _MID_BODY_PADDING.search(buf, begin_end, end_start):
+        # Each line was encoded on its own, they are decoded one by one.
+        return b''.join(
+            base64.b64decode(line.strip()) for line in
+            bytes(buf[begin_end:end_start]).split(b'\n') if line.strip())
+    # Line breaks and other whitespace are skipped by the decoder.
+    with memoryview(buf) as view, view[begin_end:end_start] as body:
+        return binascii.a2b_base64(body)
 
 
 def _get_certs_from_pkcs7_substrate(substrate):
@@ -253,42 +439,41 @@ def get_host_names(certificate):
               certificate, and 'dns_names' is a list of dNSNames
               (possibly empty) from the SubjectAltNames of the certificate.
     """
-    if isinstance(certificate, six.string_types):
-        certificate = certificate.encode('utf-8')
+    cn, dns_names = _get_cert_info(certificate).host_names
+    return {'cn': cn, 'dns_names': list(dns_names)}
+
+
+def get_cert_expiration(certificate_pem):
+    """Extract the expiration date from the Pem encoded X509 certificate
+
+    :param certificate_pem: Certificate in PEM format
+    :returns: Expiration date of certificate_pem
+    """
+    return _get_cert_info(certificate_pem).expiration
+
+
+def _parse_cert_info(certificate):
+    """Parses the host names and the expiration of a PEM certificate.
+
+    :param certificate: A PEM encoded certificate, as bytes
+    :returns: A CertInfo
+    """
     try:
         cert = x509.load_pem_x509_certificate(certificate,
                                               backends.default_backend())
         cn = cert.subject.get_attributes_for_oid(x509.OID_COMMON_NAME)[0]
-        host_names = {
-            'cn': cn.value.lower(),
-            'dns_names': []
-        }
+        dns_names = ()
         try:
             ext = cert.extensions.get_extension_for_oid(
                 x509.OID_SUBJECT_ALTERNATIVE_NAME
             )
-            host_names['dns_names'] = ext.value.get_values_for_type(
-                x509.DNSName)
+            dns_names = tuple(ext.value.get_values_for_type(x509.DNSName))
         except x509.ExtensionNotFound:
             LOG.debug("%s extension not found",
                       x509.OID_SUBJECT_ALTERNATIVE_NAME)
 
-        return host_names
-    except Exception:
-        LOG.exception('Unreadable Certificate.')
-        raise exceptions.UnreadableCert
-
-
-def get_cert_expiration(certificate_pem):
-    """Extract the expiration date from the Pem encoded X509 certificate
-
-    :param certificate_pem: Certificate in PEM format
-    :returns: Expiration date of certificate_pem
-    """
-    try:
-        cert = x509.load_pem_x509_certificate(certificate_pem,
-                                              backends.default_backend())
-        return cert.not_valid_after
+        return CertInfo(host_names=(cn.value.lower(), dns_names),
+                        expiration=cert.not_valid_after)
     except Exception:
         LOG.exception('Unreadable Certificate.')
         raise exceptions.UnreadableCert
@@ -342,42 +527,71 @@ def build_pem(tls_container):
     return b'\n'.join(pem) + b'\n'
 
 
+def _get_fetch_executor():
+    global _FETCH_EXECUTOR
+    if _FETCH_EXECUTOR is None:
+        with _FETCH_EXECUTOR_LOCK:
+            if _FETCH_EXECUTOR is None:
+                _FETCH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=CONF.certificates.cert_fetch_concurrency,
+                    thread_name_prefix='cert-fetch')
+    return _FETCH_EXECUTOR
+
+
+def _fetch_tls_container(cert_mngr, context, ref):
+    return _map_cert_tls_container(
+        cert_mngr.get_cert(context, ref, check_only=True))
+
+
 def load_certificates_data(cert_mngr, obj, context=None):
     """Load TLS certificate data from the listener/pool.
 
-    return TLS_CERT and SNI_CERTS
+    The default certificate and the SNI certificates are retrieved
+    concurrently, at most [certificates] cert_fetch_concurrency at a time
+    in the process, and each of them is waited for up to [certificates]
+    cert_fetch_timeout seconds. The SNI certificates are returned in the
+    order of obj.sni_containers.
+
+    return TLS_CERT, SNI_CERTS and the EXPIRATIONS of the certificates by
+    reference, for the certificate expiry index
+    :raises CertificateRetrievalException: naming the first certificate,
+                                           in that order, that could not
+                                           be retrieved.
     """
-    tls_cert = None
-    sni_certs = []
     if not context:
         context = oslo_context.RequestContext(project_id=obj.project_id)
 
+    refs = []
     if obj.tls_certificate_id:
-        try:
-            tls_cert = _map_cert_tls_container(
-                cert_mngr.get_cert(context,
-                                   obj.tls_certificate_id,
-                                   check_only=True))
-        except Exception as e:
-            LOG.warning('Unable to retrieve certificate: %s due to %s.',
-                        obj.tls_certificate_id, str(e))
-            raise exceptions.CertificateRetrievalException(
-                ref=obj.tls_certificate_id)
-
+        refs.append(obj.tls_certificate_id)
     if hasattr(obj, 'sni_containers') and obj.sni_containers:
-        for sni_cont in obj.sni_containers:
+        refs.extend(sni_cont.tls_container_id
+                    for sni_cont in obj.sni_containers)
+
+    executor = _get_fetch_executor()
+    futures = [executor.submit(_fetch_tls_container, cert_mngr, context, ref)
+               for ref in refs]
+    containers = []
+    try:
+        for ref, future in zip(refs, futures):
             try:
-                cert_container = _map_cert_tls_container(
-                    cert_mngr.get_cert(context,
-                                       sni_cont.tls_container_id,
-                                       check_only=True))
+                containers.append(future.result(
+                    timeout=CONF.certificates.cert_fetch_timeout))
             except Exception as e:
                 LOG.warning('Unable to retrieve certificate: %s due to %s.',
-                            sni_cont.tls_container_id, str(e))
-                raise exceptions.CertificateRetrievalException(
-                    ref=sni_cont.tls_container_id)
-            sni_certs.append(cert_container)
-    return {'tls_cert': tls_cert, 'sni_certs': sni_certs}
+                            ref, str(e) or type(e).__name__)
+                raise exceptions.CertificateRetrievalException(ref=ref)
+    finally:
+        # Nothing is returned once a retrieval failed, drop the queued ones.
+        for future in futures[len(containers):]:
+            future.cancel()
+
+    # Read from the parsed certificate cache, mapping parsed them already.
+    expirations = {ref: get_cert_expiration(container.certificate)
+                   for ref, container in zip(refs, containers)}
+    tls_cert = containers.pop(0) if obj.tls_certificate_id else None
+    return {'tls_cert': tls_cert, 'sni_certs': containers,
+            'expirations': expirations}
 
 
 def _map_cert_tls_container(cert):
@@ -404,11 +618,11 @@ def _map_cert_tls_container(cert):
         # break backwards compatibility with existing loadbalancers.
         id=hashlib.sha1(certificate).hexdigest(),  # nosec
         primary_cn=get_primary_cn(certificate),
-        private_key=prepare_private_key(private_key, private_key_passphrase),
+        private_key=_get_private_key(private_key, private_key_passphrase),
         certificate=certificate,
         intermediates=intermediates)
 
 
 def get_primary_cn(tls_cert):
     """Returns primary CN for Certificate."""
-    return get_host_names(tls_cert)['cn']
+    return _get_cert_info(tls_cert).host_names[0]
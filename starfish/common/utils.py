@@ -23,6 +23,7 @@ import hashlib
 import netaddr
 import six
 import socket
+import threading
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
@@ -32,6 +33,9 @@ CONF = cfg.CONF
 
 LOG = logging.getLogger(__name__)
 
+_DRIVERS = {}
+_DRIVERS_LOCK = threading.Lock()
+
 
 def get_hostname():
     return socket.gethostname()
@@ -47,14 +51,39 @@ def base64_sha1_string(string_to_hash):
     return b64_str.decode('UTF-8')
 
 
+def load_driver(namespace, name):
+    """Returns the stevedore driver name of namespace, loaded once.
+
+    Looking up entry points and instantiating a driver is slow, so each
+    driver is loaded on first use and the instance is then shared by the
+    whole process. Drivers loaded this way must be safe to use from
+    several threads.
+    """
+    key = (namespace, name)
+    driver = _DRIVERS.get(key)
+    if driver is None:
+        with _DRIVERS_LOCK:
+            driver = _DRIVERS.get(key)
+            if driver is None:
+                driver = stevedore_driver.DriverManager(
+                    namespace=namespace,
+                    name=name,
+                    invoke_on_load=True
+                ).driver
+                _DRIVERS[key] = driver
+    return driver
+
+
+def clear_drivers():
+    """Forgets the drivers loaded by load_driver."""
+    with _DRIVERS_LOCK:
+        _DRIVERS.clear()
+
+
 def get_network_driver():
     CONF.import_group('controller_worker', 'octavia.common.config')
-    network_driver = stevedore_driver.DriverManager(
-        namespace='octavia.network.drivers',
-        name=CONF.controller_worker.network_driver,
-        invoke_on_load=True
-    ).driver
-    return network_driver
+    return load_driver('octavia.network.drivers',
+                       CONF.controller_worker.network_driver)
 
 
 def is_ipv6(ip_address):
@@ -0,0 +1,166 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import datetime
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_context import context as oslo_context
+from oslo_log import log as logging
+
+from starfish.common import utils
+from starfish.common.tls_utils import cert_parser
+from starfish.db import api as db_api
+from starfish.db import repositories as repo
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+class DatabaseCleanup(object):
+    """Purges the deleted resources that expired.
+
+    The rows are deleted in batches of [house_keeping] cleanup_batch_size,
+    one short transaction each, with a pause of cleanup_batch_interval
+    between them so that a large purge never holds the locks of a table
+    for long. The last id purged of each repository is kept in memory as
+    a watermark: when a batch fails, the next purge of this process
+    resumes past it, and a purge that completes starts over from the
+    first id the next time. The watermark is not persisted, after a
+    restart the purge starts over from the first id, which only costs
+    scanning again the ids purged already.
+    """
+
+    # Repository attribute of Repositories and [house_keeping] option of
+    # the expiry age of the resources purged. Only the repositories that
+    # exist are purged.
+    EXPIRY_AGES = (('amphora', 'amphora_expiry_age'),
+                   ('load_balancer', 'load_balancer_expiry_age'))
+
+    def __init__(self, exit_event=None):
+        self.repositories = repo.Repositories()
+        self.exit_event = exit_event or threading.Event()
+        self.watermarks = {}
+
+    def cleanup(self):
+        """Purges the expired resources of every repository.
+
+        :returns: the number of rows purged.
+        """
+        purged = 0
+        for name, expiry_age_opt in self.EXPIRY_AGES:
+            repository = getattr(self.repositories, name, None)
+            if repository is None or self.exit_event.is_set():
+                continue
+            purged += self.purge(name, repository, datetime.timedelta(
+                seconds=getattr(CONF.house_keeping, expiry_age_opt)))
+        return purged
+
+    def purge(self, name, repository, exp_age):
+        """Purges the expired resources of a repository, batch by batch.
+
+        :returns: the number of rows purged.
+        """
+        batch_size = CONF.house_keeping.cleanup_batch_size
+        purged = 0
+        start = time.monotonic()
+        while not self.exit_event.is_set():
+            deleted, last_id = repository.purge_deleted_expiring(
+                db_api.get_session(), exp_age, batch_size,
+                after_id=self.watermarks.get(name))
+            purged += deleted
+            if last_id is None:
+                self.watermarks.pop(name, None)
+                break
+            self.watermarks[name] = last_id
+            self.exit_event.wait(CONF.house_keeping.cleanup_batch_interval)
+        if purged:
+            elapsed = time.monotonic() - start
+            LOG.info('Purged %(count)d expired %(name)s rows in '
+                     '%(elapsed).1f seconds (%(rate).0f rows/s).',
+                     {'count': purged, 'name': name, 'elapsed': elapsed,
+                      'rate': purged / elapsed if elapsed else purged})
+        return purged
+
+
+class CertRotation(object):
+    """Rotates the certificates about to expire.
+
+    The expirations are read from the certificate expiry index, filled in
+    when the certificates are loaded, so a scan only reads the expiring
+    certificates. Rotating a certificate reloads it from the cert manager,
+    where it is expected to have been renewed, and indexes its new
+    expiration.
+    """
+
+    def __init__(self):
+        self.cert_expiry_repo = repo.CertificateExpiryRepository()
+
+    def rotate(self):
+        """Rotates the certificates expiring within the expiry buffer.
+
+        :returns: the number of certificates rotated.
+        """
+        expires_before = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=CONF.house_keeping.cert_expiry_buffer)
+        session = db_api.get_session()
+        certs = self.cert_expiry_repo.claim_expiring(session, expires_before)
+        if not certs:
+            return 0
+        LOG.info('Rotating %d certificates expiring before %s.', len(certs),
+                 expires_before)
+        with futures.ThreadPoolExecutor(
+                max_workers=CONF.house_keeping.cert_rotate_threads
+        ) as executor:
+            rotations = [
+                executor.submit(self.rotate_cert, cert, expires_before)
+                for cert in certs]
+        for cert, rotation in zip(certs, rotations):
+            if rotation.exception() is not None:
+                LOG.error('Failed to release certificate %s, it is claimed '
+                          'until its claim times out.', cert.cert_ref,
+                          exc_info=rotation.exception())
+        return len(certs)
+
+    def rotate_cert(self, cert_expiry, expires_before):
+        """Reloads an expiring certificate and releases its claim.
+
+        A certificate that is not renewed, or could not be reloaded, stays
+        claimed: it is retried once its claim times out, after
+        [house_keeping] cert_claim_timeout, rather than at every scan.
+
+        :param cert_expiry: the CertificateExpiry claimed by rotate.
+        :param expires_before: the end of the expiry buffer of the scan.
+        """
+        try:
+            cert_manager = utils.load_driver('octavia.cert_manager',
+                                             CONF.certificates.cert_manager)
+            context = oslo_context.RequestContext(
+                project_id=cert_expiry.project_id)
+            cert = cert_manager.get_cert(context, cert_expiry.cert_ref,
+                                         check_only=True)
+            expiration = cert_parser.get_cert_expiration(
+                cert.get_certificate())
+        except Exception:
+            LOG.exception('Failed to rotate certificate %s, retrying in %d '
+                          'seconds.', cert_expiry.cert_ref,
+                          CONF.house_keeping.cert_claim_timeout)
+            return
+        if expiration < expires_before:
+            LOG.warning('Certificate %s expires at %s and was not renewed, '
+                        'retrying in %d seconds.', cert_expiry.cert_ref,
+                        expiration, CONF.house_keeping.cert_claim_timeout)
+            return
+        self.cert_expiry_repo.release(db_api.get_session(), cert_expiry.id,
+                                      expiration)
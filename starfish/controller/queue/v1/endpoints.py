@@ -29,16 +29,23 @@ LOG = logging.getLogger(__name__)
 class Endpoints(object):
     # API version history:
     #   1.0 - Initial version.
+    #   1.1 - Adds get_agent_info_batch.
     target = messaging.Target(
         namespace=constants.RPC_NAMESPACE_CONTROLLER_AGENT,
-        version='1.0')
+        version='1.1')
 
     def __init__(self):
         self.worker = controller_worker.ControllerWorker()
 
-    def get_agent_info(self, context):
+    def get_agent_info(self, context, agent_targets=None):
         LOG.info('Getting the backend agent info ...')
-        self.worker.get_agent_info()
+        return self.worker.get_agent_info(agent_targets)
+
+    def get_agent_info_batch(self, context, items):
+        LOG.info('Getting the backend agent info for %d coalesced '
+                 'requests ...', len(items))
+        return self.worker.get_agent_info_many(
+            [item.get('agent_targets') for item in items])
 
     # def create_load_balancer(self, context, load_balancer_id,
     #                          flavor=None, availability_zone=None):
@@ -1,9 +1,12 @@
+import functools
+
 from oslo_config import cfg
 from oslo_log import log as logging
 from taskflow.listeners import logging as tf_logging
 
 from starfish.amphorae.driver_exceptions import exceptions
 from starfish.common import base_taskflow
+from starfish.common import constants
 from starfish.controller.worker.v1.flows import test_entity_flows
 
 LOG = logging.getLogger(__name__)
@@ -28,10 +31,62 @@ class ControllerWorker(base_taskflow.BaseTaskFlowEngine):
         self._te_flows = test_entity_flows.TestEntityFlows()
         super(ControllerWorker, self).__init__()
 
-    def get_agent_info(self):
-        get_info_tf = self._taskflow_load(
-            self._te_flows.get_backend_info_flow(),
-            store={}
-        )
-        with tf_logging.DynamicLoggingListener(get_info_tf, log=LOG):
-            get_info_tf.run()
+    @staticmethod
+    def _get_default_agent_targets():
+        agent_targets = []
+        for endpoint in CONF.controller_worker.agent_endpoints:
+            ip, port = endpoint.rsplit(':', 1)
+            agent_targets.append({'ip': ip.strip('[]'), 'port': port})
+        return agent_targets
+
+    def get_agent_info(self, agent_targets=None):
+        """Gets the version info of backend agents, querying them at once.
+
+        :param agent_targets: list of {'ip': ..., 'port': ...} of the agents,
+                              defaults to [controller_worker] agent_endpoints
+        :returns: a list of {'ip', 'port', 'info', 'error'}, one per agent,
+                  where error is set for the agents that could not be
+                  queried.
+        """
+        if agent_targets is None:
+            agent_targets = self._get_default_agent_targets()
+
+        agent_count = len(agent_targets)
+        with self._taskflow_load_cached(
+                (constants.GET_BACKEND_INFO_FLOW, agent_count),
+                functools.partial(self._te_flows.get_backend_info_flow,
+                                  agent_count),
+                store=self._te_flows.get_backend_info_store(agent_targets)
+        ) as get_info_tf:
+            LOG.info("TaskFlow for get backend info started.")
+            with tf_logging.DynamicLoggingListener(get_info_tf, log=LOG):
+                get_info_tf.run()
+            return get_info_tf.storage.fetch(constants.AGENT_INFOS)
+
+    def get_agent_info_many(self, agent_target_lists):
+        """Answers several agent info requests with a single flow.
+
+        The agents of all the requests are queried once each, in one run
+        of the backend info flow, and the results are handed back to every
+        request that named them.
+
+        :param agent_target_lists: one list of agent targets per request,
+                                   or None for the default agents
+        :returns: one list of results, as returned by get_agent_info, per
+                  request
+        """
+        agent_target_lists = [
+            self._get_default_agent_targets() if targets is None else targets
+            for targets in agent_target_lists]
+        unique_targets = {}
+        for targets in agent_target_lists:
+            for target in targets:
+                unique_targets.setdefault(
+                    (target['ip'], str(target['port'])), target)
+
+        infos = self.get_agent_info(list(unique_targets.values()))
+        infos_by_target = {(info['ip'], str(info['port'])): info
+                           for info in infos}
+        return [[infos_by_target[(target['ip'], str(target['port']))]
+                 for target in targets]
+                for targets in agent_target_lists]
@@ -1,7 +1,8 @@
 from oslo_log import log as logging
 from taskflow.patterns import linear_flow
+from taskflow.patterns import unordered_flow
 
-# from starfish.common import constants
+from starfish.common import constants
 # from starfish.controller.worker.v1.tasks import database_tasks
 from starfish.controller.worker.v1.tasks import amphora_driver_tasks
 
@@ -10,9 +11,43 @@ LOG = logging.getLogger(__name__)
 
 class TestEntityFlows(object):
 
-    def get_backend_info_flow(self):
-        get_info_flow = linear_flow.Flow('starfish-get-backend-info-flow')
-        get_info_flow.add(amphora_driver_tasks.GetVersionInfo())
+    @staticmethod
+    def _agent_target_key(index):
+        return '{}-{}'.format(constants.AGENT_TARGET, index)
+
+    def get_backend_info_store(self, agent_targets):
+        """Returns the store feeding agent_targets to a backend info flow."""
+        return {self._agent_target_key(index): agent_target
+                for index, agent_target in enumerate(agent_targets)}
+
+    def get_backend_info_flow(self, agent_count):
+        """Creates a flow to get the version info of many backend agents.
+
+        The agents are queried from an unordered flow, so the parallel
+        engine runs the queries concurrently, bounded by the workers of
+        the engine's executor. The results end up in the flow storage under
+        constants.AGENT_INFOS, in the order of the agents.
+
+        The flow only depends on the number of agents, the agents
+        themselves are read from the store built by get_backend_info_store,
+        so that a loaded engine can be reused for other agents.
+
+        :param agent_count: the number of agents to query
+        :returns: The flow for getting the backend info
+        """
+        get_info_flow = linear_flow.Flow(constants.GET_BACKEND_INFO_FLOW)
+        fan_out_flow = unordered_flow.Flow(constants.GET_BACKEND_INFO_SUBFLOW)
+        provides = []
+        for index in range(agent_count):
+            agent_info = '{}-{}'.format(constants.AGENT_INFO, index)
+            fan_out_flow.add(amphora_driver_tasks.GetVersionInfo(
+                name='{}-{}'.format(constants.GET_VERSION_INFO, index),
+                rebind={constants.AGENT_TARGET: self._agent_target_key(index)},
+                provides=agent_info))
+            provides.append(agent_info)
+        get_info_flow.add(fan_out_flow)
+        get_info_flow.add(amphora_driver_tasks.GatherAgentInfo(
+            name=constants.GATHER_AGENT_INFO, requires=provides,
+            provides=constants.AGENT_INFOS))
         # get_info_flow.add(database_tasks.DoSomething)
-        LOG.info("TaskFlow for get backend info started.")
         return get_info_flow
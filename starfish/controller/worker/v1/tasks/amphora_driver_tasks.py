@@ -1,8 +1,9 @@
 from oslo_config import cfg
 from oslo_log import log as logging
-from stevedore import driver as stevedore_driver
 from taskflow import task
 
+from starfish.common import utils
+
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
@@ -12,25 +13,58 @@ class BaseAmphoraTask(task.Task):
 
     def __init__(self, **kwargs):
         super(BaseAmphoraTask, self).__init__(**kwargs)
-        self.amphora_driver = stevedore_driver.DriverManager(
-            namespace='starfish.amphora.drivers',
-            name='amphora_rest_driver',
-            invoke_on_load=True
-        ).driver
+        self.amphora_driver = utils.load_driver('starfish.amphora.drivers',
+                                                'amphora_rest_driver')
 
 
 class GetVersionInfo(BaseAmphoraTask):
     """Task to Get backend agent version info"""
 
-    def execute(self, *args, **kwargs):
-        """Excute get backend info in an amphora"""
+    def execute(self, agent_target):
+        """Excute get backend info in an amphora
 
-        try:
-            # bind the ip and port of the remote agent host
-            bind_ip_port = {'ip': '192.168.240.147',
-                            'port': '9443'}
-            info = self.amphora_driver.get_version_info(bind_ip_port=bind_ip_port)
-            LOG.info('Get info as %s ', info)
+        A failure is reported in the result instead of being raised, so
+        that when many agents are queried together the answers of the
+        healthy ones are kept.
 
+        :param agent_target: the ip and port of the remote agent host
+        :returns: the target's ip and port with its version info, or the
+                  error that prevented getting it.
+        """
+        result = {'ip': agent_target['ip'], 'port': agent_target['port'],
+                  'info': None, 'error': None}
+        try:
+            result['info'] = self.amphora_driver.get_version_info(
+                bind_ip_port=agent_target,
+                timeout=CONF.controller_worker.agent_request_timeout)
+            LOG.info('Get info as %s ', result['info'])
         except Exception as e:
-            LOG.error('Failed to get info from backend agent')
+            LOG.error('Failed to get info from backend agent '
+                      '%(ip)s:%(port)s: %(error)s',
+                      {'ip': agent_target['ip'],
+                       'port': agent_target['port'], 'error': e})
+            result['error'] = str(e) or e.__class__.__name__
+        return result
+
+
+class GatherAgentInfo(task.Task):
+    """Task to collect the results of a fan-out of GetVersionInfo tasks"""
+
+    def execute(self, **agent_infos):
+        """Returns the agent infos in the order the agents were given.
+
+        :param agent_infos: the results of the GetVersionInfo tasks, keyed
+                            by the names they provide, which end with the
+                            index of their agent.
+        """
+        infos = [agent_infos[key] for key in
+                 sorted(agent_infos, key=lambda k: int(k.rsplit('-', 1)[1]))]
+        failed = [info for info in infos if info['error'] is not None]
+        if failed:
+            LOG.warning('%(failed)d of %(total)d backend agents could not '
+                        'be queried: %(agents)s',
+                        {'failed': len(failed), 'total': len(infos),
+                         'agents': ', '.join(
+                             '{ip}:{port}'.format(**info)
+                             for info in failed)})
+        return infos
@@ -13,25 +13,118 @@
 #    under the License.
 
 import contextlib
+import threading
 import time
 
 from oslo_config import cfg
 from oslo_db.sqlalchemy import session as db_session
 from oslo_log import log as logging
 from oslo_utils import excutils
+import sqlalchemy as sa
 from sqlalchemy.sql.expression import select
 
 LOG = logging.getLogger(__name__)
 _FACADE = None
+_POOL_METRICS = None
+# Key of the connection record info holding the start of its connect.
+_CONNECT_START = 'starfish_connect_start'
+
+
+class PoolMetrics(object):
+    """Counts the connection pool activity of an engine.
+
+    connections_opened only grows when the pool has to open a new DBAPI
+    connection, so under a steady load it stays flat unless connections
+    churn. connect_time measures how long opening those connections took,
+    from the dialect's do_connect to the pool's connect events; a pool that
+    is too small shows up as checked_out_peak reaching its size.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.connections_invalidated = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.checked_out_peak = 0
+        self.connect_time_total = 0.0
+        self.connect_time_max = 0.0
+
+        sa.event.listen(engine, 'do_connect', self._on_do_connect)
+        sa.event.listen(engine, 'connect', self._on_connect)
+        sa.event.listen(engine, 'close', self._on_close)
+        sa.event.listen(engine, 'invalidate', self._on_invalidate)
+        sa.event.listen(engine, 'checkout', self._on_checkout)
+        sa.event.listen(engine, 'checkin', self._on_checkin)
+
+    def _on_do_connect(self, dialect, connection_record, cargs, cparams):
+        connection_record.info[_CONNECT_START] = time.monotonic()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        start = connection_record.info.pop(_CONNECT_START, None)
+        with self._lock:
+            self.connections_opened += 1
+            if start is not None:
+                elapsed = time.monotonic() - start
+                self.connect_time_total += elapsed
+                self.connect_time_max = max(self.connect_time_max, elapsed)
+
+    def _on_close(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connections_closed += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.connections_invalidated += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record,
+                     connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.checked_out_peak = max(self.checked_out_peak,
+                                        self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out -= 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'pool': self.engine.pool.status(),
+                'connections_opened': self.connections_opened,
+                'connections_closed': self.connections_closed,
+                'connections_invalidated': self.connections_invalidated,
+                'checkouts': self.checkouts,
+                'checked_out': self.checked_out,
+                'checked_out_peak': self.checked_out_peak,
+                'connect_time_total': self.connect_time_total,
+                'connect_time_max': self.connect_time_max,
+                'connect_time_mean': (
+                    self.connect_time_total / self.connections_opened
+                    if self.connections_opened else 0.0),
+            }
 
 
 def _create_facade_lazily():
-    global _FACADE
+    global _FACADE, _POOL_METRICS
     if _FACADE is None:
-        _FACADE = db_session.EngineFacade.from_config(cfg.CONF, sqlite_fk=True)
+        facade = db_session.EngineFacade.from_config(cfg.CONF,
+                                                     sqlite_fk=True)
+        _POOL_METRICS = PoolMetrics(facade.get_engine())
+        _FACADE = facade
     return _FACADE
 
 
+def get_pool_metrics():
+    """Returns the connection pool metrics of the API engine as a dict."""
+    _create_facade_lazily()
+    return _POOL_METRICS.as_dict()
+
+
 def get_engine():
     facade = _create_facade_lazily()
     return facade.get_engine()
@@ -20,39 +20,174 @@ from sqlalchemy.ext import declarative
 from sqlalchemy.orm import collections
 
 
+# Attributes making up the unique key of each mapped class, used to detect
+# nodes that were already converted while building a data model graph.
+_UNIQUE_KEY_ATTRS = {}
+for _name in ('Member', 'Pool', 'LoadBalancer', 'Listener', 'Amphora',
+              'L7Policy', 'L7Rule', 'Flavor', 'FlavorProfile',
+              'AvailabilityZoneProfile', 'TestEntity',
+              'CertificateExpiry'):
+    _UNIQUE_KEY_ATTRS[_name] = ('id',)
+for _name in ('SessionPersistence', 'HealthMonitor'):
+    _UNIQUE_KEY_ATTRS[_name] = ('pool_id',)
+_UNIQUE_KEY_ATTRS['ListenerStatistics'] = ('listener_id', 'amphora_id')
+_UNIQUE_KEY_ATTRS['ListenerCidr'] = ('listener_id', 'cidr')
+for _name in ('VRRPGroup', 'Vip'):
+    _UNIQUE_KEY_ATTRS[_name] = ('load_balancer_id',)
+_UNIQUE_KEY_ATTRS['AmphoraHealth'] = ('amphora_id',)
+_UNIQUE_KEY_ATTRS['SNI'] = ('listener_id', 'tls_container_id')
+_UNIQUE_KEY_ATTRS['Quotas'] = ('project_id',)
+_UNIQUE_KEY_ATTRS['AvailabilityZone'] = ('name',)
+
+_CONVERTERS = {}
+
+
+def _make_unique_key_func(class_name):
+    """Returns a function computing the unique key of a class instance."""
+    try:
+        key_attrs = _UNIQUE_KEY_ATTRS[class_name]
+    except KeyError:
+        def _not_implemented(obj):
+            raise NotImplementedError
+        return _not_implemented
+
+    if len(key_attrs) == 1:
+        key_attr = key_attrs[0]
+
+        def _unique_key(obj):
+            return class_name + getattr(obj, key_attr)
+    else:
+        def _unique_key(obj):
+            return class_name + ''.join(getattr(obj, attr)
+                                        for attr in key_attrs)
+    return _unique_key
+
+
+def get_converter(model_class):
+    """Returns the data model converter for a mapped class.
+
+    The converter is built on first use and cached for the lifetime of the
+    process.
+    """
+    converter = _CONVERTERS.get(model_class)
+    if converter is None:
+        converter = DataModelConverter(model_class)
+        _CONVERTERS[model_class] = converter
+    return converter
+
+
+class DataModelConverter(object):
+    """Converts instances of one mapped class into data models.
+
+    Everything that the reflective conversion used to discover on every
+    call is computed once from the SQLAlchemy mapper: the column names, the
+    public relationships (plus the public python properties such as
+    ``tags``) and the unique-key function of the class.
+    """
+
+    def __init__(self, model_class):
+        mapper = sa.inspect(model_class)
+        self.model_class = model_class
+        self.data_model = model_class.__data_model__
+        self.columns = tuple(column.name
+                             for column in model_class.__table__.columns)
+        relationships = [rel.key for rel in mapper.relationships
+                         if not rel.key.startswith('_')]
+        properties = set()
+        for klass in model_class.__mro__:
+            for name, value in vars(klass).items():
+                if isinstance(value, property) and not name.startswith('_'):
+                    properties.add(name)
+        self.attributes = tuple(relationships + sorted(properties))
+        self.unique_key = _make_unique_key_func(model_class.__name__)
+        self._selections = {}
+
+    def _select(self, fields):
+        """Returns the columns and attributes to convert out of fields."""
+        if fields is None:
+            return self.columns, self.attributes
+        selection = self._selections.get(fields)
+        if selection is None:
+            selection = (
+                tuple(column for column in self.columns if column in fields),
+                tuple(attr for attr in self.attributes if attr in fields))
+            self._selections[fields] = selection
+        return selection
+
+    def convert(self, obj, _graph_nodes=None, depth=None, fields=None):
+        """Converts obj to a data model graph.
+
+        :param obj: An instance of the mapped class of this converter.
+        :param _graph_nodes: Used only for internal recursion. Contains a
+                             dictionary of all data models in the generated
+                             graph keyed by their unique key.
+        :param depth: How many levels of relationships to follow. None
+                      follows all of them, 0 only copies the column values.
+        :param fields: Optional frozenset of the columns and attributes of
+                       obj to convert, the others are left unset in the
+                       data model and never read, so that columns deferred
+                       by the query are not loaded. Children are converted
+                       whole.
+        """
+        if not self.data_model:
+            raise NotImplementedError
+        if _graph_nodes is None:
+            _graph_nodes = {}
+        columns, attributes = self._select(fields)
+        dm_kwargs = {}
+        for column in columns:
+            dm_kwargs[column] = getattr(obj, column)
+        # Appending early, as any unique ID should be defined already and
+        # the rest of this object will get filled out more fully later on,
+        # and we need to add ourselves to the _graph_nodes before we
+        # attempt recursion.
+        dm_self = self.data_model(**dm_kwargs)
+        _graph_nodes[self.unique_key(dm_self)] = dm_self
+        if depth == 0:
+            return dm_self
+        child_depth = None if depth is None else depth - 1
+
+        for attr_name in attributes:
+            attr = getattr(obj, attr_name)
+            if isinstance(attr, OctaviaBase):
+                setattr(dm_self, attr_name,
+                        self._convert_child(attr, _graph_nodes, child_depth))
+            elif isinstance(attr, (collections.InstrumentedList, list)):
+                listref = []
+                for item in attr:
+                    if isinstance(item, OctaviaBase):
+                        listref.append(self._convert_child(
+                            item, _graph_nodes, child_depth))
+                    else:
+                        listref.append(item)
+                setattr(dm_self, attr_name, listref)
+        return dm_self
+
+    @staticmethod
+    def _convert_child(child, _graph_nodes, depth):
+        converter = get_converter(child.__class__)
+        # If this child is already in the graph node list, just reference it
+        # there and don't recurse.
+        node = _graph_nodes.get(converter.unique_key(child))
+        if node is not None:
+            return node
+        return converter.convert(child, _graph_nodes=_graph_nodes,
+                                 depth=depth)
+
+
 class OctaviaBase(models.ModelBase):
     __data_model__ = None
 
     @staticmethod
     def _get_unique_key(obj):
         """Returns a unique key for passed object for data model building."""
-        # First handle all objects with their own ID, then handle subordinate
-        # objects.
-        if obj.__class__.__name__ in ['Member', 'Pool', 'LoadBalancer',
-                                      'Listener', 'Amphora', 'L7Policy',
-                                      'L7Rule', 'Flavor', 'FlavorProfile',
-                                      'AvailabilityZoneProfile', 'TestEntity']:
-            return obj.__class__.__name__ + obj.id
-        if obj.__class__.__name__ in ['SessionPersistence', 'HealthMonitor']:
-            return obj.__class__.__name__ + obj.pool_id
-        if obj.__class__.__name__ in ['ListenerStatistics']:
-            return obj.__class__.__name__ + obj.listener_id + obj.amphora_id
-        if obj.__class__.__name__ in ['ListenerCidr']:
-            return obj.__class__.__name__ + obj.listener_id + obj.cidr
-        if obj.__class__.__name__ in ['VRRPGroup', 'Vip']:
-            return obj.__class__.__name__ + obj.load_balancer_id
-        if obj.__class__.__name__ in ['AmphoraHealth']:
-            return obj.__class__.__name__ + obj.amphora_id
-        if obj.__class__.__name__ in ['SNI']:
-            return (obj.__class__.__name__ +
-                    obj.listener_id + obj.tls_container_id)
-        if obj.__class__.__name__ in ['Quotas']:
-            return obj.__class__.__name__ + obj.project_id
-        if obj.__class__.__name__ in ['AvailabilityZone']:
-            return obj.__class__.__name__ + obj.name
-        raise NotImplementedError
-
-    def to_data_model(self, _graph_nodes=None):
+        key_attrs = _UNIQUE_KEY_ATTRS.get(obj.__class__.__name__)
+        if key_attrs is None:
+            raise NotImplementedError
+        return obj.__class__.__name__ + ''.join(
+            getattr(obj, attr) for attr in key_attrs)
+
+    def to_data_model(self, _graph_nodes=None, depth=None, fields=None):
         """Converts to a data model graph.
 
         In order to make the resulting data model graph usable no matter how
@@ -63,48 +198,14 @@ class OctaviaBase(models.ModelBase):
                              method. Should not be called from the outside.
                              Contains a dictionary of all OctaviaBase type
                              objects in the generated graph
+        :param depth: Number of relationship levels to follow. None (the
+                      default) follows the whole graph, 0 converts only the
+                      columns of this object and triggers no lazy loads.
+        :param fields: Optional frozenset of the columns and attributes to
+                       convert, see DataModelConverter.convert.
         """
-        _graph_nodes = _graph_nodes or {}
-        if not self.__data_model__:
-            raise NotImplementedError
-        dm_kwargs = {}
-        for column in self.__table__.columns:
-            dm_kwargs[column.name] = getattr(self, column.name)
-
-        attr_names = [attr_name for attr_name in dir(self)
-                      if not attr_name.startswith('_')]
-        # Appending early, as any unique ID should be defined already and
-        # the rest of this object will get filled out more fully later on,
-        # and we need to add ourselves to the _graph_nodes before we
-        # attempt recursion.
-        dm_self = self.__data_model__(**dm_kwargs)
-        dm_key = self._get_unique_key(dm_self)
-        _graph_nodes.update({dm_key: dm_self})
-        for attr_name in attr_names:
-            attr = getattr(self, attr_name)
-            if isinstance(attr, OctaviaBase) and attr.__class__:
-                # If this attr is already in the graph node list, just
-                # reference it there and don't recurse.
-                ukey = self._get_unique_key(attr)
-                if ukey in _graph_nodes.keys():
-                    setattr(dm_self, attr_name, _graph_nodes[ukey])
-                else:
-                    setattr(dm_self, attr_name, attr.to_data_model(
-                        _graph_nodes=_graph_nodes))
-            elif isinstance(attr, (collections.InstrumentedList, list)):
-                setattr(dm_self, attr_name, [])
-                listref = getattr(dm_self, attr_name)
-                for item in attr:
-                    if isinstance(item, OctaviaBase) and item.__class__:
-                        ukey = self._get_unique_key(item)
-                        if ukey in _graph_nodes.keys():
-                            listref.append(_graph_nodes[ukey])
-                        else:
-                            listref.append(
-                                item.to_data_model(_graph_nodes=_graph_nodes))
-                    elif not isinstance(item, OctaviaBase):
-                        listref.append(item)
-        return dm_self
+        return get_converter(self.__class__).convert(
+            self, _graph_nodes=_graph_nodes, depth=depth, fields=fields)
 
     @staticmethod
     def apply_filter(query, model, filters):
@@ -114,14 +215,14 @@ class OctaviaBase(models.ModelBase):
         if 'enabled' in filters:
             filters['enabled'] = strutils.bool_from_string(
                 filters['enabled'])
-        for attr, name_map in model.__v2_wsme__._child_map.items():
+        for attr, name_map in model.__v1_wsme__._child_map.items():
             for k, v in name_map.items():
                 if attr in filters and k in filters[attr]:
                     child_map.setdefault(attr, {}).update(
                         {k: filters[attr].pop(k)})
             filters.pop(attr, None)
 
-        for k, v in model.__v2_wsme__._type_to_model_map.items():
+        for k, v in model.__v1_wsme__._type_to_model_map.items():
             if k in filters:
                 translated_filters[v] = filters.pop(k)
         translated_filters.update(filters)
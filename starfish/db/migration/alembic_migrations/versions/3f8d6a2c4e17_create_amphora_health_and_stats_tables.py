@@ -0,0 +1,40 @@
+"""Create amphora health and listener statistics tables
+
+Revision ID: 3f8d6a2c4e17
+Revises: 9c2e4b7d1f60
+Create Date: 2026-10-18 16:21:45.318027
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3f8d6a2c4e17'
+down_revision = '9c2e4b7d1f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'amphora_health',
+        sa.Column('amphora_id', sa.String(36), primary_key=True),
+        sa.Column('last_update', sa.DateTime, nullable=False),
+        sa.Column('busy', sa.Boolean, nullable=False,
+                  server_default=sa.false())
+    )
+    op.create_table(
+        'listener_statistics',
+        sa.Column('listener_id', sa.String(36), primary_key=True),
+        sa.Column('amphora_id', sa.String(36), primary_key=True),
+        sa.Column('bytes_in', sa.BigInteger, nullable=False),
+        sa.Column('bytes_out', sa.BigInteger, nullable=False),
+        sa.Column('active_connections', sa.Integer, nullable=False),
+        sa.Column('total_connections', sa.BigInteger, nullable=False),
+        sa.Column('request_errors', sa.BigInteger, nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_table('listener_statistics')
+    op.drop_table('amphora_health')
@@ -0,0 +1,27 @@
+"""Add test entity pagination indexes
+
+Revision ID: 5a1c7e9d2b04
+Revises: 308463f02e7a
+Create Date: 2026-10-18 09:12:41.518274
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5a1c7e9d2b04'
+down_revision = '308463f02e7a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_test_entity_created_at_id', 'test_entity',
+                    ['created_at', 'id'])
+    op.create_index('idx_test_entity_name_created_at_id', 'test_entity',
+                    ['name', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_test_entity_name_created_at_id',
+                  table_name='test_entity')
+    op.drop_index('idx_test_entity_created_at_id', table_name='test_entity')
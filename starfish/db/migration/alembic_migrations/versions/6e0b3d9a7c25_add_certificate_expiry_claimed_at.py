@@ -0,0 +1,24 @@
+"""Add the claim time of certificate expiry entries
+
+Revision ID: 6e0b3d9a7c25
+Revises: 3f8d6a2c4e17
+Create Date: 2026-10-18 16:41:09.226310
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6e0b3d9a7c25'
+down_revision = '3f8d6a2c4e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('certificate_expiry',
+                  sa.Column('claimed_at', sa.DateTime, nullable=True))
+
+
+def downgrade():
+    op.drop_column('certificate_expiry', 'claimed_at')
@@ -0,0 +1,37 @@
+"""Create certificate expiry table
+
+Revision ID: 9c2e4b7d1f60
+Revises: 5a1c7e9d2b04
+Create Date: 2026-10-18 14:03:27.904511
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9c2e4b7d1f60'
+down_revision = '5a1c7e9d2b04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'certificate_expiry',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('project_id', sa.String(36), nullable=True),
+        sa.Column('cert_ref', sa.String(255), nullable=False),
+        sa.Column('expiration', sa.DateTime, nullable=False),
+        sa.Column('rotating', sa.Boolean, nullable=False,
+                  server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime),
+        sa.UniqueConstraint('cert_ref',
+                            name='uq_certificate_expiry_cert_ref')
+    )
+    op.create_index('idx_certificate_expiry_expiration',
+                    'certificate_expiry', ['expiration'])
+
+
+def downgrade():
+    op.drop_table('certificate_expiry')
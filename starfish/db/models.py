@@ -31,8 +31,59 @@ class TestEntity(base_models.BASE, base_models.IdMixin,
 
     __v1_wsme__ = test_entity.TestEntityResponse
 
+    # Match the default (created_at, id) and name sorted orders of the
+    # pagination helper so that keyset pages are served by range scans.
+    __table_args__ = (
+        sa.Index('idx_test_entity_created_at_id', 'created_at', 'id'),
+        sa.Index('idx_test_entity_name_created_at_id',
+                 'name', 'created_at', 'id'),
+    )
+
     manage_ip = sa.Column('manage_ip', sa.String(64), nullable=False)
 
+
+class CertificateExpiry(base_models.BASE, base_models.IdMixin,
+                        base_models.ProjectMixin, models.TimestampMixin):
+    __data_model__ = data_models.CertificateExpiry
+
+    __tablename__ = "certificate_expiry"
+
+    # The rotation scans are range queries on the expiration.
+    __table_args__ = (
+        sa.Index('idx_certificate_expiry_expiration', 'expiration'),
+        sa.UniqueConstraint('cert_ref',
+                            name='uq_certificate_expiry_cert_ref'),
+    )
+
+    cert_ref = sa.Column(sa.String(255), nullable=False)
+    expiration = sa.Column(sa.DateTime, nullable=False)
+    rotating = sa.Column(sa.Boolean, nullable=False, default=False)
+    claimed_at = sa.Column(sa.DateTime, nullable=True)
+
+
+class AmphoraHealth(base_models.BASE):
+    __data_model__ = data_models.AmphoraHealth
+
+    __tablename__ = "amphora_health"
+
+    amphora_id = sa.Column(sa.String(36), nullable=False, primary_key=True)
+    last_update = sa.Column(sa.DateTime, nullable=False)
+    busy = sa.Column(sa.Boolean, nullable=False, default=False)
+
+
+class ListenerStatistics(base_models.BASE):
+    __data_model__ = data_models.ListenerStatistics
+
+    __tablename__ = "listener_statistics"
+
+    listener_id = sa.Column(sa.String(36), nullable=False, primary_key=True)
+    amphora_id = sa.Column(sa.String(36), nullable=False, primary_key=True)
+    bytes_in = sa.Column(sa.BigInteger, nullable=False, default=0)
+    bytes_out = sa.Column(sa.BigInteger, nullable=False, default=0)
+    active_connections = sa.Column(sa.Integer, nullable=False, default=0)
+    total_connections = sa.Column(sa.BigInteger, nullable=False, default=0)
+    request_errors = sa.Column(sa.BigInteger, nullable=False, default=0)
+
 # class TestEntity1(base_models.BASE, base_models.IdMixin,
 #                  models.TimestampMixin, base_models.NameMixin):
 #     pass
@@ -1,14 +1,88 @@
 import datetime
+from oslo_config import cfg
+from oslo_db import api as oslo_db_api
+from oslo_db import exception as odb_exceptions
 from oslo_utils import uuidutils
+import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.orm import exc as orm_exc
+from sqlalchemy.orm import load_only
 from sqlalchemy.orm import noload
 
+from starfish.common import cache
 from starfish.common import constants as consts
+from starfish.db import base_models
 from starfish.db import models
 
+CONF = cfg.CONF
+
+
+@sa.event.listens_for(orm.Session, 'after_commit')
+def _invalidate_response_cache(session):
+    # The repositories record the resources they changed, their cached
+    # API responses are only dropped once the change is visible to readers.
+    cache.invalidate_pending(session)
+
+
+# Key of Session.info set while the session has a database transaction
+# open, which may read a snapshot older than the entity cache versions.
+_TRANSACTION_BEGUN = 'starfish_transaction_begun'
+
+
+@sa.event.listens_for(orm.Session, 'after_begin')
+def _record_transaction_begun(session, transaction, connection):
+    session.info[_TRANSACTION_BEGUN] = True
+
+
+@sa.event.listens_for(orm.Session, 'after_transaction_end')
+def _record_transaction_ended(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_TRANSACTION_BEGUN, None)
+
+
+# Retries the transactions inserting a row that a concurrent transaction
+# inserted first, the retry finds the row and updates it instead. It only
+# helps when the session is not already in a transaction.
+_retry_on_duplicate = oslo_db_api.wrap_db_retry(
+    max_retries=3, retry_interval=0.1, retry_on_deadlock=True,
+    exception_checker=lambda e: isinstance(
+        e, odb_exceptions.DBDuplicateEntry))
+
+
+def _chunks(items, size):
+    """Yields successive slices of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 
 class BaseRepository(object):
     model_class = None
 
+    def _apply_column_defaults(self, model_kwargs):
+        """Fills in the python side column defaults of a row mapping.
+
+        Bulk inserts do not hand the generated values back, so they are
+        computed up front to be able to return complete data models.
+        """
+        for column in self.model_class.__table__.columns:
+            default = column.default
+            if (column.name in model_kwargs or default is None or
+                    not default.is_scalar and not default.is_callable):
+                continue
+            if default.is_callable:
+                model_kwargs[column.name] = default.arg(None)
+            else:
+                model_kwargs[column.name] = default.arg
+        return model_kwargs
+
+    def _invalidate_cache(self, session, ids):
+        """Drops the cached API responses and entities on commit.
+
+        :param ids: ids of the entities written by the transaction.
+        """
+        cache.invalidate_on_commit(session, self.model_class.__name__)
+        cache.invalidate_entities_on_commit(session, self.model_class, ids)
+
     def count(self, session, **filters):
         """Retrieves a count of entities from the database.
 
@@ -39,8 +113,29 @@ class BaseRepository(object):
         with session.begin(subtransactions=True):
             model = self.model_class(**model_kwargs)
             session.add(model)
+            self._invalidate_cache(session, [model.id])
         return model.to_data_model()
 
+    def create_many(self, session, model_dicts, batch_size=None):
+        """Creates many entities using bulk insert statements.
+
+        :param session: A Sql Alchemy database session.
+        :param model_dicts: A list of attribute dictionaries to insert.
+        :param batch_size: Maximum number of rows per statement, defaults
+                           to [api_settings] bulk_batch_size.
+        :returns: [octavia.common.data_model]
+        """
+        batch_size = batch_size or CONF.api_settings.bulk_batch_size
+        mappings = [self._apply_column_defaults(dict(model_kwargs))
+                    for model_kwargs in model_dicts]
+        with session.begin(subtransactions=True):
+            for chunk in _chunks(mappings, batch_size):
+                session.bulk_insert_mappings(self.model_class, chunk)
+            self._invalidate_cache(session,
+                                   [mapping.get('id') for mapping in mappings])
+        return [self.model_class(**mapping).to_data_model(depth=0)
+                for mapping in mappings]
+
     def delete(self, session, **filters):
         """Deletes an entity from the database.
 
@@ -52,13 +147,50 @@ class BaseRepository(object):
         model = session.query(self.model_class).filter_by(**filters).one()
         with session.begin(subtransactions=True):
             session.delete(model)
+            self._invalidate_cache(session, [model.id])
             session.flush()
 
     def delete_batch(self, session, ids=None):
-        """Batch deletes by entity ids."""
+        """Batch deletes by entity ids.
+
+        :raises: sqlalchemy.orm.exc.NoResultFound if one of the entities
+                 does not exist, none of them is deleted then.
+        """
         ids = ids or []
-        for id in ids:
-            self.delete(session, id=id)
+        with session.begin(subtransactions=True):
+            missing = set(ids).difference(self.delete_many(session, ids))
+            if missing:
+                raise orm_exc.NoResultFound('No {} with id {}'.format(
+                    self.model_class.__name__, ', '.join(sorted(missing))))
+
+    def _existing_ids(self, session, ids):
+        return [row.id for row in session.query(self.model_class.id).filter(
+            self.model_class.id.in_(ids))]
+
+    def delete_many(self, session, ids, batch_size=None):
+        """Deletes entities with DELETE ... WHERE id IN (...) statements.
+
+        :param session: A Sql Alchemy database session.
+        :param ids: ids of the entities to delete.
+        :param batch_size: Maximum number of ids per statement, defaults
+                           to [api_settings] bulk_batch_size.
+        :returns: The ids of the deleted entities.
+        """
+        batch_size = batch_size or CONF.api_settings.bulk_batch_size
+        deleted_ids = []
+        with session.begin(subtransactions=True):
+            for chunk in _chunks(list(ids), batch_size):
+                existing = set(self._existing_ids(session, chunk))
+                existing = [id for id in chunk if id in existing]
+                if not existing:
+                    continue
+                session.query(self.model_class).filter(
+                    self.model_class.id.in_(existing)).delete(
+                    synchronize_session=False)
+                deleted_ids.extend(existing)
+            if deleted_ids:
+                self._invalidate_cache(session, deleted_ids)
+        return deleted_ids
 
     def update(self, session, id, **model_kwargs):
         """Updates an entity in the database.
@@ -74,16 +206,152 @@ class BaseRepository(object):
                 resource.tags = tags
             session.query(self.model_class).filter_by(
                 id=id).update(model_kwargs)
+            self._invalidate_cache(session, [id])
 
-    def get(self, session, **filters):
+    def update_many(self, session, model_dicts, batch_size=None):
+        """Updates many entities using bulk update statements.
+
+        Relationship attributes such as tags are not supported, use
+        update() for those.
+
+        :param session: A Sql Alchemy database session.
+        :param model_dicts: A list of attribute dictionaries, each one
+                            containing the id of the entity to update.
+        :param batch_size: Maximum number of rows per statement, defaults
+                           to [api_settings] bulk_batch_size.
+        :returns: The ids of the updated entities.
+        """
+        batch_size = batch_size or CONF.api_settings.bulk_batch_size
+        updated_ids = []
+        with session.begin(subtransactions=True):
+            for chunk in _chunks(list(model_dicts), batch_size):
+                existing = set(self._existing_ids(
+                    session, [model_kwargs['id'] for model_kwargs in chunk]))
+                mappings = [model_kwargs for model_kwargs in chunk
+                            if model_kwargs['id'] in existing]
+                if not mappings:
+                    continue
+                session.bulk_update_mappings(self.model_class, mappings)
+                updated_ids.extend(mapping['id'] for mapping in mappings)
+            if updated_ids:
+                self._invalidate_cache(session, updated_ids)
+        return updated_ids
+
+    def _existing_keys(self, session, keys, chunk):
+        key_columns = [getattr(self.model_class, key) for key in keys]
+        # Filtering on the first key column only, tuple IN is not supported
+        # by every backend.
+        return {tuple(row) for row in session.query(*key_columns).filter(
+            key_columns[0].in_({model_kwargs[keys[0]]
+                                for model_kwargs in chunk}))}
+
+    @_retry_on_duplicate
+    def upsert_many(self, session, model_dicts, batch_size=None):
+        """Inserts or updates many entities, matched on their primary key.
+
+        Each batch costs a query of the existing keys, a bulk insert and a
+        bulk update, whatever its number of rows. The rows are written in
+        primary key order, so that concurrent upserts lock them in the
+        same order and do not deadlock each other.
+
+        :param session: A Sql Alchemy database session.
+        :param model_dicts: A list of attribute dictionaries, each one
+                            containing the primary key of its entity.
+        :param batch_size: Maximum number of rows per statement, defaults
+                           to [api_settings] bulk_batch_size.
+        """
+        batch_size = batch_size or CONF.api_settings.bulk_batch_size
+        keys = [column.key for column in
+                sa.inspect(self.model_class).primary_key]
+        model_dicts = sorted(model_dicts, key=lambda model_kwargs: tuple(
+            model_kwargs[key] for key in keys))
+        with session.begin(subtransactions=True):
+            for chunk in _chunks(model_dicts, batch_size):
+                existing = self._existing_keys(session, keys, chunk)
+                inserts = []
+                updates = []
+                for model_kwargs in chunk:
+                    if tuple(model_kwargs[key] for key in keys) in existing:
+                        updates.append(model_kwargs)
+                    else:
+                        inserts.append(self._apply_column_defaults(
+                            dict(model_kwargs)))
+                if inserts:
+                    session.bulk_insert_mappings(self.model_class, inserts)
+                if updates:
+                    session.bulk_update_mappings(self.model_class, updates)
+            self._invalidate_cache(session, [model_kwargs[keys[0]]
+                                             for model_kwargs in model_dicts])
+
+    def _field_query_options(self, fields, pagination_helper=None):
+        """Returns query options loading only the requested fields.
+
+        The columns that are not in fields are deferred with load_only()
+        and the public relationships that are not in fields are not loaded
+        at all. The primary key and the sort keys are always loaded, as
+        pagination needs them to build its links.
+
+        :param fields: Names of the data model attributes to load.
+        :param pagination_helper: Helper whose sort keys will be applied.
+        :returns: A tuple of the query options and the frozenset of fields
+                  to pass to to_data_model().
+        """
+        mapper = sa.inspect(self.model_class)
+        converter = base_models.get_converter(self.model_class)
+        wanted = set(fields)
+        wanted.update(column.key for column in mapper.primary_key)
+        wanted.update(consts.DEFAULT_SORT_KEYS)
+        if pagination_helper:
+            wanted.update(key for key, _ in pagination_helper.sort_keys)
+        columns = [column for column in converter.columns
+                   if column in wanted]
+        options = [load_only(*columns)]
+        options.extend(noload(rel.key) for rel in mapper.relationships
+                       if rel.key not in wanted and
+                       not rel.key.startswith('_'))
+        return options, frozenset(columns).union(
+            attr for attr in converter.attributes if attr in wanted)
+
+    def get(self, session, fields=None, **filters):
         """Retrieves an entity from the database.
 
+        Lookups of a whole entity by id are served from the entity cache
+        when it is enabled for the model class, see [entity_cache].
+
         :param session: A Sql Alchemy database session.
+        :param fields: Optional names of the attributes to load, the other
+                       attributes of the data model are left unset.
         :param filters: Filters to decide which entity should be retrieved.
         :returns: octavia.common.data_model
         """
+        id = filters.get('id')
+        if (id is not None and not fields and
+                filters.get('show_deleted', True) and
+                set(filters) <= {'id', 'show_deleted'}):
+            entity_cache = cache.get_entity_cache(self.model_class)
+            # The entities written by the session are only cached once
+            # they are committed.
+            if (entity_cache is not None and not
+                    cache.is_invalidation_pending(session, self.model_class,
+                                                  id)):
+                # A transaction begun before the version token is read may
+                # see an older version of the entity, it is not cached.
+                return entity_cache.get_or_load(
+                    id, lambda: self._get(session, populate_existing=True,
+                                          **filters),
+                    store=not session.info.get(_TRANSACTION_BEGUN))
+        return self._get(session, fields=fields, **filters)
+
+    def _get(self, session, fields=None, populate_existing=False,
+             **filters):
         deleted = filters.pop('show_deleted', True)
         model = session.query(self.model_class).filter_by(**filters)
+        if populate_existing:
+            # Refreshes the instance the session may already hold.
+            model = model.populate_existing()
+        if fields:
+            options, fields = self._field_query_options(fields)
+            model = model.options(*options)
 
         if not deleted:
             if hasattr(self.model_class, 'status'):
@@ -98,19 +366,75 @@ class BaseRepository(object):
         if not model:
             return None
 
-        return model.to_data_model()
+        return model.to_data_model(fields=fields or None)
 
     def get_all(self, session, pagination_helper=None,
-                query_options=None, **filters):
+                query_options=None, fields=None, **filters):
 
         """Retrieves a list of entities from the database.
 
         :param session: A Sql Alchemy database session.
         :param pagination_helper: Helper to apply pagination and sorting.
         :param query_options: Optional query options to apply.
+        :param fields: Optional names of the attributes to load, the other
+                       attributes of the data models are left unset.
         :param filters: Filters to decide which entities should be retrieved.
         :returns: [octavia.common.data_model]
         """
+        query = self._get_all_query(session, query_options, **filters)
+        if fields:
+            options, fields = self._field_query_options(fields,
+                                                        pagination_helper)
+            query = query.options(*options)
+
+        if pagination_helper:
+            model_list, links = pagination_helper.apply(
+                query, self.model_class)
+        else:
+            links = None
+            model_list = query.all()
+
+        fields = fields or None
+        data_model_list = [model.to_data_model(fields=fields)
+                           for model in model_list]
+        return data_model_list, links
+
+    def iter_all(self, session, pagination_helper=None,
+                 query_options=None, batch_size=None, fields=None,
+                 **filters):
+        """Retrieves entities from the database one batch at a time.
+
+        Unlike get_all, rows are fetched and converted to data models lazily
+        as the returned iterator is consumed, so memory use does not grow
+        with the number of entities. The session must stay open until the
+        iterator is exhausted.
+
+        :param session: A Sql Alchemy database session.
+        :param pagination_helper: Helper to apply pagination and sorting.
+        :param query_options: Optional query options to apply.
+        :param batch_size: Number of rows fetched per round trip.
+        :param fields: Optional names of the attributes to load, the other
+                       attributes of the data models are left unset.
+        :param filters: Filters to decide which entities should be retrieved.
+        :returns: An iterator of octavia.common.data_model
+        """
+        query = self._get_all_query(session, query_options, **filters)
+        if fields:
+            options, fields = self._field_query_options(fields,
+                                                        pagination_helper)
+            query = query.options(*options)
+
+        if pagination_helper:
+            model_iter = pagination_helper.apply_stream(
+                query, self.model_class, batch_size=batch_size)
+        else:
+            model_iter = iter(query.yield_per(
+                batch_size or CONF.api_settings.stream_batch_size))
+
+        fields = fields or None
+        return (model.to_data_model(fields=fields) for model in model_iter)
+
+    def _get_all_query(self, session, query_options=None, **filters):
         deleted = filters.pop('show_deleted', True)
         query = session.query(self.model_class).filter_by(**filters)
         if query_options:
@@ -123,16 +447,7 @@ class BaseRepository(object):
             else:
                 query = query.filter(
                     self.model_class.provisioning_status != consts.DELETED)
-
-        if pagination_helper:
-            model_list, links = pagination_helper.apply(
-                query, self.model_class)
-        else:
-            links = None
-            model_list = query.all()
-
-        data_model_list = [model.to_data_model() for model in model_list]
-        return data_model_list, links
+        return query
 
     def exists(self, session, id):
         """Determines whether an entity exists in the database by its id.
@@ -143,6 +458,15 @@ class BaseRepository(object):
         """
         return bool(session.query(self.model_class).filter_by(id=id).first())
 
+    def _deleted_expiring_query(self, session, expiry_time, *columns):
+        if hasattr(self.model_class, 'status'):
+            status = self.model_class.status
+        else:
+            status = self.model_class.provisioning_status
+        return session.query(*columns).filter(
+            status == consts.DELETED,
+            self.model_class.updated_at < expiry_time)
+
     def get_all_deleted_expiring(self, session, exp_age):
         """Get all previously deleted resources that are now expiring.
 
@@ -155,23 +479,55 @@ class BaseRepository(object):
 
         expiry_time = datetime.datetime.utcnow() - exp_age
 
-        query = session.query(self.model_class).filter(
-            self.model_class.updated_at < expiry_time)
-        if hasattr(self.model_class, 'status'):
-            query = query.filter_by(status=consts.DELETED)
-        else:
-            query = query.filter_by(provisioning_status=consts.DELETED)
-        # Do not load any relationship
-        query = query.options(noload('*'))
-        model_list = query.all()
+        # Only the ids are loaded, not the entities.
+        query = self._deleted_expiring_query(session, expiry_time,
+                                             self.model_class.id)
+        return [row.id for row in query]
+
+    def purge_deleted_expiring(self, session, exp_age, batch_size,
+                               after_id=None):
+        """Deletes a batch of the expired deleted resources.
+
+        The batch is the first batch_size expired ids after after_id, in
+        the order of the primary key, so successive batches resume from
+        the last id of the previous one. Each batch is its own short
+        transaction, the rows are locked for its duration only.
 
-        id_list = [model.id for model in model_list]
-        return id_list
+        :param session: A Sql Alchemy database session.
+        :param exp_age: A standard datetime delta, see
+                        get_all_deleted_expiring.
+        :param batch_size: Maximum number of rows to delete.
+        :param after_id: The last id of the previous batch, if any.
+        :returns: A tuple of the number of rows deleted and of the last id
+                  of the batch, None once there is no expired resource
+                  after after_id.
+        """
+        expiry_time = datetime.datetime.utcnow() - exp_age
+        with session.begin(subtransactions=True):
+            query = self._deleted_expiring_query(session, expiry_time,
+                                                 self.model_class.id)
+            if after_id is not None:
+                query = query.filter(self.model_class.id > after_id)
+            ids = [row.id for row in query.order_by(
+                self.model_class.id).limit(batch_size)]
+            if not ids:
+                return 0, None
+            # The conditions are checked again, the rows may have been
+            # updated since they were selected.
+            deleted = self._deleted_expiring_query(
+                session, expiry_time, self.model_class).filter(
+                self.model_class.id.in_(ids)).delete(
+                synchronize_session=False)
+            self._invalidate_cache(session, ids)
+        return deleted, ids[-1]
 
 
 class Repositories(object):
     def __init__(self):
         self.test_entity = TestEntityRepository()
+        self.certificate_expiry = CertificateExpiryRepository()
+        self.amphorahealth = AmphoraHealthRepository()
+        self.listener_stats = ListenerStatisticsRepository()
         # self.test1_entity = Test1EntityRepository()
         # self.test2_entity = Test2EntityRepository()
 
@@ -189,6 +545,7 @@ class Repositories(object):
                 te_dict['id'] = uuidutils.generate_uuid()
             te = models.TestEntity(**te_dict)
             session.add(te)
+            self.test_entity._invalidate_cache(session, [te.id])
         return self.test_entity.get(session, id=te.id)
 
 
@@ -202,6 +559,105 @@ class TestEntityRepository(BaseRepository):
         """
         pass
 
+
+class CertificateExpiryRepository(BaseRepository):
+    model_class = models.CertificateExpiry
+
+    def _indexed(self, session, cert_refs):
+        return {model.cert_ref: model for model in session.query(
+            self.model_class).filter(self.model_class.cert_ref.in_(cert_refs))}
+
+    @_retry_on_duplicate
+    def record(self, session, project_id, expirations):
+        """Indexes the expiration of certificates.
+
+        Listeners sharing a certificate may be loaded concurrently, when
+        another request indexes the same certificate first the duplicate
+        entry is retried as an update. The retry only helps when the
+        session is not already in a transaction.
+
+        :param session: A Sql Alchemy database session.
+        :param project_id: The project owning the certificates.
+        :param expirations: A dict of the expiration datetimes by
+                            certificate reference.
+        """
+        if not expirations:
+            return
+        with session.begin(subtransactions=True):
+            indexed = self._indexed(session, list(expirations))
+            for cert_ref, expiration in expirations.items():
+                model = indexed.get(cert_ref)
+                if model is None:
+                    model = self.model_class(
+                        id=uuidutils.generate_uuid(), project_id=project_id,
+                        cert_ref=cert_ref, expiration=expiration)
+                    session.add(model)
+                elif model.expiration != expiration:
+                    model.expiration = expiration
+                else:
+                    continue
+                self._invalidate_cache(session, [model.id])
+
+    def claim_expiring(self, session, expires_before, limit=None,
+                       claim_timeout=None):
+        """Claims the certificates expiring before a date for rotation.
+
+        Claimed certificates are not returned again until released, so
+        that concurrent scans do not rotate the same certificate twice.
+        A claim is a lease: once it is older than claim_timeout, the
+        claimer is assumed to have died before releasing it and the
+        certificate is claimed again.
+
+        :param session: A Sql Alchemy database session.
+        :param expires_before: A datetime.
+        :param limit: The maximum number of certificates to claim.
+        :param claim_timeout: Seconds a claim lasts, defaults to
+                              [house_keeping] cert_claim_timeout.
+        :returns: [starfish.common.data_models.CertificateExpiry]
+        """
+        claim_timeout = (claim_timeout or
+                         CONF.house_keeping.cert_claim_timeout)
+        now = datetime.datetime.utcnow()
+        stale_before = now - datetime.timedelta(seconds=claim_timeout)
+        with session.begin(subtransactions=True):
+            # A range scan of the expiration index, its cost depends on the
+            # number of expiring certificates only.
+            query = session.query(self.model_class).filter(
+                self.model_class.expiration < expires_before,
+                sa.or_(self.model_class.rotating == sa.false(),
+                       # Claimed before the claims had a time.
+                       self.model_class.claimed_at.is_(None),
+                       self.model_class.claimed_at < stale_before)
+            ).order_by(self.model_class.expiration).with_for_update()
+            if limit:
+                query = query.limit(limit)
+            claimed = query.all()
+            for model in claimed:
+                model.rotating = True
+                model.claimed_at = now
+            self._invalidate_cache(session, [model.id for model in claimed])
+        return [model.to_data_model() for model in claimed]
+
+    def release(self, session, id, expiration=None):
+        """Releases a claimed certificate, with its new expiration if any.
+
+        :param session: A Sql Alchemy database session.
+        :param id: The id of the claimed certificate.
+        :param expiration: The expiration of the rotated certificate.
+        """
+        model_kwargs = {'rotating': False, 'claimed_at': None}
+        if expiration is not None:
+            model_kwargs['expiration'] = expiration
+        self.update(session, id, **model_kwargs)
+
+
+class AmphoraHealthRepository(BaseRepository):
+    model_class = models.AmphoraHealth
+
+
+class ListenerStatisticsRepository(BaseRepository):
+    model_class = models.ListenerStatistics
+
 # class Test1EntityRepository(BaseRepository):
 #     model_class = models.TestEntity1
 #     pass
@@ -12,11 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from oslo_log import log as logging
 from pecan import hooks
 
 from starfish.common import context, constants
 from starfish.frame_api.common import pagination
 
+LOG = logging.getLogger(__name__)
+
 
 class ContextHook(hooks.PecanHook):
     """Configures a request context and attaches it to the request."""
@@ -35,3 +38,66 @@ class QueryParametersHook(hooks.PecanHook):
         state.request.context[
             constants.PAGINATION_HELPER] = pagination.PaginationHelper(
             state.request.params.mixed())
+
+
+class _ClosingAppIter(object):
+    """Runs a callback once a streamed response body is done with."""
+
+    def __init__(self, app_iter, on_close):
+        self._app_iter = app_iter
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self._app_iter)
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, 'close'):
+                self._app_iter.close()
+        finally:
+            self._on_close()
+
+
+class DBSessionHook(hooks.PecanHook):
+    """Ends the database session of each request.
+
+    The session opened by the request context, if any, is committed when
+    a request that may write succeeded and rolled back otherwise, then
+    closed to hand its connection back to the pool. A streamed response
+    keeps its session until the body has been sent.
+    """
+
+    @staticmethod
+    def _end_session(session, commit):
+        try:
+            if commit:
+                session.commit()
+            else:
+                session.rollback()
+        finally:
+            session.close()
+
+    @staticmethod
+    def _release_session(state):
+        context = state.request.context.get('octavia_context')
+        if context is None:
+            return None
+        return context.release_session()
+
+    def on_error(self, state, e):
+        session = self._release_session(state)
+        if session is not None:
+            self._end_session(session, commit=False)
+
+    def after(self, state):
+        session = self._release_session(state)
+        if session is None:
+            return
+        commit = (state.request.method not in ('GET', 'HEAD') and
+                  state.response.status_int < 400)
+        app_iter = state.response.app_iter
+        if isinstance(app_iter, (list, tuple)):
+            self._end_session(session, commit)
+        else:
+            state.response.app_iter = _ClosingAppIter(
+                app_iter, lambda: self._end_session(session, commit))
@@ -12,23 +12,97 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
 import copy
+import hashlib
+import hmac
 import itertools
+import os
 import sqlalchemy
 import sqlalchemy.sql as sa_sql
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
 from pecan import request
 from sqlalchemy.orm import aliased
 
 from starfish.common import constants, exceptions
 from starfish.common.config import cfg
 from starfish.db import base_models
-from starfish.db import models
 from starfish.frame_api.common import types
 
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
+CURSOR_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+_RANDOM_CURSOR_KEY = None
+# The backends that sort NULLs last in ascending order.
+_NULLS_LAST_DIALECTS = ('postgresql', 'oracle')
+
+
+def _get_cursor_key():
+    """Returns the key used to sign pagination cursors."""
+    global _RANDOM_CURSOR_KEY
+    if CONF.api_settings.pagination_cursor_key:
+        return CONF.api_settings.pagination_cursor_key.encode('utf-8')
+    if _RANDOM_CURSOR_KEY is None:
+        LOG.warning('[api_settings] pagination_cursor_key is not set, '
+                    'pagination links will only be valid for this API '
+                    'process.')
+        _RANDOM_CURSOR_KEY = os.urandom(32)
+    return _RANDOM_CURSOR_KEY
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    data = data.encode('ascii')
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def encode_cursor(sort_keys, values, reverse=False):
+    """Builds an opaque, signed pagination cursor.
+
+    :param sort_keys: The names of the sort keys the values belong to.
+    :param values: The sort key values of the row to continue from.
+    :param reverse: Whether the cursor points to the previous page.
+    :returns: A url safe string.
+    """
+    values = [value.strftime(CURSOR_TIME_FORMAT)
+              if hasattr(value, 'strftime') else value for value in values]
+    payload = jsonutils.dump_as_bytes(
+        {'k': list(sort_keys), 'v': values, 'r': reverse})
+    signature = hmac.new(_get_cursor_key(), payload, hashlib.sha256).digest()
+    return '{}.{}'.format(_b64encode(payload), _b64encode(signature))
+
+
+def decode_cursor(cursor, sort_keys):
+    """Verifies a pagination cursor and returns its content.
+
+    :param cursor: A cursor built by encode_cursor.
+    :param sort_keys: The names of the sort keys of the current request.
+    :returns: A tuple of the (serialized) sort key values and the reverse
+              flag.
+    :raises InvalidMarker: The cursor is malformed, was tampered with or
+                           belongs to a different sort order.
+    """
+    try:
+        payload, signature = cursor.split('.')
+        payload = _b64decode(payload)
+        signature = _b64decode(signature)
+    except (ValueError, TypeError, UnicodeError):
+        raise exceptions.InvalidMarker(key=cursor)
+    expected = hmac.new(_get_cursor_key(), payload, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise exceptions.InvalidMarker(key=cursor)
+    content = jsonutils.loads(payload)
+    if content['k'] != list(sort_keys):
+        raise exceptions.InvalidMarker(key=cursor)
+    return content['v'], content['r']
+
 
 class PaginationHelper(object):
     """Class helping to interact with pagination functionality
@@ -37,7 +111,7 @@ class PaginationHelper(object):
     """
     _auxiliary_arguments = ('limit', 'marker',
                             'sort', 'sort_key', 'sort_dir',
-                            'fields', 'page_reverse',
+                            'fields', 'page_reverse', 'stream',
                             )
 
     def __init__(self, params, sort_dir=constants.DEFAULT_SORT_DIR):
@@ -67,7 +141,7 @@ class PaginationHelper(object):
         limit = params.get('limit', page_max_limit)
         try:
             # Deal with limit being a string or int meaning 'Unlimited'
-            if limit == 'infinite' or int(limit) < 1:
+            if limit in (None, 'infinite') or int(limit) < 1:
                 limit = None
             # If we don't have a max, just use whatever limit is specified
             elif page_max_limit is None:
@@ -112,24 +186,108 @@ class PaginationHelper(object):
     def _parse_marker(self, session, model):
         return session.query(model).filter_by(id=self.marker).one_or_none()
 
+    def _get_marker_values(self, session, model):
+        """Returns the sort key values and direction of the marker.
+
+        Markers are signed cursors carrying the sort key values of the row
+        to continue from, so no extra query is needed. Plain ids are still
+        accepted for backward compatibility and are looked up.
+        """
+        sort_keys = [key for key, _ in self.sort_keys]
+        if uuidutils.is_uuid_like(self.marker):
+            marker_object = self._parse_marker(session, model)
+            if not marker_object:
+                raise exceptions.InvalidMarker(key=self.marker)
+            values = [getattr(marker_object, key) for key in sort_keys]
+            return values, self.page_reverse == 'True'
+
+        values, reverse = decode_cursor(self.marker, sort_keys)
+        for index, key in enumerate(sort_keys):
+            column_type = getattr(model, key).property.columns[0].type
+            if (values[index] is not None and
+                    isinstance(column_type, sqlalchemy.DateTime)):
+                values[index] = timeutils.parse_strtime(
+                    values[index], fmt=CURSOR_TIME_FORMAT)
+        return values, reverse
+
     @staticmethod
-    def _get_default_column_value(column_type):
-        """Return the default value of the columns from DB table
+    def _get_sort_attr(model, sort_key):
+        """Returns the column attribute of a sort key and if it is nullable.
 
-        In postgreDB case, if no right default values are being set, an
-        psycopg2.DataError will be thrown.
+        The bare column is compared and sorted on, so that the sort indexes
+        stay usable. NULLs sort before any other value, see _order_by.
         """
-        type_schema = {
-            'datetime': None,
-            'big_integer': 0,
-            'integer': 0,
-            'string': ''
-        }
+        model_attr = getattr(model, sort_key)
+        return model_attr, model_attr.property.columns[0].nullable
 
-        if isinstance(column_type, sa_sql.type_api.Variant):
-            return PaginationHelper._get_default_column_value(column_type.impl)
+    @staticmethod
+    def _follows(attr, nullable, value, ascending):
+        """Returns the filter of the values of attr that follow value."""
+        if ascending:
+            # NULL > value is never true, the NULLs that come first are
+            # left out.
+            return attr > value if value is not None else attr.isnot(None)
+        if value is None:
+            return sa_sql.false()
+        if nullable:
+            return sa_sql.or_(attr < value, attr.is_(None))
+        return attr < value
+
+    def _keyset_criteria(self, model, marker_values, reverse):
+        """Returns the filter selecting the rows that follow the marker.
+
+        When every key is sorted in the same direction this is a single
+        row-value comparison, (k1, k2) > (X1, X2), which the database can
+        resolve with a range scan on a matching composite index. It leaves
+        out the rows with a NULL key, so it is only used where they come
+        before the marker: ascending keys and a marker without NULLs.
+        Otherwise the equivalent expanded form is used:
+        (k1 > X1) or (k1 == X1 && k2 > X2) ...
+        """
+        attrs = []
+        nullables = []
+        ascending = []
+        for sort_key, sort_dir in self.sort_keys:
+            attr, nullable = self._get_sort_attr(model, sort_key)
+            attrs.append(attr)
+            nullables.append(nullable)
+            if sort_dir not in constants.ALLOWED_SORT_DIR:
+                raise exceptions.InvalidSortDirection(key=sort_dir)
+            ascending.append((sort_dir == constants.ASC) != reverse)
+
+        if (len(set(ascending)) == 1 and None not in marker_values and
+                (ascending[0] or not any(nullables))):
+            literals = [sqlalchemy.literal(value, type_=attr.type)
+                        for attr, value in zip(attrs, marker_values)]
+            if len(attrs) == 1:
+                left, right = attrs[0], literals[0]
+            else:
+                left = sqlalchemy.tuple_(*attrs)
+                right = sqlalchemy.tuple_(*literals)
+            return left > right if ascending[0] else left < right
+
+        criteria_list = []
+        for i in range(len(attrs)):
+            crit_attrs = [attrs[j].is_(None) if marker_values[j] is None
+                          else attrs[j] == marker_values[j]
+                          for j in range(i)]
+            crit_attrs.append(self._follows(attrs[i], nullables[i],
+                                            marker_values[i], ascending[i]))
+            criteria_list.append(sa_sql.and_(*crit_attrs))
+        return sa_sql.or_(*criteria_list)
 
-        return type_schema[column_type.__visit_name__]
+    @staticmethod
+    def _order_by(query, attr, nullable, ascending):
+        """Sorts query on attr, NULLs first in ascending order.
+
+        That is the native order of SQLite and MySQL, the backends that
+        sort NULLs last are told explicitly.
+        """
+        order = sqlalchemy.asc(attr) if ascending else sqlalchemy.desc(attr)
+        if (nullable and query.session.get_bind().dialect.name in
+                _NULLS_LAST_DIALECTS):
+            order = order.nullsfirst() if ascending else order.nullslast()
+        return query.order_by(order)
 
     @staticmethod
     def _validate_sort_dir(sort_dir):
@@ -147,6 +305,7 @@ class PaginationHelper(object):
             path_url = request.path_url
         links = []
         if model_list:
+            sort_keys = [key for key, _ in self.sort_keys]
             prev_attr = ["limit={}".format(self.limit)]
             if self.params.get('sort'):
                 prev_attr.append("sort={}".format(self.params.get('sort')))
@@ -155,8 +314,10 @@ class PaginationHelper(object):
                     self.params.get('sort_key')))
             next_attr = copy.copy(prev_attr)
             if self.marker:
-                prev_attr.append("marker={}".format(model_list[0].get('id')))
-                prev_attr.append("page_reverse=True")
+                prev_attr.append("marker={}".format(encode_cursor(
+                    sort_keys,
+                    [getattr(model_list[0], key) for key in sort_keys],
+                    reverse=True)))
                 prev_link = {
                     "rel": "previous",
                     "href": "{url}?{params}".format(
@@ -167,8 +328,10 @@ class PaginationHelper(object):
             # TODO(rm_work) Do we need to know when there are more vs exact?
             # We safely know if we have a full page, but it might include the
             # last element or it might not, it is unclear
-            if len(model_list) >= self.limit:
-                next_attr.append("marker={}".format(model_list[-1].get('id')))
+            if self.limit and len(model_list) >= self.limit:
+                next_attr.append("marker={}".format(encode_cursor(
+                    sort_keys,
+                    [getattr(model_list[-1], key) for key in sort_keys])))
                 next_link = {
                     "rel": "next",
                     "href": "{url}?{params}".format(
@@ -225,27 +388,70 @@ class PaginationHelper(object):
             tag.split(',') for tag in param))
 
     def apply(self, query, model, enforce_valid_params=True):
-        """Returns a query with sorting / pagination criteria added.
+        """Returns a page of models and the pagination links.
 
         Pagination works by requiring a unique sort_key specified by sort_keys.
         (If sort_keys is not unique, then we risk looping through values.)
         We use the last row in the previous page as the pagination 'marker'.
         So we must return values that follow the passed marker in the order.
-        With a single-valued sort_key, this would be easy: sort_key > X.
-        With a compound-values sort_key, (k1, k2, k3) we must do this to repeat
-        the lexicographical ordering:
-        (k1 > X1) or (k1 == X1 && k2 > X2) or (k1 == X1 && k2 == X2 && k3 > X3)
-        We also have to cope with different sort_directions.
-        Typically, the id of the last row is used as the client-facing
-        pagination marker, then the actual marker object must be fetched from
-        the db and passed in to us as marker.
+        The client-facing marker is a signed cursor holding the sort key
+        values of that row, so the next page is selected with a keyset
+        comparison, (k1, k2, k3) > (X1, X2, X3), without fetching the marker
+        row from the db first. Cursors of 'previous' links walk the same
+        keyset backwards.
         :param query: the query object to which we should add
         paging/sorting/filtering
         :param model: the ORM model class
         :param enforce_valid_params: check for invalid enteries in self.params
 
-        :rtype: sqlalchemy.orm.query.Query
-        :returns: The query with sorting/pagination/filtering added.
+        :returns: A tuple of the list of models and the list of links.
+        """
+        query, reverse = self._build_query(query, model, self.limit,
+                                           enforce_valid_params)
+        model_list = query.all()
+        if reverse:
+            model_list.reverse()
+
+        links = None
+        if CONF.api_settings.allow_pagination:
+            links = self._make_links(model_list)
+
+        return model_list, links
+
+    def apply_stream(self, query, model, enforce_valid_params=True,
+                     batch_size=None):
+        """Returns an iterator over every model matching the request.
+
+        The query is validated and built right away so that bad parameters
+        are reported before anything is sent, but rows are only fetched
+        from the database, batch_size at a time, as the iterator is
+        consumed. As nothing is buffered, only an explicit 'limit' bounds
+        the result; pagination_max_limit does not apply.
+
+        :param query: the query object to which we should add
+        paging/sorting/filtering
+        :param model: the ORM model class
+        :param enforce_valid_params: check for invalid enteries in self.params
+        :param batch_size: number of rows fetched per round trip.
+        :returns: An iterator of models.
+        """
+        limit = None
+        if 'limit' in self.params:
+            limit = self._parse_limit(self.params)
+        query, reverse = self._build_query(query, model, limit,
+                                           enforce_valid_params)
+        if reverse:
+            # Previous page cursors walk backwards and always come with the
+            # limit of the page they were built for.
+            return reversed(query.all())
+        return iter(query.yield_per(
+            batch_size or CONF.api_settings.stream_batch_size))
+
+    def _build_query(self, query, model, limit, enforce_valid_params):
+        """Returns a query with sorting / pagination criteria added.
+
+        :returns: A tuple of the query and whether its rows are in reverse
+                  order.
         """
 
         # Add filtering
@@ -255,11 +461,11 @@ class PaginationHelper(object):
                              if k not in self._auxiliary_arguments}
 
             secondary_query_filter = filter_params.pop(
-                "project_id", None) if (model == models.Amphora) else None
+                "project_id", None) if (model.__name__ == 'Amphora') else None
 
             # Tranlate arguments from API standard to data model's field name
             filter_params = (
-                model.__v2_wsme__.translate_dict_keys_to_data_model(
+                model.__v1_wsme__.translate_dict_keys_to_data_model(
                     filter_params)
             )
             if 'loadbalancer_id' in filter_params:
@@ -285,7 +491,7 @@ class PaginationHelper(object):
 
             # Drop invalid arguments
             self.filters = {k: v for (k, v) in filter_params.items()
-                            if k in vars(model.__data_model__())}
+                            if k in model.__data_model__._fields}
 
             if enforce_valid_params and (
                     len(self.filters) < len(filter_params)
@@ -307,80 +513,31 @@ class PaginationHelper(object):
             for key in constants.DEFAULT_SORT_KEYS:
                 if key not in keys_only and hasattr(model, key):
                     self.sort_keys.append((key, self.sort_dir))
-
-            for current_sort_key, current_sort_dir in self.sort_keys:
-                sort_dir_func = {
-                    constants.ASC: sqlalchemy.asc,
-                    constants.DESC: sqlalchemy.desc,
-                }[current_sort_dir]
-
-                try:
-                    sort_key_attr = getattr(model, current_sort_key)
-                except AttributeError:
+            for current_sort_key, _ in self.sort_keys:
+                if not hasattr(model, current_sort_key):
                     raise exceptions.InvalidSortKey(key=current_sort_key)
-                query = query.order_by(sort_dir_func(sort_key_attr))
 
-        # Add pagination
-        if CONF.api_settings.allow_pagination:
-            default = ''  # Default to an empty string if NULL
-            if self.marker is not None:
-                marker_object = self._parse_marker(query.session, model)
-                if not marker_object:
-                    raise exceptions.InvalidMarker(key=self.marker)
-                marker_values = []
-                for sort_key, _ in self.sort_keys:
-                    v = getattr(marker_object, sort_key)
-                    if v is None:
-                        v = default
-                    marker_values.append(v)
-
-                # Build up an array of sort criteria as in the docstring
-                criteria_list = []
-                for i in range(len(self.sort_keys)):
-                    crit_attrs = []
-                    for j in range(i):
-                        model_attr = getattr(model, self.sort_keys[j][0])
-                        default = PaginationHelper._get_default_column_value(
-                            model_attr.property.columns[0].type)
-                        attr = sa_sql.expression.case(
-                            [(model_attr != None,  # noqa: E711 # pylint: disable=singleton-comparison
-                              model_attr), ], else_=default)
-                        crit_attrs.append((attr == marker_values[j]))
-
-                    model_attr = getattr(model, self.sort_keys[i][0])
-                    default = PaginationHelper._get_default_column_value(
-                        model_attr.property.columns[0].type)
-                    attr = sa_sql.expression.case(
-                        [(model_attr != None,  # noqa: E711 # pylint: disable=singleton-comparison
-                          model_attr), ], else_=default)
-                    this_sort_dir = self.sort_keys[i][1]
-                    if this_sort_dir == constants.DESC:
-                        if self.page_reverse == "True":
-                            crit_attrs.append((attr > marker_values[i]))
-                        else:
-                            crit_attrs.append((attr < marker_values[i]))
-                    elif this_sort_dir == constants.ASC:
-                        if self.page_reverse == "True":
-                            crit_attrs.append((attr < marker_values[i]))
-                        else:
-                            crit_attrs.append((attr > marker_values[i]))
-                    else:
-                        raise exceptions.InvalidSortDirection(
-                            key=this_sort_dir)
-
-                    criteria = sa_sql.and_(*crit_attrs)
-                    criteria_list.append(criteria)
-
-                f = sa_sql.or_(*criteria_list)
-                query = query.filter(f)
-
-            if self.limit is not None:
-                query = query.limit(self.limit)
+        reverse = False
+        marker_values = None
+        if CONF.api_settings.allow_pagination and self.marker is not None:
+            marker_values, reverse = self._get_marker_values(query.session,
+                                                             model)
 
-        model_list = query.all()
+        if CONF.api_settings.allow_sorting:
+            for current_sort_key, current_sort_dir in self.sort_keys:
+                # A previous page is read backwards from the marker and
+                # flipped afterwards.
+                attr, nullable = self._get_sort_attr(model, current_sort_key)
+                query = self._order_by(
+                    query, attr, nullable,
+                    (current_sort_dir == constants.ASC) != reverse)
 
-        links = None
+        # Add pagination
         if CONF.api_settings.allow_pagination:
-            links = self._make_links(model_list)
+            if marker_values is not None:
+                query = query.filter(self._keyset_criteria(
+                    model, marker_values, reverse))
+            if limit is not None:
+                query = query.limit(limit)
 
-        return model_list, links
+        return query, reverse
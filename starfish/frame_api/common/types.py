@@ -12,7 +12,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import copy
 import netaddr
 import six
 from wsme import types as wtypes
@@ -87,7 +86,86 @@ class URLPathType(wtypes.UserType):
         return value
 
 
+class ConversionPlan(object):
+    """How the dicts of data models map onto the attributes of a type.
+
+    BaseMeta builds one per type class, once the class and its WSME
+    attributes exist, so that converting an object only has to apply it.
+    """
+
+    # Attributes rendered as an empty string rather than null.
+    EMPTY_STRING_DEFAULTS = ('name', 'description')
+
+    def __init__(self, type_cls):
+        type_to_model_map = getattr(type_cls, '_type_to_model_map', None)
+        self.mapped = type_to_model_map is not None
+        dm_to_type_map = {value: key for key, value in
+                          (type_to_model_map or {}).items()}
+        # Data model keys renamed to type keys.
+        self.renames = tuple((dm_key, type_key)
+                             for dm_key, type_key in dm_to_type_map.items()
+                             if '.' not in dm_key)
+        # Keys of nested data model dicts copied up as parent_child.
+        self.flattened = tuple(
+            (parent, child, '_'.join([parent, child]))
+            for parent, child in (dm_key.split('.', 1)
+                                  for dm_key in dm_to_type_map
+                                  if '.' in dm_key))
+        # The public data attributes of the type, in dir() order.
+        self.attributes = tuple(
+            attr for attr in dir(type_cls)
+            if not attr.startswith('_') and
+            not callable(getattr(type_cls, attr, None)))
+        self._attribute_set = frozenset(self.attributes)
+        self._default_init = type_cls.__init__ is wtypes.Base.__init__
+
+    def to_type_kwargs(self, type_dict):
+        """Turns a data model dict into the keyword arguments of the type.
+
+        type_dict is modified in place, it must not be shared.
+        """
+        if not self.mapped:
+            return type_dict
+        for parent, child, target in self.flattened:
+            nested = type_dict.get(parent)
+            if isinstance(nested, dict) and child in nested:
+                type_dict[target] = nested[child]
+        defaulted = [key for key in self.EMPTY_STRING_DEFAULTS
+                     if key in type_dict and type_dict[key] is None]
+        for key in defaulted:
+            type_dict[key] = ''
+        renamed = [(type_key, type_dict.pop(dm_key))
+                   for dm_key, type_key in self.renames
+                   if dm_key in type_dict and dm_key not in defaulted and
+                   not isinstance(type_dict[dm_key], dict)]
+        type_dict.update(renamed)
+        return type_dict
+
+    def build(self, type_cls, type_dict, fields=None):
+        """Returns an instance of type_cls made from a data model dict.
+
+        :param fields: Optional attributes of the type to set, the others
+                       are left Unset and are not rendered.
+        """
+        kwargs = self.to_type_kwargs(type_dict)
+        if fields is not None:
+            kwargs = {key: value for key, value in kwargs.items()
+                      if key in fields}
+        if not self._default_init:
+            return type_cls(**kwargs)
+        # Same as wtypes.Base.__init__, without probing every key.
+        obj = type_cls()
+        for key, value in kwargs.items():
+            if key in self._attribute_set:
+                setattr(obj, key, value)
+        return obj
+
+
 class BaseMeta(wtypes.BaseMeta):
+    def __init__(cls, name, bases, dct):
+        super(BaseMeta, cls).__init__(name, bases, dct)
+        cls._conversion_plan = ConversionPlan(cls)
+
     def __new__(cls, name, bases, dct):
         def get_tenant_id(self):
             tenant_id = getattr(self, '_tenant_id', wtypes.Unset)
@@ -130,25 +208,42 @@ class BaseType(wtypes.Base):
         :param data_model: data model to convert from
         :param children: convert child data models
         """
-        if not hasattr(cls, '_type_to_model_map'):
-            return cls(**data_model.to_dict())
-
-        dm_to_type_map = {value: key
-                          for key, value in cls._type_to_model_map.items()}
-        type_dict = data_model.to_dict()
-        new_dict = copy.deepcopy(type_dict)
-        for key, value in type_dict.items():
-            if isinstance(value, dict):
-                for child_key, child_value in value.items():
-                    if '.'.join([key, child_key]) in dm_to_type_map:
-                        new_dict['_'.join([key, child_key])] = child_value
-            elif key in ['name', 'description'] and value is None:
-                new_dict[key] = ''
-            else:
-                if key in dm_to_type_map:
-                    new_dict[dm_to_type_map[key]] = value
-                    del new_dict[key]
-        return cls(**new_dict)
+        return cls._conversion_plan.build(cls, data_model.to_dict())
+
+    @classmethod
+    def from_data_models(cls, data_models, children=False, fields=None):
+        """Converts a list of data models to Octavia WSME types.
+
+        :param data_models: data models to convert from
+        :param children: convert child data models
+        :param fields: optional attributes to set, the others are left Unset
+        """
+        if fields is not None:
+            fields = frozenset(fields)
+        if cls.from_data_model.__func__ is not _base_from_data_model:
+            # Honour the conversion of types that customize it.
+            result = [cls.from_data_model(data_model, children=children)
+                      for data_model in data_models]
+            if fields is not None:
+                for obj in result:
+                    for attr in cls._conversion_plan.attributes:
+                        if attr not in fields:
+                            setattr(obj, attr, wtypes.Unset)
+            return result
+        plan = cls._conversion_plan
+        return [plan.build(cls, data_model.to_dict(), fields)
+                for data_model in data_models]
+
+    @classmethod
+    def translate_keys_to_data_model(cls, keys):
+        """Translate attribute names of the type to data model names.
+
+        Attributes mapped into a child data model translate to the name of
+        that child.
+        """
+        type_to_model_map = getattr(cls, '_type_to_model_map', {})
+        return [type_to_model_map.get(key, key).split('.', 1)[0]
+                for key in keys]
 
     @classmethod
     def translate_dict_keys_to_data_model(cls, wsme_dict):
@@ -188,9 +283,7 @@ class BaseType(wtypes.Base):
             # then we treat it as False
             self.admin_state_up = bool(self.admin_state_up)
         wsme_dict = {}
-        for attr in dir(self):
-            if attr.startswith('_'):
-                continue
+        for attr in self._conversion_plan.attributes:
             value = getattr(self, attr, None)
             # TODO(blogan): Investigate wsme types handling the duality of
             # tenant_id and project_id in a clean way.  One way could be
@@ -215,6 +308,9 @@ class BaseType(wtypes.Base):
         return self.translate_dict_keys_to_data_model(wsme_dict)
 
 
+_base_from_data_model = BaseType.from_data_model.__func__
+
+
 class IdOnlyType(BaseType):
     id = wtypes.wsattr(wtypes.UuidType(), mandatory=True)
 
@@ -7,7 +7,8 @@ app = {
     'modules': ['starfish.frame_api'],
     'hooks': [
         hooks.ContextHook(),
-        hooks.QueryParametersHook()
+        hooks.QueryParametersHook(),
+        hooks.DBSessionHook()
     ],
     'debug': True
 }
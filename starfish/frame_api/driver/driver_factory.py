@@ -1,9 +1,9 @@
 from oslo_config import cfg
 from oslo_log import log as logging
-from stevedore import driver as stevedore_driver
 from wsme import types as wtypes
 
 from starfish.common import exceptions
+from starfish.common import utils
 
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
@@ -20,11 +20,7 @@ def get_driver(provider):
 
     # There is only one mod for now
     try:
-        driver = stevedore_driver.DriverManager(
-            namespace='starfish.api.drivers',
-            name=provider,
-            invoke_on_load=True
-        ).driver
+        driver = utils.load_driver('starfish.api.drivers', provider)
         driver.name = provider
     except Exception as e:
         LOG.error('Unable to load provider driver %s due to: %s',
@@ -1,3 +1,5 @@
+import atexit
+
 import oslo_messaging as messaging
 from octavia_lib.api.drivers import provider_base as driver_base
 from oslo_config import cfg
@@ -18,11 +20,14 @@ class TestProviderDriver(driver_base.ProviderDriver):
         topic = constants.TOPIC_AMPHORA_V2
         self.target = messaging.Target(
             namespace=constants.RPC_NAMESPACE_CONTROLLER_AGENT,
-            topic=topic, version='1.0', fanout=False)
+            topic=topic, version='1.1', fanout=False)
         self.client = rpc.get_client(self.target)
+        self._agent_info_batcher = rpc.CastBatcher(self.client,
+                                                   'get_agent_info_batch')
+        atexit.register(self._agent_info_batcher.flush)
 
     def get_agent_test_info(self):
         # return "hello"
         payload = {}
-        self.client.cast({}, 'get_agent_info', **payload)
+        self._agent_info_batcher.cast(**payload)
         return 'Getting the backend agent info ...'
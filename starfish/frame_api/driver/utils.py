@@ -20,10 +20,10 @@ from oslo_config import cfg
 from oslo_context import context as oslo_context
 from oslo_log import log as logging
 from oslo_utils import excutils
-from stevedore import driver as stevedore_driver
 
 from starfish.common import data_models
 from starfish.common import exceptions
+from starfish.common import utils
 from starfish.common.tls_utils import cert_parser
 from starfish.db import api as db_api
 from starfish.db import repositories
@@ -260,11 +260,8 @@ def listener_dict_to_provider_dict(listener_dict, for_delete=False):
                 raise exceptions.ValidationException(
                     detail=_('Invalid SNI container on listener'))
         listener_obj.sni_containers = SNI_objs
-        cert_manager = stevedore_driver.DriverManager(
-            namespace='octavia.cert_manager',
-            name=CONF.certificates.cert_manager,
-            invoke_on_load=True,
-        ).driver
+        cert_manager = utils.load_driver('octavia.cert_manager',
+                                         CONF.certificates.cert_manager)
         try:
             cert_dict = cert_parser.load_certificates_data(cert_manager,
                                                            listener_obj)
@@ -275,6 +272,16 @@ def listener_dict_to_provider_dict(listener_dict, for_delete=False):
                 if for_delete:
                     ctxt.reraise = False
                     cert_dict = {}
+        if cert_dict.get('expirations') and not for_delete:
+            # The expiry index only schedules rotations, failing to update
+            # it must not fail the listener.
+            try:
+                repositories.CertificateExpiryRepository().record(
+                    db_api.get_session(), listener_obj.project_id,
+                    cert_dict['expirations'])
+            except Exception as e:
+                LOG.warning('Unable to index the expiration of '
+                            'certificate(s) due to %s.', str(e))
         if 'tls_cert' in cert_dict and cert_dict['tls_cert']:
             new_listener_dict['default_tls_container_data'] = (
                 cert_dict['tls_cert'].to_dict(recurse=True))
@@ -373,11 +380,8 @@ def pool_dict_to_provider_dict(pool_dict, for_delete=False):
     pool_obj = data_models.Pool(**pool_dict)
     if (pool_obj.tls_certificate_id or pool_obj.ca_tls_certificate_id or
             pool_obj.crl_container_id):
-        cert_manager = stevedore_driver.DriverManager(
-            namespace='octavia.cert_manager',
-            name=CONF.certificates.cert_manager,
-            invoke_on_load=True,
-        ).driver
+        cert_manager = utils.load_driver('octavia.cert_manager',
+                                         CONF.certificates.cert_manager)
         try:
             cert_dict = cert_parser.load_certificates_data(cert_manager,
                                                            pool_obj)
@@ -1,3 +1,4 @@
+import pecan
 from wsme import types as wtypes
 from wsmeext import pecan as wsme_pecan
 
@@ -16,3 +17,8 @@ class V1Controller(base.BaseController):
     @wsme_pecan.wsexpose(wtypes.text)
     def get(self):
         return "v1"
+
+
+# "testentities:bulk" is not a valid python identifier.
+pecan.route(V1Controller, 'testentities:bulk',
+            test_entity.TestEntitiesBulkController())
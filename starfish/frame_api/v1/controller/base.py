@@ -1,10 +1,24 @@
+import hashlib
+import itertools
+
+import pecan
+import webob
+from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import strutils
 from pecan import rest
+from wsme import api as wsme_api
+from wsme.rest import json as wsme_json
 
+from starfish.common import cache
+from starfish.common import constants
 from starfish.common import data_models
 from starfish.common import exceptions
+from starfish.common import policy
 from starfish.db import repositories
 
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
@@ -15,29 +29,184 @@ class BaseController(rest.RestController):
         super(BaseController, self).__init__()
         self.repositories = repositories.Repositories()
 
+    @pecan.expose()
+    def _route(self, args, request=None):
+        """Sends collection GETs that ask for a stream to stream_all.
+
+        wsexpose serializes whole return values, so controllers that can
+        stream their listing implement it in a plain pecan handler named
+        stream_all, picked here instead of get_all when the client sends
+        "Accept: application/x-ndjson" or "?stream=true".
+        """
+        request = request or pecan.request
+        if (request.method == 'GET' and not any(args) and
+                hasattr(self, 'stream_all') and
+                self._is_stream_request(request)):
+            return self.stream_all, []
+        return super(BaseController, self)._route(args, request)
+
+    @staticmethod
+    def _is_stream_request(request):
+        if strutils.bool_from_string(request.params.get('stream')):
+            return True
+        return constants.APPLICATION_NDJSON in request.headers.get(
+            'Accept', '')
+
+    @staticmethod
+    def _get_fields(fields):
+        """Returns the attributes selected with ?fields=, None for all."""
+        # pecan passes the last value of a repeated query parameter to the
+        # handlers that take it as their first argument.
+        fields = pecan.request.params.getall('fields') or fields
+        if not fields or not CONF.api_settings.allow_field_selection:
+            return None
+        if isinstance(fields, str):
+            return [fields]
+        return fields
+
+    @staticmethod
+    def _get_db_fields(to_type, fields):
+        """Returns the data model attributes to load for fields of to_type.
+
+        Only these are fetched from the database and converted, see
+        BaseRepository.get_all. updated_at is always loaded, as the ETag
+        of the response is computed from it.
+        """
+        if fields is None:
+            return None
+        return to_type.translate_keys_to_data_model(fields) + ['updated_at']
+
+    def _get_auth_db_fields(self, repo, db_fields):
+        """Adds the attributes _auth_filter needs to the ones to load."""
+        if db_fields is None or self.RBAC_TYPE is None:
+            return db_fields
+        return db_fields + [attr for attr in policy.TARGET_ATTRIBUTES
+                            if attr not in db_fields and
+                            hasattr(repo.model_class, attr)]
+
+    def _auth_filter(self, context, data_models,
+                     action=constants.RBAC_GET_ONE):
+        """Returns the data models of a listing the context may act on.
+
+        The policy is evaluated with authorize_many, once per project and
+        owner. data_models may be an iterator, it is filtered lazily.
+        Controllers without an RBAC_TYPE return them all.
+        """
+        if self.RBAC_TYPE is None:
+            return data_models
+        action = '{rbac_obj}{action}'.format(
+            rbac_obj=self.RBAC_TYPE, action=action)
+        data_models, targets = itertools.tee(data_models)
+        allowed = policy.get_enforcer().authorize_many(
+            action, ({attr: getattr(data_model, attr, None)
+                      for attr in policy.TARGET_ATTRIBUTES}
+                     for data_model in targets), context)
+        return itertools.compress(data_models, allowed)
+
+    @staticmethod
+    def _make_etag(data_models):
+        """Returns the ETag of a representation of data_models.
+
+        It only depends on the id and the update time of the data models,
+        which are all loaded by the cheapest lookup of them.
+        """
+        digest = hashlib.sha256()
+        for data_model in data_models:
+            digest.update('{}/{}\n'.format(
+                data_model.id, data_model.updated_at).encode('utf-8'))
+        return digest.hexdigest()[:32]
+
     @staticmethod
-    def _convert_db_to_type(db_entity, to_type, children=False):
+    def _etag_response(etag, result):
+        """Returns result with its ETag, or a 304 if the client has it."""
+        pecan.response.etag = etag
+        if etag in pecan.request.if_none_match:
+            return wsme_api.Response(None, status_code=304,
+                                     return_type=None)
+        return result
+
+    def _response_cache_key(self, context):
+        # The project is part of the key so that responses filtered by
+        # project are never served to another project.
+        if self.RBAC_TYPE is None:
+            return '{}:{}'.format(context.project_id, pecan.request.path_qs)
+        # _auth_filter also filters them by the credentials the policy
+        # rules check, the owner ones compare the user.
+        return '{}:{}:{}:{}:{}'.format(
+            context.project_id, context.is_admin,
+            ','.join(sorted(context.roles)), context.user_id,
+            pecan.request.path_qs)
+
+    def _get_cached_response(self, context, resource):
+        """Returns the (etag, result) cached for this request, or None.
+
+        :param resource: name of the mapped class of the response, whose
+                         repository invalidates the cache.
+        """
+        response_cache = cache.get_response_cache()
+        if response_cache is None:
+            return None
+        return response_cache.get(resource, self._response_cache_key(context))
+
+    def _cache_response(self, context, resource, etag, result):
+        response_cache = cache.get_response_cache()
+        if response_cache is not None:
+            response_cache.set(resource, self._response_cache_key(context),
+                               (etag, result))
+
+    @staticmethod
+    def _stream_response(data_model_iter, to_type, fields=None):
+        """Returns a response streaming data models as NDJSON.
+
+        Each data model is converted to to_type and serialized on its own
+        line while the response body is being sent, so the whole listing is
+        never held in memory. Errors past this point can no longer change
+        the status code; they are logged and the stream is cut short.
+
+        :param data_model_iter: iterator of data models to send
+        :param to_type: WSME type each data model is converted to
+        :param fields: optional list of attributes to keep
+        """
+        def _lines():
+            try:
+                for data_model in data_model_iter:
+                    body = wsme_json.tojson(
+                        to_type, to_type.from_data_models(
+                            [data_model], fields=fields)[0])
+                    yield jsonutils.dump_as_bytes(body) + b'\n'
+            except Exception:
+                LOG.exception('Streaming %s failed, the response was '
+                              'truncated.', to_type.__name__)
+
+        return webob.Response(app_iter=_lines(),
+                              content_type=constants.APPLICATION_NDJSON,
+                              charset=None)
+
+    @staticmethod
+    def _convert_db_to_type(db_entity, to_type, children=False, fields=None):
         """Converts a data model into an Octavia WSME type
 
         :param db_entity: data model to convert
         :param to_type: converts db_entity to this type
+        :param fields: optional attributes to convert, the others are Unset
         """
         if isinstance(to_type, list):
             to_type = to_type[0]
 
-        def _convert(db_obj):
-            return to_type.from_data_model(db_obj, children=children)
-
         if isinstance(db_entity, list):
-            converted = [_convert(db_obj) for db_obj in db_entity]
-        else:
-            converted = _convert(db_entity)
-        return converted
+            return to_type.from_data_models(db_entity, children=children,
+                                            fields=fields)
+        if fields is not None:
+            return to_type.from_data_models([db_entity], children=children,
+                                            fields=fields)[0]
+        return to_type.from_data_model(db_entity, children=children)
 
     @staticmethod
-    def _get_db_obj(session, repo, data_model, id, show_deleted=True):
+    def _get_db_obj(session, repo, data_model, id, show_deleted=True,
+                    fields=None):
         """Gets an object from the database and returns it."""
-        db_obj = repo.get(session, id=id, show_deleted=show_deleted)
+        db_obj = repo.get(session, id=id, show_deleted=show_deleted,
+                          fields=fields)
         if not db_obj:
             LOG.debug('%(name)s %(id)s not found',
                       {'name': data_model._name(), 'id': id})
@@ -45,11 +214,11 @@ class BaseController(rest.RestController):
                 resource=data_model._name(), id=id)
         return db_obj
 
-    def _get_db_te(self, session, id, show_deleted=True):
+    def _get_db_te(self, session, id, show_deleted=True, fields=None):
         """Get a test entity from the database."""
         return self._get_db_obj(session, self.repositories.test_entity,
                                 data_models.TestEntity, id,
-                                show_deleted=show_deleted)
+                                show_deleted=show_deleted, fields=fields)
 
     # def _auth_get_all(self, context, project_id):
     #     # Check authorization to list objects under all projects
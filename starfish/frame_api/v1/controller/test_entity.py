@@ -2,13 +2,12 @@ import pecan
 from oslo_db import api as oslo_db_api
 from oslo_db import exception as odb_exceptions
 from oslo_log import log as logging
-from oslo_utils import uuidutils, excutils
+from oslo_utils import uuidutils
 from wsme import types as wtypes
 from wsmeext import pecan as wsme_pecan
 
 from starfish.common import constants
 from starfish.common import exceptions
-from starfish.db import api as db_api
 from starfish.frame_api.driver import driver_factory
 from starfish.frame_api.driver import utils as driver_utils
 from starfish.frame_api.v1.controller import base
@@ -27,17 +26,32 @@ class TestEntitiesController(base.BaseController):
     def get_one(self, id, fields=None):
         """Get a single test entity's details."""
         context = pecan.request.context.get('octavia_context')
-        test_entity_db = self._get_db_te(context.session, id)
+        resource = self.repositories.test_entity.model_class.__name__
+        cached = self._get_cached_response(context, resource)
+        if cached is not None:
+            return self._etag_response(*cached)
+
+        if pecan.request.if_none_match:
+            # The ETag only needs a primary key lookup of the update time.
+            etag = self._make_etag([self._get_db_te(
+                context.session, id, fields=['updated_at'])])
+            if etag in pecan.request.if_none_match:
+                return self._etag_response(etag, None)
+
+        fields = self._get_fields(fields)
+        test_entity_db = self._get_db_te(
+            context.session, id,
+            fields=self._get_db_fields(te_types.TestEntityResponse, fields))
 
         if id == constants.NIL_UUID:
             raise exceptions.NotFound(resource='Test Entity', id=constants.NIL_UUID)
 
         result = self._convert_db_to_type(
-            test_entity_db, te_types.TestEntityResponse)
-        if fields is not None:
-            result = self._filter_fields([result], fields)[0]
+            test_entity_db, te_types.TestEntityResponse, fields=fields)
+        etag = self._make_etag([test_entity_db])
+        self._cache_response(context, resource, etag, result)
         # return te_types.TestEntityResponse(test_entity=result)
-        return result
+        return self._etag_response(etag, result)
 
     @wsme_pecan.wsexpose(te_types.TestEntitiesRootResponse, wtypes.text,
                          [wtypes.text], ignore_extra_args=True)
@@ -45,41 +59,79 @@ class TestEntitiesController(base.BaseController):
         """List all test entities"""
         pcontext = pecan.request.context
         context = pcontext.get('octavia_context')
-        test_entity_db, links = self.repositories.test_entity.get_all(
+        repo = self.repositories.test_entity
+        resource = repo.model_class.__name__
+        cached = self._get_cached_response(context, resource)
+        if cached is not None:
+            return self._etag_response(*cached)
+
+        pagination_helper = pcontext.get(constants.PAGINATION_HELPER)
+        if pecan.request.if_none_match:
+            # Only the index columns of the page are needed for its ETag.
+            test_entity_db, _ = repo.get_all(
+                context.session, pagination_helper=pagination_helper,
+                fields=self._get_auth_db_fields(repo, ['updated_at']))
+            test_entity_db = list(self._auth_filter(context,
+                                                    test_entity_db))
+            etag = self._make_etag(test_entity_db)
+            if etag in pecan.request.if_none_match:
+                return self._etag_response(etag, None)
+
+        fields = self._get_fields(fields)
+        test_entity_db, links = repo.get_all(
             context.session,
-            # pagination_helper=pcontext.get(constants.PAGINATION_HELPER)
+            pagination_helper=pagination_helper,
+            fields=self._get_auth_db_fields(repo, self._get_db_fields(
+                te_types.TestEntityResponse, fields))
         )
+        test_entity_db = list(self._auth_filter(context, test_entity_db))
 
         result = self._convert_db_to_type(
-            test_entity_db, [te_types.TestEntityResponse])
-        if fields is not None:
-            result = self._filter_fields([result], fields)[0]
-
-        return te_types.TestEntitiesRootResponse(
+            test_entity_db, [te_types.TestEntityResponse], fields=fields)
+        result = te_types.TestEntitiesRootResponse(
             testentities=result, testentities_links=links
         )
+        etag = self._make_etag(test_entity_db)
+        self._cache_response(context, resource, etag, result)
+        return self._etag_response(etag, result)
+
+    @pecan.expose(content_type=constants.APPLICATION_NDJSON)
+    @pecan.expose(content_type=constants.APPLICATION_JSON)
+    def stream_all(self, fields=None, **kwargs):
+        """Stream all test entities as newline delimited JSON."""
+        pcontext = pecan.request.context
+        context = pcontext.get('octavia_context')
+        fields = self._get_fields(fields)
+        repo = self.repositories.test_entity
+        test_entities = repo.iter_all(
+            context.session,
+            pagination_helper=pcontext.get(constants.PAGINATION_HELPER),
+            fields=self._get_auth_db_fields(repo, self._get_db_fields(
+                te_types.TestEntityResponse, fields))
+        )
+        return self._stream_response(
+            self._auth_filter(context, test_entities),
+            te_types.TestEntityResponse, fields)
 
     @wsme_pecan.wsexpose(te_types.TestEntityResponse,
                          body=te_types.TestEntityRootPOST, status_code=201)
     def post(self, test_entity_):
         """create a test entity in db and agent"""
         test_entity_post = test_entity_.testentity
-        # context = pecan.request.context.get('octavia_context')
+        context = pecan.request.context.get('octavia_context')
 
-        lock_session = db_api.get_session(autocommit=True)
+        # The transaction is committed by DBSessionHook, flushing here
+        # reports conflicts while they can still be turned into a 409.
         try:
             test_entity_dict = test_entity_post.to_dict(render_unsets=True)
             # test_entity_dict[id] = uuidutils.generate_uuid()
             test_entity_dict.update(id=uuidutils.generate_uuid())
-            test_entity_db = self.repositories.test_entity.create(lock_session,
-                                                                  **test_entity_dict)
+            test_entity_db = self.repositories.test_entity.create(
+                context.session, **test_entity_dict)
+            context.session.flush()
         except odb_exceptions.DBDuplicateEntry:
-            lock_session.rollback()
             raise exceptions.RecordAlreadyExists(field='test_entity',
                                                  name=test_entity_post.name)
-        except Exception:
-            with excutils.save_and_reraise_exception():
-                lock_session.rollback()
 
         result = self._convert_db_to_type(test_entity_db,
                                           te_types.TestEntityResponse)
@@ -98,6 +150,54 @@ class TestEntitiesController(base.BaseController):
         pass
 
 
+class TestEntitiesBulkController(base.BaseController):
+    """Creates, updates and deletes many test entities in one request.
+
+    Routed as ``POST /v1/testentities:bulk``.
+    """
+
+    def __init__(self):
+        super(TestEntitiesBulkController, self).__init__()
+
+    @wsme_pecan.wsexpose(te_types.TestEntitiesBulkResponse,
+                         body=te_types.TestEntitiesBulkRootPOST,
+                         status_code=200)
+    def post(self, bulk):
+        """Applies all the changes of a bulk request in one transaction."""
+        repo = self.repositories.test_entity
+        create_dicts = []
+        for test_entity_post in bulk.create or []:
+            test_entity_dict = test_entity_post.to_dict(render_unsets=True)
+            test_entity_dict.update(id=uuidutils.generate_uuid())
+            create_dicts.append(test_entity_dict)
+        update_dicts = [test_entity_put.to_dict()
+                        for test_entity_put in bulk.update or []]
+
+        context = pecan.request.context.get('octavia_context')
+        try:
+            created = repo.create_many(context.session, create_dicts)
+            updated = repo.update_many(context.session, update_dicts)
+            deleted = repo.delete_many(context.session, bulk.delete or [])
+            context.session.flush()
+        except odb_exceptions.DBDuplicateEntry:
+            raise exceptions.RecordAlreadyExists(field='test_entity',
+                                                 name='bulk')
+
+        # Nothing is committed when an entity is missing, DBSessionHook
+        # rolls back the requests that fail.
+        missing = set(update_dict['id'] for update_dict in update_dicts)
+        missing.update(bulk.delete or [])
+        missing.difference_update(updated, deleted)
+        if missing:
+            raise exceptions.NotFound(resource='Test Entity',
+                                      id=', '.join(sorted(missing)))
+
+        return te_types.TestEntitiesBulkResponse(
+            created=self._convert_db_to_type(
+                created, [te_types.TestEntityResponse]),
+            updated=updated, deleted=deleted)
+
+
 class TestAgentController(base.BaseController):
 
     def __init__(self):
@@ -16,13 +16,6 @@ class TestEntityResponse(BaseTestEntityType):
     created_at = wtypes.wsattr(wtypes.datetime.datetime)
     updated_at = wtypes.wsattr(wtypes.datetime.datetime)
 
-    @classmethod
-    def from_data_model(cls, data_model, children=False):
-        testentity = super(TestEntityResponse, cls).from_data_model(
-            data_model, children=children
-        )
-        return testentity
-
 
 class TestEntityRootResponse(types.BaseType):
     testentity = wtypes.wsattr(TestEntityResponse)
@@ -50,3 +43,21 @@ class TestEntityPUT(BaseTestEntityType):
 
 class TestEntityRootPUT(types.BaseType):
     testentity = wtypes.wsattr(TestEntityPUT)
+
+
+class TestEntityBulkPUT(BaseTestEntityType):
+    """Defines the attributes of an update in a bulk request."""
+    id = wtypes.wsattr(wtypes.UuidType(), mandatory=True)
+    name = wtypes.wsattr(wtypes.StringType(max_length=255))
+
+
+class TestEntitiesBulkRootPOST(types.BaseType):
+    create = wtypes.wsattr([TestEntityPOST])
+    update = wtypes.wsattr([TestEntityBulkPUT])
+    delete = wtypes.wsattr([wtypes.UuidType()])
+
+
+class TestEntitiesBulkResponse(types.BaseType):
+    created = wtypes.wsattr([TestEntityResponse])
+    updated = wtypes.wsattr([wtypes.UuidType()])
+    deleted = wtypes.wsattr([wtypes.UuidType()])
@@ -0,0 +1,58 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import pecan
+import pecan.testing
+
+from starfish.frame_api import config as pconfig
+from starfish.tests.functional.db import base as base_db_test
+
+
+class BaseAPITest(base_db_test.StarfishDBTestBase):
+
+    BASE_PATH = '/v1'
+    TESTENTITIES_PATH = BASE_PATH + '/testentities'
+    TESTENTITY_PATH = TESTENTITIES_PATH + '/{id}'
+    BULK_PATH = BASE_PATH + '/testentities:bulk'
+    PROJECT_ID = 'project1'
+
+    def setUp(self):
+        super(BaseAPITest, self).setUp()
+        # The requests run against the database of the test.
+        self.useFixture(fixtures.MockPatch(
+            'starfish.db.api.get_session',
+            side_effect=lambda expire_on_commit=True, autocommit=True:
+            self.facade.get_session(expire_on_commit=expire_on_commit,
+                                    autocommit=autocommit)))
+        self.app = pecan.testing.load_test_app(
+            {'app': pconfig.app, 'wsme': pconfig.wsme}, argv=[''])
+        self.addCleanup(pecan.set_config, {}, overwrite=True)
+
+    def _headers(self, project_id=None, user_id='user1', roles=('member',)):
+        return {'X-Project-Id': project_id or self.PROJECT_ID,
+                'X-User-Id': user_id, 'X-Roles': ','.join(roles)}
+
+    def get(self, path, params=None, status=200, headers=None, **kwargs):
+        request_headers = self._headers(**kwargs)
+        request_headers.update(headers or {})
+        return self.app.get(path, params=params, status=status,
+                            headers=request_headers)
+
+    def post(self, path, body, status=201, **kwargs):
+        return self.app.post_json(path, body, status=status,
+                                  headers=self._headers(**kwargs))
+
+    def create_test_entity(self, name, manage_ip='192.0.2.1'):
+        return self.post(self.TESTENTITIES_PATH,
+                         {'testentity': {'name': name,
+                                         'manage_ip': manage_ip}}).json
@@ -0,0 +1,212 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+from unittest import mock
+
+import fixtures
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from oslo_utils import uuidutils
+
+from starfish.common import cache
+from starfish.common import constants
+from starfish.db import repositories
+from starfish.frame_api.v1.controller import test_entity
+from starfish.tests.functional.api.v1 import base
+
+
+class TestTestEntitiesBulk(base.BaseAPITest):
+
+    def _names(self):
+        return sorted(test_entity['name'] for test_entity in self.get(
+            self.TESTENTITIES_PATH).json['testentities'])
+
+    def test_bulk(self):
+        first = self.create_test_entity('first')
+        second = self.create_test_entity('second')
+        response = self.post(self.BULK_PATH, {
+            'create': [{'name': 'third', 'manage_ip': '192.0.2.3'}],
+            'update': [{'id': first['id'], 'name': 'renamed'}],
+            'delete': [second['id']]}, status=200).json
+        self.assertEqual(['third'],
+                         [created['name'] for created in response['created']])
+        self.assertEqual([first['id']], response['updated'])
+        self.assertEqual([second['id']], response['deleted'])
+        self.assertEqual(['renamed', 'third'], self._names())
+
+    def test_bulk_missing_entity(self):
+        first = self.create_test_entity('first')
+        missing_id = uuidutils.generate_uuid()
+        response = self.post(self.BULK_PATH, {
+            'create': [{'name': 'second', 'manage_ip': '192.0.2.2'}],
+            'delete': [first['id'], missing_id]}, status=404).json
+        self.assertIn(missing_id, response['faultstring'])
+        # Nothing of the request was applied.
+        self.assertEqual(['first'], self._names())
+
+    def test_bulk_update_missing_entity(self):
+        self.create_test_entity('first')
+        self.post(self.BULK_PATH, {
+            'update': [{'id': uuidutils.generate_uuid(), 'name': 'renamed'}]},
+            status=404)
+        self.assertEqual(['first'], self._names())
+
+
+class TestTestEntitiesResponseCache(base.BaseAPITest):
+
+    def setUp(self):
+        super(TestTestEntitiesResponseCache, self).setUp()
+        conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        conf.config(group='api_settings',
+                    response_cache_backend=cache.MEMORY_BACKEND)
+        cache.reset_response_cache()
+        self.addCleanup(cache.reset_response_cache)
+        self.useFixture(fixtures.MockPatchObject(
+            test_entity.TestEntitiesController, 'RBAC_TYPE',
+            constants.RBAC_LOADBALANCER))
+        self.create_test_entity('first')
+
+    def _names(self, **kwargs):
+        return [test_entity['name'] for test_entity in self.get(
+            self.TESTENTITIES_PATH, **kwargs).json['testentities']]
+
+    def test_get_all_roles(self):
+        # Test entities have no project, only admins may read them.
+        self.assertEqual(['first'], self._names(roles=('admin',)))
+        self.assertEqual([], self._names(roles=('load-balancer_member',)))
+        self.assertEqual(['first'], self._names(roles=('admin',)))
+
+    def test_get_all_cached_until_commit(self):
+        repo = repositories.TestEntityRepository
+        with mock.patch.object(repo, 'get_all', autospec=True,
+                               side_effect=repo.get_all) as get_all:
+            admin = {'roles': ('admin',)}
+            self.assertEqual(['first'], self._names(**admin))
+            self.assertEqual(['first'], self._names(**admin))
+            self.assertEqual(1, get_all.call_count)
+            # Creating an entity drops the cached listings.
+            self.create_test_entity('second')
+            self.assertEqual(['first', 'second'],
+                             sorted(self._names(**admin)))
+            self.assertEqual(2, get_all.call_count)
+
+
+class TestTestEntitiesETag(base.BaseAPITest):
+
+    def setUp(self):
+        super(TestTestEntitiesETag, self).setUp()
+        self.test_entity = self.create_test_entity('first')
+        self.path = self.TESTENTITY_PATH.format(id=self.test_entity['id'])
+
+    def _check_etag(self, path):
+        response = self.get(path)
+        etag = response.headers['ETag']
+        self.assertTrue(etag)
+        not_modified = self.get(path, status=304,
+                                headers={'If-None-Match': etag})
+        self.assertEqual(b'', not_modified.body)
+        self.assertEqual(etag, not_modified.headers['ETag'])
+        # Another version of the representation is sent in full.
+        self.assertEqual(response.json, self.get(
+            path, headers={'If-None-Match': '"other"'}).json)
+        return etag
+
+    def test_get_one(self):
+        etag = self._check_etag(self.path)
+        self.post(self.BULK_PATH, {'update': [
+            {'id': self.test_entity['id'], 'name': 'renamed'}]}, status=200)
+        response = self.get(self.path, headers={'If-None-Match': etag})
+        self.assertNotEqual(etag, response.headers['ETag'])
+        self.assertEqual('renamed', response.json['name'])
+
+    def test_get_all(self):
+        etag = self._check_etag(self.TESTENTITIES_PATH)
+        self.create_test_entity('second')
+        response = self.get(self.TESTENTITIES_PATH,
+                            headers={'If-None-Match': etag})
+        self.assertNotEqual(etag, response.headers['ETag'])
+        self.assertEqual(2, len(response.json['testentities']))
+
+
+class TestTestEntitiesStream(base.BaseAPITest):
+
+    def setUp(self):
+        super(TestTestEntitiesStream, self).setUp()
+        self.test_entities = [self.create_test_entity(name)
+                              for name in ('first', 'second', 'third')]
+
+    def _check_stream(self, response):
+        self.assertEqual(constants.APPLICATION_NDJSON, response.content_type)
+        lines = response.body.decode('utf-8').splitlines()
+        self.assertEqual(
+            sorted(test_entity['id'] for test_entity in self.test_entities),
+            sorted(json.loads(line)['id'] for line in lines))
+
+    def test_stream_param(self):
+        self._check_stream(self.get(self.TESTENTITIES_PATH,
+                                    params={'stream': 'true'}))
+
+    def test_stream_accept(self):
+        self._check_stream(self.get(
+            self.TESTENTITIES_PATH,
+            headers={'Accept': constants.APPLICATION_NDJSON}))
+
+    def test_stream_fields(self):
+        response = self.get(self.TESTENTITIES_PATH,
+                            params={'stream': 'true', 'fields': 'name'})
+        self.assertEqual(
+            [{'name': 'first'}, {'name': 'second'}, {'name': 'third'}],
+            sorted((json.loads(line) for line in
+                    response.body.decode('utf-8').splitlines()),
+                   key=lambda test_entity: test_entity['name']))
+
+    def test_not_streamed(self):
+        response = self.get(self.TESTENTITIES_PATH,
+                            params={'stream': 'false'})
+        self.assertEqual(constants.APPLICATION_JSON, response.content_type)
+        self.assertEqual(3, len(response.json['testentities']))
+
+
+class TestTestEntitiesFields(base.BaseAPITest):
+
+    def setUp(self):
+        super(TestTestEntitiesFields, self).setUp()
+        self.test_entity = self.create_test_entity('first')
+        self.path = self.TESTENTITY_PATH.format(id=self.test_entity['id'])
+
+    def test_get_one(self):
+        self.assertEqual({'name': 'first'},
+                         self.get(self.path, params={'fields': 'name'}).json)
+
+    def test_get_all(self):
+        self.assertEqual(
+            [{'name': 'first'}],
+            self.get(self.TESTENTITIES_PATH,
+                     params={'fields': 'name'}).json['testentities'])
+
+    def test_repeated_fields(self):
+        params = [('fields', 'name'), ('fields', 'manage_ip')]
+        expected = {'name': 'first', 'manage_ip': '192.0.2.1'}
+        self.assertEqual(expected, self.get(self.path, params=params).json)
+        self.assertEqual([expected], self.get(
+            self.TESTENTITIES_PATH, params=params).json['testentities'])
+
+    def test_field_selection_disabled(self):
+        self.useFixture(oslo_fixture.Config(cfg.CONF)).config(
+            group='api_settings', allow_field_selection=False)
+        self.assertEqual(self.test_entity,
+                         self.get(self.path, params={'fields': 'name'}).json)
+        self.assertEqual(
+            [self.test_entity],
+            self.get(self.TESTENTITIES_PATH,
+                     params={'fields': 'name'}).json['testentities'])
@@ -0,0 +1,42 @@
+#    Copyright 2014 Rackspace
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from oslo_db.sqlalchemy import session as db_session
+from oslo_db.sqlalchemy import test_base
+
+from starfish.common import config
+from starfish.db import base_models
+# Import the models so they are registered on the declarative base.
+from starfish.db import models  # noqa: F401
+
+
+class StarfishDBTestBase(test_base.DbTestCase):
+
+    def setUp(self, connection_string='sqlite://'):
+        super(StarfishDBTestBase, self).setUp()
+        conf = self.useFixture(oslo_fixture.Config(config.cfg.CONF))
+        conf.config(group="database", connection=connection_string)
+
+        # We need to get our own Facade so that the tests don't use the
+        # _FACADE singleton of starfish.db.api.
+        facade = db_session.EngineFacade.from_config(cfg.CONF,
+                                                     sqlite_fk=True)
+        self.facade = facade
+        self.engine = facade.get_engine()
+        self.session = facade.get_session(expire_on_commit=True,
+                                          autocommit=True)
+
+        base_models.BASE.metadata.create_all(self.engine)
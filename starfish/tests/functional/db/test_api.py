@@ -0,0 +1,44 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy.sql.expression import select
+
+from starfish.db import api as db_api
+from starfish.tests.functional.db import base
+
+
+class PoolMetricsTest(base.StarfishDBTestBase):
+
+    def test_checkouts(self):
+        metrics = db_api.PoolMetrics(self.engine)
+        with self.engine.connect() as conn:
+            conn.scalar(select([1]))
+            self.assertEqual(1, metrics.as_dict()['checked_out'])
+        self.engine.scalar(select([1]))
+
+        stats = metrics.as_dict()
+        self.assertEqual(2, stats['checkouts'])
+        self.assertEqual(0, stats['checked_out'])
+        self.assertEqual(1, stats['checked_out_peak'])
+
+    def test_connect_time(self):
+        metrics = db_api.PoolMetrics(self.engine)
+        # Disposing the engine replaces its pool, the listeners carry over
+        # and the next checkout opens a new connection.
+        self.engine.dispose()
+        self.engine.scalar(select([1]))
+        stats = metrics.as_dict()
+        self.assertEqual(1, stats['connections_opened'])
+        self.assertEqual(1, stats['checkouts'])
+        self.assertGreater(stats['connect_time_total'], 0)
+        self.assertEqual(stats['connect_time_total'],
+                         stats['connect_time_mean'])
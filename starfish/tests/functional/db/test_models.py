@@ -0,0 +1,63 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import uuidutils
+
+from starfish.common import data_models
+from starfish.db import base_models
+from starfish.db import models
+from starfish.tests.functional.db import base
+
+
+class TestEntityModelTest(base.StarfishDBTestBase):
+
+    def create_test_entity(self, **overrides):
+        kwargs = {'id': uuidutils.generate_uuid(),
+                  'name': 'entity1',
+                  'manage_ip': '192.0.2.10'}
+        kwargs.update(overrides)
+        with self.session.begin():
+            entity = models.TestEntity(**kwargs)
+            self.session.add(entity)
+        return entity
+
+    def test_to_data_model(self):
+        entity = self.create_test_entity()
+        dm = entity.to_data_model()
+        self.assertIsInstance(dm, data_models.TestEntity)
+        self.assertEqual(entity.id, dm.id)
+        self.assertEqual('entity1', dm.name)
+        self.assertEqual('192.0.2.10', dm.manage_ip)
+        self.assertEqual(entity.created_at, dm.created_at)
+
+    def test_to_data_model_registers_graph_node(self):
+        entity = self.create_test_entity()
+        graph_nodes = {}
+        dm = entity.to_data_model(_graph_nodes=graph_nodes)
+        self.assertIs(dm, graph_nodes['TestEntity' + entity.id])
+
+    def test_to_data_model_depth_zero(self):
+        entity = self.create_test_entity()
+        dm = entity.to_data_model(depth=0)
+        self.assertEqual(entity.id, dm.id)
+
+    def test_converter_is_cached(self):
+        converter = base_models.get_converter(models.TestEntity)
+        self.assertIs(converter, base_models.get_converter(models.TestEntity))
+        self.assertEqual({'id', 'created_at', 'updated_at', 'name',
+                          'manage_ip'}, set(converter.columns))
+        self.assertEqual((), converter.attributes)
+
+    def test_unique_key(self):
+        entity = self.create_test_entity()
+        self.assertEqual('TestEntity' + entity.id,
+                         base_models.OctaviaBase._get_unique_key(entity))
@@ -0,0 +1,143 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+import fixtures
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from six.moves.urllib import parse
+
+from starfish.common import exceptions
+from starfish.db import repositories
+from starfish.frame_api.common import pagination
+from starfish.tests.functional.db import base
+
+
+class KeysetPaginationTest(base.StarfishDBTestBase):
+
+    def setUp(self):
+        super(KeysetPaginationTest, self).setUp()
+        conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        conf.config(group='api_settings', pagination_cursor_key='test-key')
+        request = self.useFixture(
+            fixtures.MockPatchObject(pagination, 'request')).mock
+        request.path_url = 'http://localhost/v1/testentities'
+        self.repo = repositories.TestEntityRepository()
+        self.repo.create_many(
+            self.session,
+            [{'name': 'entity{}'.format(i % 3),
+              'manage_ip': '192.0.2.{}'.format(i)} for i in range(7)])
+
+    def _get_page(self, **params):
+        helper = pagination.PaginationHelper(params)
+        entities, links = self.repo.get_all(self.session,
+                                            pagination_helper=helper)
+        return entities, {link.rel: parse.parse_qs(
+            parse.urlparse(link.href).query) for link in links}
+
+    def _walk(self, **params):
+        entities, links = self._get_page(**params)
+        seen = [e.id for e in entities]
+        while 'next' in links:
+            params['marker'] = links['next']['marker'][0]
+            entities, links = self._get_page(**params)
+            seen.extend(e.id for e in entities)
+        return seen, entities, links
+
+    def test_walk_default_order(self):
+        everything, _ = self._get_page(limit='infinite')
+        seen, _, _ = self._walk(limit=3)
+        self.assertEqual([e.id for e in everything], seen)
+
+    def test_walk_mixed_directions(self):
+        everything, _ = self._get_page(limit='infinite',
+                                       sort='name:desc,created_at:asc')
+        seen, _, _ = self._walk(limit=2, sort='name:desc,created_at:asc')
+        self.assertEqual([e.id for e in everything], seen)
+
+    def test_walk_null_and_empty_names(self):
+        self.repo.create_many(
+            self.session,
+            [{'name': name, 'manage_ip': '192.0.2.{}'.format(10 + i)}
+             for i, name in enumerate([None, '', None, '', 'entity1'])])
+        for sort in ('name:asc', 'name:desc', 'name:asc,created_at:desc'):
+            everything, _ = self._get_page(limit='infinite', sort=sort)
+            names = [e.name for e in everything]
+            if sort.startswith('name:asc'):
+                self.assertEqual([None, None, '', ''], names[:4])
+            else:
+                self.assertEqual(['', '', None, None], names[-4:])
+            for limit in (1, 2, 3):
+                seen, _, _ = self._walk(limit=limit, sort=sort)
+                self.assertEqual([e.id for e in everything], seen)
+
+            # Walking back from the last page.
+            entities, links = self._get_page(
+                limit=2, sort=sort, marker=everything[-3].id)
+            seen = [e.id for e in entities]
+            while 'previous' in links:
+                entities, links = self._get_page(
+                    limit=2, sort=sort,
+                    marker=links['previous']['marker'][0])
+                seen[:0] = [e.id for e in entities]
+            self.assertEqual([e.id for e in everything], seen)
+
+    def test_previous_page(self):
+        first, links = self._get_page(limit=3)
+        _, links = self._get_page(limit=3,
+                                  marker=links['next']['marker'][0])
+        previous, _ = self._get_page(limit=3,
+                                     marker=links['previous']['marker'][0])
+        self.assertEqual([e.id for e in first], [e.id for e in previous])
+
+    def test_marker_row_is_not_fetched(self):
+        _, links = self._get_page(limit=3)
+        with mock.patch.object(pagination.PaginationHelper,
+                               '_parse_marker') as parse_marker:
+            self._get_page(limit=3, marker=links['next']['marker'][0])
+        parse_marker.assert_not_called()
+
+    def test_legacy_id_marker(self):
+        everything, _ = self._get_page(limit='infinite')
+        entities, _ = self._get_page(limit=3, marker=everything[2].id)
+        self.assertEqual([e.id for e in everything[3:6]],
+                         [e.id for e in entities])
+
+    def test_tampered_marker(self):
+        _, links = self._get_page(limit=3)
+        marker = links['next']['marker'][0]
+        self.assertRaises(exceptions.InvalidMarker, self._get_page,
+                          limit=3, marker=marker[:-2] + 'AA')
+        self.assertRaises(exceptions.InvalidMarker, self._get_page,
+                          limit=3, marker=marker, sort='name')
+        self.assertRaises(exceptions.InvalidMarker, self._get_page,
+                          limit=3, marker='garbage')
+
+    def test_stream_ignores_max_limit(self):
+        self.useFixture(oslo_fixture.Config(cfg.CONF)).config(
+            group='api_settings', pagination_max_limit='2')
+        everything, _ = self._get_page(limit='infinite')
+        helper = pagination.PaginationHelper({})
+        streamed = self.repo.iter_all(self.session, pagination_helper=helper,
+                                      batch_size=3)
+        self.assertEqual([e.id for e in everything],
+                         [e.id for e in streamed])
+
+    def test_stream_honours_limit_and_marker(self):
+        everything, _ = self._get_page(limit='infinite')
+        _, links = self._get_page(limit=2)
+        helper = pagination.PaginationHelper(
+            {'limit': '3', 'marker': links['next']['marker'][0]})
+        streamed = self.repo.iter_all(self.session, pagination_helper=helper)
+        self.assertEqual([e.id for e in everything[2:5]],
+                         [e.id for e in streamed])
@@ -0,0 +1,382 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from oslo_utils import uuidutils
+import sqlalchemy as sa
+from sqlalchemy.ext import declarative
+from sqlalchemy.orm import exc as orm_exc
+
+from starfish.common import cache
+from starfish.common import data_models
+from starfish.db import base_models
+from starfish.db import repositories
+from starfish.tests.functional.db import base
+
+
+class TestEntityRepositoryTest(base.StarfishDBTestBase):
+
+    def setUp(self):
+        super(TestEntityRepositoryTest, self).setUp()
+        self.repo = repositories.TestEntityRepository()
+
+    def _create_many(self, count, **kwargs):
+        return self.repo.create_many(
+            self.session,
+            [{'name': 'entity{}'.format(i),
+              'manage_ip': '192.0.2.{}'.format(i)} for i in range(count)],
+            **kwargs)
+
+    def test_create_many(self):
+        created = self._create_many(5, batch_size=2)
+        self.assertEqual(5, len(created))
+        for dm in created:
+            self.assertIsInstance(dm, data_models.TestEntity)
+            self.assertTrue(uuidutils.is_uuid_like(dm.id))
+            self.assertIsNotNone(dm.created_at)
+            self.assertEqual(dm, self.repo.get(self.session, id=dm.id))
+        self.assertEqual(5, self.repo.count(self.session))
+
+    def test_delete_many(self):
+        created = self._create_many(5)
+        ids = [dm.id for dm in created[:3]]
+        deleted = self.repo.delete_many(
+            self.session, ids + [uuidutils.generate_uuid()], batch_size=2)
+        self.assertEqual(ids, deleted)
+        self.assertEqual(2, self.repo.count(self.session))
+
+    def test_delete_batch(self):
+        created = self._create_many(3)
+        self.repo.delete_batch(self.session, ids=[dm.id for dm in created])
+        self.assertEqual(0, self.repo.count(self.session))
+
+    def test_delete_batch_missing(self):
+        created = self._create_many(2)
+        self.assertRaises(
+            orm_exc.NoResultFound, self.repo.delete_batch, self.session,
+            ids=[created[0].id, uuidutils.generate_uuid()])
+        self.assertEqual(2, self.repo.count(self.session))
+
+    def test_update_many(self):
+        created = self._create_many(3)
+        missing_id = uuidutils.generate_uuid()
+        updated = self.repo.update_many(
+            self.session,
+            [{'id': created[0].id, 'name': 'renamed0'},
+             {'id': created[2].id, 'name': 'renamed2'},
+             {'id': missing_id, 'name': 'missing'}], batch_size=2)
+        self.assertEqual([created[0].id, created[2].id], updated)
+        self.assertEqual('renamed0',
+                         self.repo.get(self.session, id=created[0].id).name)
+        self.assertEqual('entity1',
+                         self.repo.get(self.session, id=created[1].id).name)
+        self.assertIsNotNone(
+            self.repo.get(self.session, id=created[2].id).updated_at)
+
+    def test_iter_all(self):
+        created = self._create_many(5)
+        entities = self.repo.iter_all(self.session, batch_size=2)
+        self.assertFalse(isinstance(entities, list))
+        self.assertEqual(sorted(dm.id for dm in created),
+                         sorted(dm.id for dm in entities))
+
+    def test_get_all_fields(self):
+        created = self._create_many(3)
+        self.session.expire_all()
+        entities, _ = self.repo.get_all(self.session, fields=['name'])
+        self.assertEqual(sorted(dm.name for dm in created),
+                         sorted(dm.name for dm in entities))
+        for dm in entities:
+            self.assertIsNotNone(dm.id)
+            self.assertIsNone(dm.manage_ip)
+        # The other columns were neither fetched nor lazy loaded.
+        for model in self.session.identity_map.values():
+            self.assertIn('manage_ip', sa.inspect(model).unloaded)
+
+    def test_get_fields(self):
+        created = self._create_many(1)[0]
+        self.session.expire_all()
+        dm = self.repo.get(self.session, id=created.id, fields=['manage_ip'])
+        self.assertEqual(created.manage_ip, dm.manage_ip)
+        self.assertIsNone(dm.name)
+
+    def test_cache_invalidated_on_commit(self):
+        self.useFixture(oslo_fixture.Config(cfg.CONF)).config(
+            group='api_settings', response_cache_backend=cache.MEMORY_BACKEND)
+        cache.reset_response_cache()
+        self.addCleanup(cache.reset_response_cache)
+        response_cache = cache.get_response_cache()
+        response_cache.set('TestEntity', 'key', 'value')
+
+        with self.session.begin():
+            self._create_many(1)
+            self.assertEqual('value',
+                             response_cache.get('TestEntity', 'key'))
+        self.assertIsNone(response_cache.get('TestEntity', 'key'))
+
+
+class EntityCacheTest(base.StarfishDBTestBase):
+
+    def setUp(self):
+        super(EntityCacheTest, self).setUp()
+        self.useFixture(oslo_fixture.Config(cfg.CONF)).config(
+            group='entity_cache', enabled_models=['TestEntity'])
+        cache.reset_entity_caches()
+        self.addCleanup(cache.reset_entity_caches)
+        self.repo = repositories.TestEntityRepository()
+        self.entity = self.repo.create(self.session, name='entity',
+                                       manage_ip='192.0.2.1')
+        self.entity_cache = cache.get_entity_cache(self.repo.model_class)
+
+    def test_get_cached(self):
+        self.assertEqual(self.entity,
+                         self.repo.get(self.session, id=self.entity.id))
+        with mock.patch.object(self.repo, '_get') as get:
+            self.assertEqual(self.entity,
+                             self.repo.get(self.session, id=self.entity.id))
+        get.assert_not_called()
+        self.assertEqual({'hits': 1, 'misses': 1},
+                         self.entity_cache.stats())
+
+    def test_update_invalidates(self):
+        self.repo.get(self.session, id=self.entity.id)
+        with self.session.begin():
+            self.repo.update(self.session, self.entity.id, name='renamed')
+            # Not committed yet, the session reads its own write.
+            self.assertEqual('renamed', self.repo.get(
+                self.session, id=self.entity.id).name)
+        self.assertEqual('renamed', self.repo.get(
+            self.session, id=self.entity.id).name)
+
+    def test_get_held_instance(self):
+        # The session holds the entity loaded before another one changes it.
+        held = self.session.query(self.repo.model_class).get(self.entity.id)
+        self.repo.update(self.facade.get_session(), self.entity.id,
+                         name='renamed')
+        self.assertEqual('renamed', self.repo.get(
+            self.session, id=self.entity.id).name)
+        self.assertEqual('renamed', self.repo.get(
+            self.facade.get_session(), id=self.entity.id).name)
+        self.assertEqual('renamed', held.name)
+
+    def test_get_in_older_transaction_not_stored(self):
+        with self.session.begin():
+            # The transaction reads the database before the version token.
+            self.session.query(self.repo.model_class).count()
+            self.repo.get(self.session, id=self.entity.id)
+        # Missed again, then stored.
+        self.repo.get(self.session, id=self.entity.id)
+        self.repo.get(self.session, id=self.entity.id)
+        self.assertEqual({'hits': 1, 'misses': 2},
+                         self.entity_cache.stats())
+
+    def test_filtered_get_not_cached(self):
+        self.repo.get(self.session, id=self.entity.id, name='entity')
+        self.repo.get(self.session, id=self.entity.id, fields=['name'])
+        self.assertEqual({'hits': 0, 'misses': 0},
+                         self.entity_cache.stats())
+
+
+class CertificateExpiryRepositoryTest(base.StarfishDBTestBase):
+
+    def setUp(self):
+        super(CertificateExpiryRepositoryTest, self).setUp()
+        self.repo = repositories.CertificateExpiryRepository()
+        self.now = datetime.datetime(2026, 1, 1)
+        self.repo.record(self.session, 'project', {
+            'ref{}'.format(days): self.now + datetime.timedelta(days=days)
+            for days in range(10)})
+
+    def _expirations(self):
+        return {model.cert_ref: model.expiration
+                for model in self.session.query(self.repo.model_class)}
+
+    def test_record(self):
+        expirations = self._expirations()
+        self.assertEqual(10, len(expirations))
+        renewed = self.now + datetime.timedelta(days=365)
+        self.repo.record(self.session, 'project', {'ref0': renewed})
+        self.session.expire_all()
+        expirations['ref0'] = renewed
+        self.assertEqual(expirations, self._expirations())
+
+    def test_record_concurrent_insert(self):
+        renewed = self.now + datetime.timedelta(days=365)
+        indexed = self.repo._indexed
+        lookups = iter([lambda session, cert_refs: {}, indexed])
+        # ref0 was indexed by another request after the first lookup.
+        with mock.patch.object(
+                self.repo, '_indexed',
+                side_effect=lambda *args: next(lookups)(*args)) as lookup:
+            self.repo.record(self.session, 'project', {'ref0': renewed})
+        self.assertEqual(2, lookup.call_count)
+        self.session.expire_all()
+        expirations = self._expirations()
+        self.assertEqual(10, len(expirations))
+        self.assertEqual(renewed, expirations['ref0'])
+
+    def _claim(self, days, **kwargs):
+        return [cert.cert_ref for cert in self.repo.claim_expiring(
+            self.session, self.now + datetime.timedelta(days=days),
+            **kwargs)]
+
+    def test_claim_expiring(self):
+        claimed = self.repo.claim_expiring(
+            self.session, self.now + datetime.timedelta(days=3))
+        self.assertEqual(['ref0', 'ref1', 'ref2'],
+                         [cert.cert_ref for cert in claimed])
+        self.assertTrue(all(cert.rotating for cert in claimed))
+        self.assertTrue(all(cert.claimed_at for cert in claimed))
+        # Not claimed again until released.
+        self.assertEqual(['ref3'], self._claim(4))
+
+        renewed = self.now + datetime.timedelta(days=365)
+        self.repo.release(self.session, claimed[0].id, renewed)
+        self.repo.release(self.session, claimed[1].id)
+        self.assertEqual(['ref1'], self._claim(4))
+
+    def test_claim_expiring_stale_claim(self):
+        self.assertEqual(['ref0', 'ref1'], self._claim(2))
+        # The claimer died without releasing ref0 and ref1.
+        self.session.query(self.repo.model_class).filter(
+            self.repo.model_class.cert_ref == 'ref0').update(
+            {'claimed_at': datetime.datetime.utcnow() -
+             datetime.timedelta(seconds=120)})
+        self.assertEqual([], self._claim(2, claim_timeout=300))
+        self.assertEqual(['ref0'], self._claim(2, claim_timeout=60))
+
+    def test_claim_expiring_uses_expiration_index(self):
+        statements = []
+        sa.event.listen(self.engine, 'before_cursor_execute',
+                        lambda *args: statements.append(args[2:4]))
+        self.repo.claim_expiring(self.session, self.now)
+        select, parameters = next(
+            statement for statement in statements
+            if statement[0].startswith('SELECT certificate_expiry'))
+        plan = ' '.join(str(row) for row in self.engine.execute(
+            'EXPLAIN QUERY PLAN ' + select, parameters))
+        self.assertIn('idx_certificate_expiry_expiration', plan)
+
+
+class ListenerStatisticsRepositoryTest(base.StarfishDBTestBase):
+
+    def setUp(self):
+        super(ListenerStatisticsRepositoryTest, self).setUp()
+        self.repo = repositories.ListenerStatisticsRepository()
+
+    def _stats(self):
+        return {(model.listener_id, model.amphora_id): model.bytes_in
+                for model in self.session.query(self.repo.model_class)}
+
+    def test_upsert_many(self):
+        self.repo.upsert_many(self.session, [
+            {'listener_id': 'listener1', 'amphora_id': 'amp1',
+             'bytes_in': 1},
+            {'listener_id': 'listener1', 'amphora_id': 'amp2',
+             'bytes_in': 2}])
+        self.repo.upsert_many(self.session, [
+            {'listener_id': 'listener1', 'amphora_id': 'amp2',
+             'bytes_in': 20},
+            {'listener_id': 'listener2', 'amphora_id': 'amp1',
+             'bytes_in': 3}], batch_size=1)
+        self.session.expire_all()
+        self.assertEqual({('listener1', 'amp1'): 1,
+                          ('listener1', 'amp2'): 20,
+                          ('listener2', 'amp1'): 3}, self._stats())
+        model = self.session.query(self.repo.model_class).filter_by(
+            listener_id='listener2').one()
+        self.assertEqual(0, model.request_errors)
+
+    def test_upsert_many_sorted(self):
+        with mock.patch.object(self.session, 'bulk_insert_mappings') as bulk:
+            self.repo.upsert_many(self.session, [
+                {'listener_id': 'listener2', 'amphora_id': 'amp1'},
+                {'listener_id': 'listener1', 'amphora_id': 'amp2'},
+                {'listener_id': 'listener1', 'amphora_id': 'amp1'}])
+        self.assertEqual(
+            [('listener1', 'amp1'), ('listener1', 'amp2'),
+             ('listener2', 'amp1')],
+            [(row['listener_id'], row['amphora_id'])
+             for row in bulk.call_args[0][1]])
+
+    def test_upsert_many_concurrent_insert(self):
+        self.repo.upsert_many(self.session, [
+            {'listener_id': 'listener1', 'amphora_id': 'amp1',
+             'bytes_in': 1}])
+        existing_keys = self.repo._existing_keys
+        lookups = iter([lambda *args: set(), existing_keys])
+        # The row was inserted by another health manager after the first
+        # lookup.
+        with mock.patch.object(
+                self.repo, '_existing_keys',
+                side_effect=lambda *args: next(lookups)(*args)) as lookup:
+            self.repo.upsert_many(self.session, [
+                {'listener_id': 'listener1', 'amphora_id': 'amp1',
+                 'bytes_in': 10}])
+        self.assertEqual(2, lookup.call_count)
+        self.session.expire_all()
+        self.assertEqual({('listener1', 'amp1'): 10}, self._stats())
+
+
+_SOFT_DELETED_BASE = declarative.declarative_base()
+
+
+class _SoftDeleted(_SOFT_DELETED_BASE, base_models.IdMixin):
+    __tablename__ = 'soft_deleted'
+
+    provisioning_status = sa.Column(sa.String(16), nullable=False)
+    updated_at = sa.Column(sa.DateTime)
+
+
+class _SoftDeletedRepository(repositories.BaseRepository):
+    model_class = _SoftDeleted
+
+
+class PurgeDeletedExpiringTest(base.StarfishDBTestBase):
+
+    def setUp(self):
+        super(PurgeDeletedExpiringTest, self).setUp()
+        _SOFT_DELETED_BASE.metadata.create_all(self.engine)
+        self.repo = _SoftDeletedRepository()
+        self.exp_age = datetime.timedelta(days=1)
+        old = datetime.datetime.utcnow() - datetime.timedelta(days=2)
+        rows = [('id{}'.format(i), 'DELETED', old) for i in range(5)]
+        rows += [('id5', 'ACTIVE', old),
+                 ('id6', 'DELETED', datetime.datetime.utcnow())]
+        self.session.execute(_SoftDeleted.__table__.insert(), [
+            {'id': id, 'provisioning_status': status, 'updated_at': updated}
+            for id, status, updated in rows])
+
+    def _ids(self):
+        return sorted(row.id for row in self.session.query(_SoftDeleted.id))
+
+    def test_get_all_deleted_expiring(self):
+        self.assertEqual(
+            ['id0', 'id1', 'id2', 'id3', 'id4'],
+            sorted(self.repo.get_all_deleted_expiring(self.session,
+                                                      self.exp_age)))
+
+    def test_purge_deleted_expiring(self):
+        self.assertEqual((2, 'id1'), self.repo.purge_deleted_expiring(
+            self.session, self.exp_age, 2))
+        self.assertEqual(['id2', 'id3', 'id4', 'id5', 'id6'], self._ids())
+        self.assertEqual((2, 'id3'), self.repo.purge_deleted_expiring(
+            self.session, self.exp_age, 2, after_id='id1'))
+        self.assertEqual((1, 'id4'), self.repo.purge_deleted_expiring(
+            self.session, self.exp_age, 2, after_id='id3'))
+        self.assertEqual((0, None), self.repo.purge_deleted_expiring(
+            self.session, self.exp_age, 2, after_id='id4'))
+        self.assertEqual(['id5', 'id6'], self._ids())
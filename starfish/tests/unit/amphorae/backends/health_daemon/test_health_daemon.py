@@ -0,0 +1,138 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import queue
+import socket
+import tempfile
+import threading
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.amphorae.backends.health_daemon import health_daemon
+from starfish.amphorae.backends.health_daemon import health_sender
+from starfish.amphorae.backends.health_daemon import status_message
+import starfish.tests.unit.base as base
+
+_SHOW_STAT = (
+    b'# pxname,svname,qcur,scur,stot,bin,bout,ereq,status,\n'
+    b'listener1,FRONTEND,,5,100,1000,2000,3,OPEN,\n'
+    b'pool1,member1,0,5,100,1000,2000,,UP,\n'
+    b'pool1,BACKEND,0,5,100,1000,2000,,UP,\n'
+    b'listener2,FRONTEND,,0,0,0,0,0,FULL,\n\n')
+
+
+class _StatsSocket(object):
+    """A haproxy stats socket answering 'show stat' once."""
+
+    def __init__(self, path):
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(1)
+        self.thread = threading.Thread(target=self._serve)
+        self.thread.start()
+
+    def _serve(self):
+        conn, _ = self.server.accept()
+        with conn:
+            conn.recv(1024)
+            conn.sendall(_SHOW_STAT)
+        self.server.close()
+
+
+class TestHealthDaemon(base.TestCase):
+
+    def setUp(self):
+        super(TestHealthDaemon, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.hadir = tempfile.mkdtemp()
+        self.conf.config(group='haproxy_amphora', base_path=self.hadir)
+        self.conf.config(group='amphora_agent', amphora_id='amp1')
+
+    def test_build_stats_message(self):
+        sock_file = os.path.join(self.hadir, 'lb1.sock')
+        self.addCleanup(os.rmdir, self.hadir)
+        self.addCleanup(os.remove, sock_file)
+        stats_socket = _StatsSocket(sock_file)
+        msg = health_daemon.build_stats_message()
+        stats_socket.thread.join()
+        self.assertEqual('amp1', msg['id'])
+        self.assertEqual(
+            {'listener1': {'status': 'OPEN',
+                           'stats': {'rx': 1000, 'tx': 2000, 'conns': 5,
+                                     'totconns': 100, 'ereq': 3}},
+             'listener2': {'status': 'FULL',
+                           'stats': {'rx': 0, 'tx': 0, 'conns': 0,
+                                     'totconns': 0, 'ereq': 0}}},
+            msg['listeners'])
+        self.assertEqual(msg['seq'] + 1,
+                         health_daemon.build_stats_message()['seq'])
+
+    @mock.patch('starfish.amphorae.backends.health_daemon.health_sender.'
+                'UDPStatusSender')
+    def test_run_sender(self, mock_sender):
+        os.rmdir(self.hadir)
+        self.conf.conf(args=[], project='starfish')
+        self.conf.config(group='health_manager', heartbeat_interval=0)
+        cmd_queue = mock.Mock()
+        cmd_queue.get.side_effect = [queue.Empty(), 'reload', 'shutdown']
+        health_daemon.run_sender(cmd_queue)
+        sender = mock_sender.return_value
+        self.assertEqual(3, sender.dosend.call_count)
+        self.assertEqual({}, sender.dosend.call_args[0][0]['listeners'])
+        sender.close.assert_called_once_with()
+
+
+class TestUDPStatusSender(base.TestCase):
+
+    def setUp(self):
+        super(TestUDPStatusSender, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.receivers = []
+        for _ in range(2):
+            receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            receiver.bind(('127.0.0.1', 0))
+            receiver.settimeout(5)
+            self.addCleanup(receiver.close)
+            self.receivers.append(receiver)
+        self.conf.config(group='health_manager', heartbeat_key='key',
+                         controller_ip_port_list=[
+                             '127.0.0.1:{}'.format(
+                                 receiver.getsockname()[1])
+                             for receiver in self.receivers])
+        self.sender = health_sender.UDPStatusSender()
+        self.addCleanup(self.sender.close)
+
+    def test_round_robin(self):
+        for seq in range(4):
+            self.sender.dosend({'id': 'amp1', 'seq': seq, 'listeners': {}})
+        for index, receiver in enumerate(self.receivers):
+            for seq in (index, index + 2):
+                data = receiver.recv(65536)
+                self.assertEqual(status_message.BINARY_VERSION, data[0])
+                self.assertEqual(seq, status_message.unwrap_envelope(
+                    data, 'key')['seq'])
+
+    def test_json(self):
+        self.conf.config(group='health_manager', heartbeat_encoding='json')
+        self.sender.dosend({'id': 'amp1', 'seq': 1, 'listeners': {}})
+        self.assertEqual(
+            {'id': 'amp1', 'seq': 1, 'listeners': {}},
+            status_message.unwrap_envelope(self.receivers[0].recv(65536),
+                                           'key'))
+
+    def test_no_controllers(self):
+        self.conf.config(group='health_manager',
+                         controller_ip_port_list=['nonsense'])
+        self.assertIsNone(self.sender.dosend({'id': 'amp1'}))
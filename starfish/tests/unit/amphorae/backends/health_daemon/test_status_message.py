@@ -0,0 +1,90 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from starfish.amphorae.backends.health_daemon import status_message
+from starfish.common import exceptions
+import starfish.tests.unit.base as base
+
+
+class TestEnvelope(base.TestCase):
+
+    def setUp(self):
+        super(TestEnvelope, self).setUp()
+        self.obj = {'id': 'amp1', 'seq': 1, 'listeners': {}}
+
+    def test_wrap_unwrap(self):
+        envelope = status_message.wrap_envelope(self.obj, 'key')
+        self.assertEqual(self.obj,
+                         status_message.unwrap_envelope(envelope, 'key'))
+
+    def test_unwrap_bad_key(self):
+        envelope = status_message.wrap_envelope(self.obj, 'key')
+        self.assertRaises(exceptions.InvalidHMACException,
+                          status_message.unwrap_envelope, envelope, 'other')
+
+    def test_unwrap_tampered(self):
+        envelope = bytearray(status_message.wrap_envelope(self.obj, 'key'))
+        envelope[0] ^= 1
+        self.assertRaises(exceptions.InvalidHMACException,
+                          status_message.unwrap_envelope, bytes(envelope),
+                          'key')
+
+
+class TestBinaryEnvelope(base.TestCase):
+
+    def setUp(self):
+        super(TestBinaryEnvelope, self).setUp()
+        self.obj = {
+            'id': '3c1f7e2a-5b4d-4e6f-8a9b-0c1d2e3f4a5b', 'seq': 7,
+            'ver': status_message.BINARY_VERSION,
+            'listeners': {
+                '9d8c7b6a-5f4e-4d3c-8b2a-1f0e9d8c7b6a': {
+                    'status': 'OPEN',
+                    'stats': {'rx': 1, 'tx': 2, 'conns': 3, 'totconns': 4,
+                              'ereq': 5}},
+                'not-a-uuid': {
+                    'status': 'no check',
+                    'stats': {'rx': 2 ** 40, 'tx': 0, 'conns': 0,
+                              'totconns': 0, 'ereq': 0}}}}
+
+    def _wrap(self, key='key', compress=False):
+        return status_message.wrap_envelope(
+            self.obj, key, encoding=status_message.ENCODING_BINARY,
+            compress=compress)
+
+    def test_wrap_unwrap(self):
+        for compress in (False, True):
+            envelope = self._wrap(compress=compress)
+            self.assertEqual(status_message.BINARY_VERSION, envelope[0])
+            self.assertEqual(self.obj,
+                             status_message.unwrap_envelope(envelope, 'key'))
+
+    def test_smaller_than_json(self):
+        self.assertLess(len(self._wrap()), len(
+            status_message.wrap_envelope(self.obj, 'key')))
+
+    def test_unsigned(self):
+        envelope = self._wrap(key=None)
+        for key in (None, 'key'):
+            self.assertRaises(exceptions.InvalidHMACException,
+                              status_message.unwrap_envelope, envelope, key)
+        # Nor are signed ones accepted without a key to check them.
+        self.assertRaises(exceptions.InvalidHMACException,
+                          status_message.unwrap_envelope, self._wrap(), None)
+
+    def test_unwrap_tampered(self):
+        envelope = bytearray(self._wrap())
+        # The header is signed too.
+        envelope[1] ^= 0x01
+        self.assertRaises(exceptions.InvalidHMACException,
+                          status_message.unwrap_envelope, bytes(envelope),
+                          'key')
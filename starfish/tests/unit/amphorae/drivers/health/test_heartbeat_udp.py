@@ -0,0 +1,152 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import concurrent.futures
+import datetime
+import socket
+import threading
+import time
+from unittest import mock
+
+import fixtures
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.amphorae.backends.health_daemon import status_message
+from starfish.amphorae.drivers.health import heartbeat_udp
+import starfish.tests.unit.base as base
+
+_KEY = 'test-key'
+
+
+def _heartbeat(amphora_id, seq, rx=0):
+    return {'id': amphora_id, 'seq': seq,
+            'listeners': {'listener1': {'status': 'OPEN',
+                                        'stats': {'rx': rx, 'tx': 2,
+                                                  'conns': 3, 'totconns': 4,
+                                                  'ereq': 5}}}}
+
+
+class TestUDPStatusGetter(base.TestCase):
+
+    def setUp(self):
+        super(TestUDPStatusGetter, self).setUp()
+        conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        conf.config(group='health_manager', heartbeat_key=_KEY,
+                    bind_ip='127.0.0.1', bind_port=0,
+                    health_update_threads=2, stats_update_threads=1,
+                    heartbeat_flush_interval=0.05)
+        self.getter = heartbeat_udp.UDPStatusGetter()
+        self.addCleanup(self.getter.health_writer.shutdown)
+        self.addCleanup(self.getter.stats_writer.shutdown)
+        self.addCleanup(self.getter.sock.close)
+        self.useFixture(fixtures.MockPatch(
+            'starfish.db.api.get_session'))
+        self.health_repo = mock.Mock()
+        self.stats_repo = mock.Mock()
+        self.getter.health_writer.repo = self.health_repo
+        self.getter.stats_writer.repo = self.stats_repo
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.sender.close)
+
+    def _send(self, *heartbeats, key=_KEY):
+        for heartbeat in heartbeats:
+            self.sender.sendto(status_message.wrap_envelope(heartbeat, key),
+                               self.getter.sockaddr)
+
+    def _recv(self, count):
+        received = 0
+        deadline = time.monotonic() + 5
+        while received < count and time.monotonic() < deadline:
+            received += self.getter.dorecv()
+        self.assertEqual(count, received)
+
+    def _written(self, repo):
+        return sorted((row for call in repo.upsert_many.call_args_list
+                       for row in call[0][1]),
+                      key=lambda row: row['amphora_id'])
+
+    def _wait_for_writes(self):
+        for writer in (self.getter.health_writer, self.getter.stats_writer):
+            concurrent.futures.wait(writer.futures)
+
+    def test_coalesce_and_flush(self):
+        self._send(_heartbeat('amp1', 1, rx=10), _heartbeat('amp1', 3, rx=30),
+                   _heartbeat('amp1', 2, rx=20), _heartbeat('amp2', 1))
+        self._send(_heartbeat('amp3', 1), key='wrong')
+        self.sender.sendto(b'garbage', self.getter.sockaddr)
+        self._recv(6)
+        self.assertEqual(4, self.getter.received)
+        self.assertEqual(2, self.getter.rejected)
+        self.assertEqual(3, self.getter.pending['amp1'][0])
+
+        self.assertTrue(self.getter.flush())
+        self._wait_for_writes()
+        self.assertEqual({}, self.getter.pending)
+        health = self._written(self.health_repo)
+        self.assertEqual(['amp1', 'amp2'],
+                         [row['amphora_id'] for row in health])
+        self.assertIsInstance(health[0]['last_update'], datetime.datetime)
+        # One batch split between the two health threads.
+        self.assertEqual(2, self.health_repo.upsert_many.call_count)
+        self.assertEqual(
+            [{'listener_id': 'listener1', 'amphora_id': 'amp1',
+              'bytes_in': 30, 'bytes_out': 2, 'active_connections': 3,
+              'total_connections': 4, 'request_errors': 5},
+             {'listener_id': 'listener1', 'amphora_id': 'amp2',
+              'bytes_in': 0, 'bytes_out': 2, 'active_connections': 3,
+              'total_connections': 4, 'request_errors': 5}],
+            self._written(self.stats_repo))
+
+    def test_coalesce_rejects_malformed(self):
+        malformed = [{'id': 'amp1', 'listeners': ['listener1']},
+                     {'id': 'amp1', 'listeners': {'listener1': 'OPEN'}},
+                     {'id': 'amp1',
+                      'listeners': {'listener1': {'stats': ['rx']}}},
+                     {'id': 'amp1',
+                      'listeners': {'listener1': {'stats': {'rx': 'a'}}}}]
+        self._send(*malformed)
+        self._send({'id': 'amp2', 'listeners': {}})
+        self._recv(5)
+        self.assertEqual(len(malformed), self.getter.rejected)
+        self.assertEqual(['amp2'], list(self.getter.pending))
+        self.assertTrue(self.getter.flush())
+
+    def test_flush_deferred_while_writing(self):
+        release = threading.Event()
+        self.health_repo.upsert_many.side_effect = (
+            lambda session, rows: release.wait(5))
+        self._send(_heartbeat('amp1', 1))
+        self._recv(1)
+        self.assertTrue(self.getter.flush())
+        self._send(_heartbeat('amp1', 2))
+        self._recv(1)
+        self.assertFalse(self.getter.flush())
+        self.assertEqual(2, self.getter.pending['amp1'][0])
+        release.set()
+        self._wait_for_writes()
+        self.assertTrue(self.getter.flush())
+
+    def test_run(self):
+        exit_event = threading.Event()
+        runner = threading.Thread(target=self.getter.run,
+                                  args=(exit_event,))
+        runner.start()
+        self._send(_heartbeat('amp1', 1))
+        deadline = time.monotonic() + 5
+        while (not self.health_repo.upsert_many.called and
+               time.monotonic() < deadline):
+            time.sleep(0.01)
+        exit_event.set()
+        runner.join()
+        self.assertEqual(['amp1'], [row['amphora_id'] for row in
+                                    self._written(self.health_repo)])
@@ -0,0 +1,180 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import asyncio
+import functools
+import socket
+import threading
+import time
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from werkzeug import serving
+
+from starfish.amphorae.backends.agent.api_server import osutils
+from starfish.amphorae.backends.agent.api_server import server
+from starfish.amphorae.driver_exceptions import exceptions as driver_except
+from starfish.amphorae.drivers import async_rest_api_driver as driver
+from starfish.amphorae import exceptions as exc
+from starfish.common import config  # noqa: F401
+from starfish.tests.unit import base
+
+
+def _unused_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestAsyncAmphoraAPIClient(base.TestCase):
+
+    def setUp(self):
+        super(TestAsyncAmphoraAPIClient, self).setUp()
+        conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        conf.config(group='haproxy_amphora', connection_max_retries=3,
+                    connection_retry_interval=0,
+                    rest_request_deadline=5)
+        self.conf = conf
+
+        with mock.patch.object(osutils.BaseOS, 'get_os_util'):
+            app = server.Server().app
+        self.httpd = serving.make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.httpd.shutdown)
+        self.setting = {'ip': '127.0.0.1', 'port': self.httpd.server_port}
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.client = driver.AsyncAmphoraAPIClient1_0()
+        self.addCleanup(lambda: self._run_async(self.client.close()))
+
+    def _run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_get_version(self):
+        self.assertEqual({'api_version': '1.0'}, self._run_async(
+            self.client.get_version('/', self.setting)))
+        session = self.client._session
+        self._run_async(self.client.get_version('/', self.setting))
+        self.assertIs(session, self.client._session)
+
+    def test_not_found(self):
+        r = self._run_async(self.client.get(self.setting, '/missing'))
+        self.assertEqual(404, r.status_code)
+        self.assertEqual(404, r.json()['http_code'])
+        self.assertRaises(exc.NotFound, self._run_async,
+                          self.client.get(self.setting, '/missing',
+                                          retry_404=False))
+
+    def test_retries_until_deadline(self):
+        self.conf.config(group='haproxy_amphora', connection_max_retries=1000,
+                         connection_retry_interval=1,
+                         connection_retry_max_interval=1,
+                         rest_request_deadline=0.5)
+        setting = {'ip': '127.0.0.1', 'port': _unused_port()}
+        start = time.monotonic()
+        self.assertRaises(driver_except.TimeOutException, self._run_async,
+                          self.client.get(setting))
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_raise_retry_exception(self):
+        setting = {'ip': '127.0.0.1', 'port': _unused_port()}
+        self.assertRaises(driver_except.AmpConnectionRetry, self._run_async,
+                          self.client.get(setting,
+                                          raise_retry_exception=True))
+
+    @mock.patch('random.uniform', return_value=0)
+    def test_backoff(self, mock_uniform):
+        self.conf.config(group='haproxy_amphora', connection_retry_interval=2,
+                         connection_retry_max_interval=10)
+        self.client._backoff(0)
+        mock_uniform.assert_called_with(0, 2)
+        self.client._backoff(2)
+        mock_uniform.assert_called_with(0, 8)
+        self.client._backoff(500)
+        mock_uniform.assert_called_with(0, 10)
+
+    def test_fan_out(self):
+        down = {'ip': '127.0.0.1', 'port': _unused_port()}
+        settings = [self.setting] * 5 + [down]
+        results = self._run_async(self.client.fan_out(
+            functools.partial(self.client.get_version, '/'), settings,
+            concurrency=2))
+        self.assertEqual([{'api_version': '1.0'}] * 5, results[:5])
+        self.assertIsInstance(results[5], driver_except.TimeOutException)
+
+    def test_fan_out_is_concurrent(self):
+        in_flight = []
+        peak = []
+
+        async def _call(setting):
+            in_flight.append(setting)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(setting)
+            return setting
+
+        results = self._run_async(self.client.fan_out(_call, list(range(10)),
+                                               concurrency=4))
+        self.assertEqual(list(range(10)), results)
+        self.assertEqual(4, max(peak))
+
+
+class TestAsyncRestDriverTest(base.TestCase):
+
+    def setUp(self):
+        super(TestAsyncRestDriverTest, self).setUp()
+        self.driver = driver.AsyncRestDriverTest()
+        self.addCleanup(self.driver.close)
+
+    def test_concurrent_callers(self):
+        in_flight = []
+        peak = []
+        # Created on the loop of the driver.
+        release = []
+
+        async def _get_version(path, setting):
+            if not release:
+                release.append(asyncio.Event())
+            in_flight.append(setting)
+            peak.append(len(in_flight))
+            if len(in_flight) == 4:
+                release[0].set()
+            await asyncio.wait_for(release[0].wait(), 5)
+            in_flight.remove(setting)
+            return setting
+
+        self.driver.client.get_version = _get_version
+        results = {}
+        callers = [threading.Thread(
+            target=lambda i=i: results.update(
+                {i: self.driver.get_version_info(bind_ip_port=i)}))
+            for i in range(4)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+        self.assertEqual({i: i for i in range(4)}, results)
+        # All the callers were waiting on the loop at the same time.
+        self.assertEqual(4, max(peak))
+
+    def test_timeout(self):
+        async def _get_version(path, setting):
+            await asyncio.sleep(5)
+
+        self.driver.client.get_version = _get_version
+        self.assertRaises(driver_except.TimeOutException,
+                          self.driver.get_version_info, timeout=0.01)
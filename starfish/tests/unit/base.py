@@ -11,6 +11,7 @@ from oslo_messaging import conffixture as messaging_conffixture
 from unittest import mock
 
 from starfish.common import rpc
+from starfish.common import utils
 
 
 class TestCase(testtools.TestCase):
@@ -22,7 +23,7 @@ class TestCase(testtools.TestCase):
 
     def clean_caches(self):
         # TODO: add keystone auth
-        pass
+        utils.clear_drivers()
 
 
 class TestRpc(testtools.TestCase):
@@ -44,8 +45,8 @@ class TestRpc(testtools.TestCase):
         self.messaging_conf.transport_url = 'fake:/'
         self.useFixture(self.messaging_conf)
         self.useFixture(fixtures.MonkeyPatch(
-            'octavia.common.rpc.create_transport',
+            'starfish.common.rpc.create_transport',
             self._fake_create_transport))
-        with mock.patch('octavia.common.rpc.get_transport_url') as mock_gtu:
+        with mock.patch('starfish.common.rpc.get_transport_url') as mock_gtu:
             mock_gtu.return_value = None
             rpc.init()
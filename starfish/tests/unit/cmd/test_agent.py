@@ -4,7 +4,6 @@
   @email 1299870737@qq.com
 """
 
-import ssl
 from unittest import mock
 
 from starfish.cmd import agent
@@ -16,11 +15,13 @@ class TestBackendAgentCMD(base.TestCase):
     def setUp(self):
         super(TestBackendAgentCMD, self).setUp()
 
+    @mock.patch('starfish.cmd.agent.HM_SENDER_CMD_QUEUE')
     @mock.patch('starfish.cmd.agent.AmphoraAgent')
     @mock.patch('starfish.amphorae.backends.agent.api_server.server.Server')
     @mock.patch('multiprocessing.Process')
     @mock.patch('starfish.common.service.prepare_service')
-    def test_main(self, mock_service, mock_process, mock_server, mock_amp):
+    def test_main(self, mock_service, mock_process, mock_server, mock_amp,
+                  mock_queue):
         mock_health_proc = mock.MagicMock()
         mock_server_instance = mock.MagicMock()
         mock_amp_instance = mock.MagicMock()
@@ -30,10 +31,30 @@ class TestBackendAgentCMD(base.TestCase):
         mock_amp.return_value = mock_amp_instance
         agent.main()
 
-        self.assertEqual(
-            ssl.CERT_REQUIRED,
-            mock_amp.call_args[0][1]['cert_reqs']
-        )
+        app, options = mock_amp.call_args[0]
+        self.assertIs(mock_server_instance.app, app)
+        self.assertEqual(1, options['workers'])
+        self.assertTrue(options['preload_app'])
+        self.assertIs(agent._reload_health_sender, options['on_reload'])
 
         mock_health_proc.start.assert_called_once_with()
         mock_amp_instance.run.assert_called_once()
+
+    @mock.patch('starfish.cmd.agent.HM_SENDER_CMD_QUEUE')
+    @mock.patch('starfish.cmd.agent.AmphoraAgent')
+    @mock.patch('starfish.amphorae.backends.agent.api_server.server.Server')
+    @mock.patch('multiprocessing.Process')
+    @mock.patch('starfish.common.service.prepare_service')
+    def test_main_health_sender_commands(self, mock_service, mock_process,
+                                         mock_server, mock_amp, mock_queue):
+        mock_health_proc = mock.MagicMock()
+        mock_process.return_value = mock_health_proc
+        mock_amp.return_value.run.side_effect = SystemExit
+        self.assertRaises(SystemExit, agent.main)
+        # The sender stops with the agent.
+        mock_queue.put.assert_called_once_with('shutdown')
+        mock_health_proc.join.assert_called_once()
+
+        # SIGHUP reloads the sender too.
+        mock_amp.call_args[0][1]['on_reload'](mock.Mock())
+        mock_queue.put.assert_called_with('reload')
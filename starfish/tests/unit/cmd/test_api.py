@@ -0,0 +1,77 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.cmd import api
+from starfish.tests.unit import base
+
+
+class TestAPICMD(base.TestCase):
+
+    def setUp(self):
+        super(TestAPICMD, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.config(group='api_settings', bind_host='192.0.2.10',
+                         bind_port=1895, workers=4, threads=8, keepalive=2,
+                         backlog=64, graceful_timeout=10)
+
+    @mock.patch('starfish.cmd.api.StarfishAPI')
+    @mock.patch('starfish.frame_api.app.setup_app')
+    @mock.patch('oslo_reports.guru_meditation_report.TextGuruMeditation')
+    def test_main(self, mock_gmr, mock_setup_app, mock_api):
+        api.main()
+
+        app, options = mock_api.call_args[0]
+        self.assertIs(mock_setup_app.return_value, app)
+        self.assertEqual('192.0.2.10:1895', options['bind'])
+        self.assertEqual(4, options['workers'])
+        self.assertEqual(8, options['threads'])
+        self.assertEqual(2, options['keepalive'])
+        self.assertEqual(64, options['backlog'])
+        self.assertEqual(10, options['graceful_timeout'])
+        self.assertTrue(options['preload_app'])
+        mock_api.return_value.run.assert_called_once_with()
+
+    @mock.patch('starfish.cmd.api.StarfishAPI')
+    @mock.patch('starfish.frame_api.app.setup_app')
+    @mock.patch('oslo_reports.guru_meditation_report.TextGuruMeditation')
+    @mock.patch('starfish.cmd.api.LOG')
+    def test_main_memory_response_cache(self, mock_log, mock_gmr,
+                                        mock_setup_app, mock_api):
+        self.conf.config(group='api_settings',
+                         response_cache_backend='memory')
+        api.main()
+        mock_log.warning.assert_called_once()
+
+        mock_log.reset_mock()
+        self.conf.config(group='api_settings', workers=1)
+        api.main()
+        mock_log.warning.assert_not_called()
+
+    @mock.patch('multiprocessing.cpu_count', return_value=3)
+    def test_default_workers(self, mock_cpu_count):
+        self.conf.config(group='api_settings', workers=None,
+                         bind_host='2001:db8::10')
+        options = api.get_server_options()
+        self.assertEqual(3, options['workers'])
+        self.assertEqual('[2001:db8::10]:1895', options['bind'])
+
+    def test_gunicorn_settings(self):
+        application = api.StarfishAPI(mock.sentinel.app,
+                                      api.get_server_options())
+        self.assertEqual(['192.0.2.10:1895'], application.cfg.bind)
+        self.assertEqual(8, application.cfg.threads)
+        self.assertIs(mock.sentinel.app, application.load())
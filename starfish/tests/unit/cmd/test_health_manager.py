@@ -0,0 +1,59 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import signal
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.cmd import health_manager
+from starfish.tests.unit import base
+
+
+class TestHealthManagerCMD(base.TestCase):
+
+    def setUp(self):
+        super(TestHealthManagerCMD, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+
+    @mock.patch('threading.Thread')
+    @mock.patch('oslo_reports.guru_meditation_report.TextGuruMeditation')
+    @mock.patch('starfish.common.service.prepare_service')
+    def test_main_without_heartbeat_key(self, mock_service, mock_gmr,
+                                        mock_thread):
+        self.conf.config(group='health_manager', heartbeat_key=None)
+        self.assertRaises(cfg.RequiredOptError, health_manager.main)
+        mock_thread.assert_not_called()
+
+    @mock.patch('signal.signal')
+    @mock.patch('threading.Thread')
+    @mock.patch('oslo_reports.guru_meditation_report.TextGuruMeditation')
+    @mock.patch('starfish.common.service.prepare_service')
+    def test_main_sigterm(self, mock_service, mock_gmr, mock_thread,
+                          mock_signal):
+        self.conf.config(group='health_manager', heartbeat_key='key')
+        event = health_manager.hm_listener_thread_event
+        self.addCleanup(event.clear)
+        listener = mock_thread.return_value
+        # The listener runs until the event is set.
+        listener.is_alive.side_effect = lambda: not event.is_set()
+
+        def sigterm(timeout=None):
+            handlers = dict(call[0] for call in mock_signal.call_args_list)
+            handlers[signal.SIGTERM](signal.SIGTERM, None)
+        listener.join.side_effect = sigterm
+
+        health_manager.main()
+
+        self.assertTrue(event.is_set())
+        listener.join.assert_called_once_with(1)
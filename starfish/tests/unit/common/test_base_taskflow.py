@@ -0,0 +1,83 @@
+# Copyright 2014-2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from taskflow.patterns import linear_flow
+from taskflow import task
+
+from starfish.common import base_taskflow
+from starfish.common import config  # noqa: F401
+import starfish.tests.unit.base as base
+
+
+class _Echo(task.Task):
+
+    def execute(self, value):
+        if value == 'fail':
+            raise ValueError(value)
+        return value
+
+
+def _echo_flow():
+    flow = linear_flow.Flow('echo-flow')
+    flow.add(_Echo(provides='echoed'))
+    return flow
+
+
+class TestBaseTaskFlowEngine(base.TestCase):
+
+    def setUp(self):
+        super(TestBaseTaskFlowEngine, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.config(group='task_flow', engine='serial',
+                         engine_cache_size=2)
+        self.engine = base_taskflow.BaseTaskFlowEngine()
+        self.addCleanup(self.engine.executor.shutdown)
+        self.flow_factory = mock.Mock(side_effect=_echo_flow)
+
+    def _run(self, key, value):
+        with self.engine._taskflow_load_cached(
+                key, self.flow_factory, store={'value': value}) as eng:
+            eng.run()
+            return eng, eng.storage.fetch('echoed')
+
+    def test_engine_reused(self):
+        first, echoed = self._run('echo', 'a')
+        self.assertEqual('a', echoed)
+        second, echoed = self._run('echo', 'b')
+        self.assertEqual('b', echoed)
+        self.assertIs(first, second)
+        self.assertEqual(1, self.flow_factory.call_count)
+
+    def test_failed_engine_not_reused(self):
+        self.assertRaises(ValueError, self._run, 'echo', 'fail')
+        self._run('echo', 'a')
+        self.assertEqual(2, self.flow_factory.call_count)
+
+    def test_cache_size(self):
+        first, _ = self._run('one', 'a')
+        self._run('two', 'a')
+        self._run('three', 'a')
+        self.assertEqual(['two', 'three'], list(self.engine._engines))
+        self.assertIsNot(first, self._run('one', 'a')[0])
+
+        self.conf.config(group='task_flow', engine_cache_size=0)
+        self.engine._engines.clear()
+        self._run('one', 'a')
+        self.assertEqual({}, self.engine._engines)
+
@@ -0,0 +1,156 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.common import cache
+from starfish.common import config  # noqa: F401
+import starfish.tests.unit.base as base
+
+
+class TestResponseCache(base.TestCase):
+
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.addCleanup(cache.reset_response_cache)
+        cache.reset_response_cache()
+
+    def test_disabled(self):
+        self.assertIsNone(cache.get_response_cache())
+        session = mock.Mock(info={})
+        cache.invalidate_on_commit(session, 'TestEntity')
+        self.assertEqual({}, session.info)
+
+    def test_invalidate(self):
+        self.conf.config(group='api_settings',
+                         response_cache_backend=cache.MEMORY_BACKEND)
+        response_cache = cache.get_response_cache()
+        self.assertIs(response_cache, cache.get_response_cache())
+        response_cache.set('TestEntity', '/v1/testentities', 'entities')
+        response_cache.set('Other', '/v1/others', 'others')
+        self.assertEqual('entities',
+                         response_cache.get('TestEntity', '/v1/testentities'))
+
+        response_cache.invalidate('TestEntity')
+        self.assertIsNone(response_cache.get('TestEntity',
+                                             '/v1/testentities'))
+        self.assertEqual('others', response_cache.get('Other', '/v1/others'))
+
+    def test_invalidate_pending(self):
+        self.conf.config(group='api_settings',
+                         response_cache_backend=cache.MEMORY_BACKEND)
+        response_cache = cache.get_response_cache()
+        response_cache.set('TestEntity', '/v1/testentities', 'entities')
+        session = mock.Mock(info={})
+        cache.invalidate_on_commit(session, 'TestEntity')
+        self.assertEqual('entities',
+                         response_cache.get('TestEntity', '/v1/testentities'))
+
+        cache.invalidate_pending(session)
+        self.assertIsNone(response_cache.get('TestEntity',
+                                             '/v1/testentities'))
+        self.assertEqual({}, session.info)
+
+    def test_memory_backend_expiration(self):
+        backend = cache.MemoryBackend(2, 60)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.set('c', 3)
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(3, backend.get('c'))
+
+
+class TestLRUBackend(base.TestCase):
+
+    def test_max_entries(self):
+        backend = cache.LRUBackend(2, 1024, 60)
+        backend.set('a', b'1')
+        backend.set('b', b'2')
+        backend.get('a')
+        backend.set('c', b'3')
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(b'1', backend.get('a'))
+        self.assertEqual({'entries': 2, 'bytes': 2, 'evictions': 1,
+                          'expirations': 0}, backend.stats())
+
+    def test_max_bytes(self):
+        backend = cache.LRUBackend(10, 8, 60)
+        backend.set('a', b'1234')
+        backend.set('b', b'5678')
+        backend.set('c', b'90')
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(6, backend.stats()['bytes'])
+        # Larger than the whole cache, never stored.
+        backend.set('d', b'123456789')
+        self.assertIsNone(backend.get('d'))
+
+    @mock.patch('time.monotonic')
+    def test_expiration(self, monotonic):
+        monotonic.return_value = 100
+        backend = cache.LRUBackend(10, 1024, 60)
+        backend.set('a', b'1')
+        monotonic.return_value = 159
+        self.assertEqual(b'1', backend.get('a'))
+        monotonic.return_value = 160
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(1, backend.stats()['expirations'])
+
+
+class TestEntityCache(base.TestCase):
+
+    def setUp(self):
+        super(TestEntityCache, self).setUp()
+        self.entity_cache = cache.EntityCache(
+            'TestEntity', cache.LRUBackend(10, 1024, 60), 'v1')
+
+    def test_get_or_load(self):
+        load = mock.Mock(return_value={'id': '1'})
+        self.assertEqual({'id': '1'},
+                         self.entity_cache.get_or_load('1', load))
+        cached = self.entity_cache.get_or_load('1', load)
+        self.assertEqual({'id': '1'}, cached)
+        self.assertIsNot(cached, load.return_value)
+        load.assert_called_once_with()
+        self.assertEqual({'hits': 1, 'misses': 1},
+                         self.entity_cache.stats())
+
+    def test_missing_entity_not_cached(self):
+        load = mock.Mock(return_value=None)
+        self.entity_cache.get_or_load('1', load)
+        self.entity_cache.get_or_load('1', load)
+        self.assertEqual(2, load.call_count)
+
+    def test_invalidate(self):
+        self.entity_cache.get_or_load('1', lambda: 'old')
+        self.entity_cache.invalidate('1')
+        self.assertEqual('new', self.entity_cache.get_or_load(
+            '1', lambda: 'new'))
+
+    def test_load_racing_invalidation(self):
+        def load():
+            # Committed by another process while this one was loading.
+            self.entity_cache.invalidate('1')
+            return 'old'
+
+        self.entity_cache.get_or_load('1', load)
+        self.assertEqual('new', self.entity_cache.get_or_load(
+            '1', lambda: 'new'))
+
+    def test_schema_version(self):
+        other = cache.EntityCache('TestEntity', self.entity_cache.backend,
+                                  'v2')
+        self.entity_cache.get_or_load('1', lambda: 'v1')
+        self.assertEqual('v2', other.get_or_load('1', lambda: 'v2'))
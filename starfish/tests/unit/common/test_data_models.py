@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import pickle
+
+from starfish.common import data_models
+import starfish.tests.unit.base as base
+
+
+class TestDataModels(base.TestCase):
+
+    def setUp(self):
+        super(TestDataModels, self).setUp()
+        self.entity = data_models.TestEntity(id='te-1', name='entity',
+                                             manage_ip='192.0.2.1')
+        self.lb = data_models.LoadBalancer(id='lb-1', name='lb',
+                                           tags=['a', 'b'])
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.entity, '__dict__'))
+        self.assertEqual(('id', 'name', 'manage_ip', 'created_at',
+                          'updated_at'), data_models.TestEntity._fields)
+        self.assertRaises(AttributeError, setattr, self.entity, 'other', 1)
+        self.assertEqual(('vip', 'vrrp_group', 'listeners', 'amphorae',
+                          'pools'), data_models.LoadBalancer._relations)
+        self.assertNotIn('vip', data_models.LoadBalancer._plain_fields)
+
+    def test_inherited_fields(self):
+        class Child(data_models.TestEntity):
+            _fields = ('name', 'extra')
+
+        self.assertEqual(data_models.TestEntity._fields + ('extra',),
+                         Child._fields)
+        self.assertEqual(('extra',), Child.__slots__)
+        child = Child(id='c')
+        child.extra = 1
+        self.assertEqual(1, child.to_dict()['extra'])
+
+    def test_to_dict(self):
+        self.assertEqual({'id': 'te-1', 'name': 'entity',
+                          'manage_ip': '192.0.2.1', 'created_at': None,
+                          'updated_at': None}, self.entity.to_dict())
+        self.assertEqual({'id': 'te-1', 'created_at': None,
+                          'updated_at': None},
+                         self.entity.to_dict(name=False, manage_ip=False))
+
+    def test_to_dict_relations(self):
+        self.lb.vip = self.entity
+        self.lb.listeners = [self.entity, self.entity]
+        flat = self.lb.to_dict()
+        self.assertIsNone(flat['vip'])
+        self.assertEqual([], flat['listeners'])
+        self.assertEqual(['a', 'b'], flat['tags'])
+
+        deep = self.lb.to_dict(recurse=True)
+        self.assertEqual(self.entity.to_dict(), deep['vip'])
+        self.assertEqual([self.entity.to_dict()] * 2, deep['listeners'])
+
+    def test_to_dict_stops_at_calling_classes(self):
+        other = data_models.LoadBalancer(id='lb-2', vip=self.entity,
+                                         pools=['p'], amphorae=[self.entity])
+        self.lb.vip = other
+        self.lb.pools = [other]
+
+        deep = self.lb.to_dict(recurse=True)
+        for nested in (deep['vip'], deep['pools'][0]):
+            self.assertEqual('lb-2', nested['id'])
+            self.assertIsNone(nested['vip'])
+            self.assertIsNone(nested['amphorae'])
+            self.assertEqual(['p'], nested['pools'])
+        self.assertEqual(
+            self.entity.to_dict(),
+            other.to_dict(recurse=True)['vip'])
+        self.assertEqual(
+            {'id': 'te-1', 'name': 'entity', 'manage_ip': '192.0.2.1',
+             'created_at': None, 'updated_at': None},
+            self.entity.to_dict(
+                calling_classes=[data_models.TestEntity], recurse=True))
+
+    def test_eq(self):
+        same = data_models.TestEntity(id='te-1', name='entity',
+                                      manage_ip='192.0.2.1')
+        self.assertEqual(self.entity, same)
+        same.name = 'other'
+        self.assertNotEqual(self.entity, same)
+        self.assertNotEqual(self.entity, self.entity.to_dict())
+
+        other_lb = data_models.LoadBalancer(id='lb-1', name='lb',
+                                            tags=['a', 'b'],
+                                            listeners=[self.entity],
+                                            vip=self.entity)
+        self.assertEqual(self.lb, other_lb)
+        other_lb.tags = ['a']
+        self.assertNotEqual(self.lb, other_lb)
+
+    def test_pickle(self):
+        self.assertEqual(self.entity,
+                         pickle.loads(pickle.dumps(self.entity)))
@@ -0,0 +1,161 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import tempfile
+import time
+from unittest import mock
+
+import cachetools
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from oslo_policy import policy as oslo_policy
+
+from starfish.common import context
+from starfish.common import exceptions
+from starfish.common import policy
+import starfish.tests.unit.base as base
+
+_ACTION = 'os_load-balancer_api:loadbalancer:get_one'
+
+
+class TestPolicyDecisionCache(base.TestCase):
+
+    def setUp(self):
+        super(TestPolicyDecisionCache, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        # The policy file is looked up through the parsed config.
+        self.conf.conf(args=[], project='starfish')
+        policy_dir = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, policy_dir)
+        self.policy_file = os.path.join(policy_dir, 'policy.yaml')
+        self._write_policy('')
+        self.addCleanup(os.remove, self.policy_file)
+        self.enforcer = policy.Policy(policy_file=self.policy_file)
+        self.context = context.Context(project_id='project',
+                                       roles=['load-balancer_member'],
+                                       request_id='req-1')
+
+    def _write_policy(self, content, mtime=None):
+        with open(self.policy_file, 'w') as f:
+            f.write(content)
+        if mtime:
+            os.utime(self.policy_file, (mtime, mtime))
+
+    def _authorize(self, project_id='project', ctx=None):
+        return self.enforcer.authorize(_ACTION, {'project_id': project_id},
+                                       ctx or self.context, do_raise=False)
+
+    def test_authorize_cached(self):
+        self.assertTrue(self._authorize())
+        with mock.patch.object(self.enforcer, 'enforce') as enforce:
+            self.assertTrue(self._authorize())
+            self.assertTrue(self._authorize(ctx=context.Context(
+                project_id='project', roles=['load-balancer_member'],
+                request_id='req-2', auth_token='token')))
+        enforce.assert_not_called()
+
+    def test_decisions_keyed_on_target_and_credentials(self):
+        self.assertTrue(self._authorize())
+        self.assertFalse(self._authorize(project_id='other'))
+        self.assertFalse(self._authorize(ctx=context.Context(
+            project_id='project', roles=['load-balancer_observer_typo'])))
+        self.assertRaises(exceptions.PolicyForbidden,
+                          self.enforcer.authorize, _ACTION,
+                          {'project_id': 'other'}, self.context)
+
+    def test_unregistered_action_not_cached(self):
+        for _ in range(2):
+            self.assertRaises(oslo_policy.PolicyNotRegistered,
+                              self.enforcer.authorize, 'unknown', {},
+                              self.context)
+
+    def test_policy_file_change_clears_decisions(self):
+        self.assertTrue(self._authorize())
+        self._write_policy('"{}": "!"'.format(_ACTION),
+                           mtime=os.path.getmtime(self.policy_file) + 10)
+        # The files are looked at once per _RULES_CHECK_INTERVAL.
+        self.assertTrue(self._authorize())
+        with mock.patch('time.monotonic',
+                        return_value=time.monotonic() + 2):
+            self.assertFalse(self._authorize())
+
+    def test_set_rules_clears_decisions(self):
+        self.assertTrue(self._authorize())
+        self.enforcer.set_rules(oslo_policy.Rules.from_dict(
+            {_ACTION: '!'}), overwrite=False)
+        self.assertFalse(self._authorize())
+
+    def test_decisions_expire(self):
+        now = [0]
+        self.enforcer._decisions = cachetools.TTLCache(
+            16, 60, timer=lambda: now[0])
+        self._authorize()
+        self.assertEqual(1, len(self.enforcer._decisions))
+        now[0] = 61
+        self.assertEqual(0, len(self.enforcer._decisions))
+
+    def test_cache_disabled(self):
+        self.conf.config(group='api_settings', policy_cache_size=0)
+        self.enforcer = policy.Policy(policy_file=self.policy_file)
+        self._authorize()
+        with mock.patch.object(self.enforcer, 'enforce',
+                               return_value=True) as enforce:
+            self.assertTrue(self._authorize())
+        enforce.assert_called_once()
+
+    def test_check_is_admin_cached(self):
+        admin = context.Context(project_id='project', roles=['admin'])
+        self.assertTrue(self.enforcer.check_is_admin(admin))
+        self.assertFalse(self.enforcer.check_is_admin(self.context))
+        with mock.patch.object(self.enforcer, 'enforce') as enforce:
+            self.assertTrue(self.enforcer.check_is_admin(context.Context(
+                project_id='project', roles=['admin'], request_id='req-3')))
+        enforce.assert_not_called()
+
+
+class TestAuthorizeMany(base.TestCase):
+
+    def setUp(self):
+        super(TestAuthorizeMany, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.conf(args=[], project='starfish')
+        self.conf.config(group='api_settings', policy_cache_size=0)
+        self.enforcer = policy.Policy(policy_file='policy.yaml')
+        self.context = context.Context(project_id='project',
+                                       roles=['load-balancer_member'])
+        self.targets = [{'project_id': 'project', 'id': i} for i in range(5)]
+        self.targets += [{'project_id': 'other', 'id': 5},
+                         {'project_id': 'project', 'owner': 'user', 'id': 6}]
+
+    def test_grouped(self):
+        with mock.patch.object(self.enforcer, 'authorize',
+                               wraps=self.enforcer.authorize) as authorize:
+            allowed = list(self.enforcer.authorize_many(
+                _ACTION, self.targets, self.context))
+        self.assertEqual([True] * 5 + [False, True], allowed)
+        self.assertEqual(
+            [mock.call(_ACTION, {'project_id': 'project'}, self.context,
+                       do_raise=False),
+             mock.call(_ACTION, {'project_id': 'other'}, self.context,
+                       do_raise=False),
+             mock.call(_ACTION, {'project_id': 'project', 'owner': 'user'},
+                       self.context, do_raise=False)],
+            authorize.call_args_list)
+
+    def test_admin(self):
+        admin = context.Context(project_id='project', roles=['admin'])
+        with mock.patch.object(self.enforcer, 'authorize') as authorize:
+            allowed = list(self.enforcer.authorize_many(
+                _ACTION, iter(self.targets), admin))
+        self.assertEqual([True] * 7, allowed)
+        authorize.assert_not_called()
@@ -0,0 +1,58 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+from unittest import mock
+
+from starfish.common import config  # noqa: F401
+from starfish.common import rpc
+import starfish.tests.unit.base as base
+
+
+class TestCastBatcher(base.TestCase):
+
+    def setUp(self):
+        super(TestCastBatcher, self).setUp()
+        self.client = mock.MagicMock()
+
+    def test_flush_on_size(self):
+        batcher = rpc.CastBatcher(self.client, 'do_many', max_size=2,
+                                  max_delay=60)
+        batcher.cast(a=1)
+        self.client.cast.assert_not_called()
+        batcher.cast(a=2)
+        batcher.cast(a=3)
+        self.client.cast.assert_called_once_with(
+            {}, 'do_many', items=[{'a': 1}, {'a': 2}])
+
+        batcher.flush()
+        self.client.cast.assert_called_with({}, 'do_many', items=[{'a': 3}])
+        batcher.flush()
+        self.assertEqual(2, self.client.cast.call_count)
+
+    def test_flush_on_delay(self):
+        sent = threading.Event()
+        self.client.cast.side_effect = lambda *args, **kwargs: sent.set()
+        batcher = rpc.CastBatcher(self.client, 'do_many', max_size=10,
+                                  max_delay=0.01)
+        batcher.cast(a=1)
+        batcher.cast(a=2)
+        self.assertTrue(sent.wait(5))
+        self.client.cast.assert_called_once_with(
+            {}, 'do_many', items=[{'a': 1}, {'a': 2}])
+
+    def test_no_delay(self):
+        batcher = rpc.CastBatcher(self.client, 'do_many', max_size=10,
+                                  max_delay=0)
+        batcher.cast(a=1)
+        self.client.cast.assert_called_once_with({}, 'do_many',
+                                                 items=[{'a': 1}])
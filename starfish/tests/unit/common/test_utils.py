@@ -0,0 +1,32 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from starfish.common import utils
+import starfish.tests.unit.base as base
+
+
+class TestLoadDriver(base.TestCase):
+
+    @mock.patch.object(utils, 'stevedore_driver')
+    def test_load_driver(self, mock_stevedore):
+        driver = utils.load_driver('starfish.amphora.drivers', 'rest')
+        self.assertIs(driver, utils.load_driver('starfish.amphora.drivers',
+                                                'rest'))
+        mock_stevedore.DriverManager.assert_called_once_with(
+            namespace='starfish.amphora.drivers', name='rest',
+            invoke_on_load=True)
+
+        utils.clear_drivers()
+        utils.load_driver('starfish.amphora.drivers', 'rest')
+        self.assertEqual(2, mock_stevedore.DriverManager.call_count)
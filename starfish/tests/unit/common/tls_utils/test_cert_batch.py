@@ -0,0 +1,105 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import pkcs7
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.common import exceptions
+from starfish.common.tls_utils import cert_batch
+from starfish.tests.unit.common.tls_utils import test_cert_parser
+import starfish.tests.unit.base as base
+
+
+def _burn_cpu(item):
+    while True:
+        sum(range(1000))
+
+
+class TestCertBatch(base.TestCase):
+
+    def setUp(self):
+        super(TestCertBatch, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.config(group='certificates', batch_workers=1,
+                         batch_process_threshold=100)
+        self.addCleanup(cert_batch.shutdown)
+        self.certs = [test_cert_parser._make_cert(
+            'cn{}.example.com'.format(i),
+            dns_names=['www{}.example.com'.format(i)]) for i in range(3)]
+        intermediates = [x509.load_pem_x509_certificate(cert)
+                         for cert in self.certs[1:]]
+        self.pkcs7 = pkcs7.serialize_certificates(
+            intermediates, serialization.Encoding.PEM)
+
+    def _use_processes(self):
+        self.conf.config(group='certificates', batch_process_threshold=2)
+
+    def _validate_many(self):
+        return list(cert_batch.validate_many([
+            {'certificate': self.certs[0],
+             'private_key': test_cert_parser._KEY_PEM,
+             'intermediates': b''.join(self.certs[1:])},
+            {'certificate': b'garbage'},
+            {'certificate': self.certs[1], 'intermediates': self.pkcs7}]))
+
+    def _assert_validated(self, results):
+        self.assertEqual([True, None, True],
+                         [result.value for result in results])
+        self.assertIsNone(results[0].error)
+        self.assertIsInstance(results[1].error, exceptions.UnreadableCert)
+
+    def test_validate_many_in_thread(self):
+        self._assert_validated(self._validate_many())
+        self.assertIsNone(cert_batch._EXECUTOR)
+
+    def test_validate_many_in_processes(self):
+        self._use_processes()
+        self._assert_validated(self._validate_many())
+        self.assertIsNotNone(cert_batch._EXECUTOR)
+
+    def test_parse_many(self):
+        self._use_processes()
+        results = list(cert_batch.parse_many(
+            [{'certificate': cert.decode('utf-8'),
+              'intermediates': self.pkcs7} for cert in self.certs]))
+        self.assertEqual(['cn0.example.com', 'cn1.example.com',
+                          'cn2.example.com'],
+                         [result.value.cn for result in results])
+        self.assertEqual(['www2.example.com'], results[2].value.dns_names)
+        self.assertEqual(test_cert_parser._EXPIRATION,
+                         results[0].value.expiration)
+        # A PKCS7 bundle is a set, its order is not preserved.
+        self.assertEqual(sorted(cert.strip() for cert in self.certs[1:]),
+                         sorted(results[0].value.intermediates))
+
+    def test_cpu_budget_in_processes(self):
+        self._use_processes()
+        self.conf.config(group='certificates', batch_cpu_budget=0.2)
+        results = list(cert_batch._map(_burn_cpu, [None, None]))
+        for result in results:
+            self.assertIsInstance(result.error,
+                                  exceptions.CertificateCPUBudgetExceeded)
+
+    def test_cpu_budget_in_thread(self):
+        self.conf.config(group='certificates', batch_cpu_budget=0.01)
+
+        def _slow(item):
+            sum(range(2000000))
+            return item
+
+        results = list(cert_batch._map(_slow, [1]))
+        self.assertIsNone(results[0].value)
+        self.assertIsInstance(results[0].error,
+                              exceptions.CertificateCPUBudgetExceeded)
@@ -0,0 +1,401 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import base64
+import datetime
+import io
+import mmap
+import random
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from cryptography import x509
+from cryptography.hazmat import backends
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509 import oid
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+import six
+
+from starfish.common import config  # noqa: F401
+from starfish.common import exceptions
+from starfish.common.tls_utils import cert_parser
+import starfish.tests.unit.base as base
+
+_KEY = rsa.generate_private_key(65537, 2048, backends.default_backend())
+_EXPIRATION = datetime.datetime(2030, 1, 1)
+_KEY_PEM = _KEY.private_bytes(serialization.Encoding.PEM,
+                              serialization.PrivateFormat.TraditionalOpenSSL,
+                              serialization.NoEncryption())
+
+
+def _make_cert(cn, dns_names=()):
+    name = x509.Name([x509.NameAttribute(oid.NameOID.COMMON_NAME, cn)])
+    builder = x509.CertificateBuilder().subject_name(name).issuer_name(
+        name).public_key(_KEY.public_key()).serial_number(
+        x509.random_serial_number()).not_valid_before(
+        datetime.datetime(2020, 1, 1)).not_valid_after(_EXPIRATION)
+    if dns_names:
+        builder = builder.add_extension(x509.SubjectAlternativeName(
+            [x509.DNSName(dns_name) for dns_name in dns_names]),
+            critical=False)
+    cert = builder.sign(_KEY, hashes.SHA256(), backends.default_backend())
+    return cert.public_bytes(serialization.Encoding.PEM)
+
+
+def _make_key_pem(passphrase):
+    return _KEY.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.BestAvailableEncryption(passphrase))
+
+
+class TestParsedCertCache(base.TestCase):
+
+    def setUp(self):
+        super(TestParsedCertCache, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        cert_parser.reset_parsed_cert_cache()
+        self.addCleanup(cert_parser.reset_parsed_cert_cache)
+        self.cert = _make_cert(u'Www.Example.com', [u'example.com'])
+
+    def test_get_host_names(self):
+        for _ in range(2):
+            host_names = cert_parser.get_host_names(self.cert)
+            self.assertEqual({'cn': 'www.example.com',
+                              'dns_names': ['example.com']}, host_names)
+            host_names['dns_names'].append('mutated')
+        self.assertEqual('www.example.com',
+                         cert_parser.get_primary_cn(self.cert.decode()))
+        self.assertEqual(_EXPIRATION,
+                         cert_parser.get_cert_expiration(self.cert))
+        stats = cert_parser.get_parsed_cert_cache().stats()
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(3, stats['hits'])
+        self.assertEqual(0.75, stats['hit_rate'])
+
+    def test_eviction(self):
+        self.conf.config(group='certificates', parsed_cert_cache_size=1)
+        other = _make_cert(u'other.example.com')
+        cert_parser.get_host_names(self.cert)
+        cert_parser.get_host_names(other)
+        cert_parser.get_host_names(self.cert)
+        stats = cert_parser.get_parsed_cert_cache().stats()
+        self.assertEqual(3, stats['misses'])
+        self.assertEqual(2, stats['evictions'])
+        self.assertEqual(1, stats['entries'])
+
+    def test_disabled(self):
+        self.conf.config(group='certificates', parsed_cert_cache_size=0)
+        self.assertEqual('www.example.com',
+                         cert_parser.get_primary_cn(self.cert))
+        self.assertIsNone(cert_parser.get_parsed_cert_cache())
+
+    def test_unreadable_cert_not_cached(self):
+        for _ in range(2):
+            self.assertRaises(exceptions.UnreadableCert,
+                              cert_parser.get_host_names, b'garbage')
+        self.assertEqual(0, cert_parser.get_parsed_cert_cache().stats()[
+            'entries'])
+
+    def _map_cert(self, key_pem):
+        cert = mock.Mock()
+        cert.get_certificate.return_value = self.cert
+        cert.get_private_key.return_value = key_pem
+        cert.get_private_key_passphrase.return_value = u'secret'
+        cert.get_intermediates.return_value = None
+        return cert_parser._map_cert_tls_container(cert)
+
+    def test_private_keys_not_cached_by_default(self):
+        key_pem = _make_key_pem(b'secret')
+        with mock.patch.object(cert_parser, 'prepare_private_key',
+                               wraps=cert_parser.prepare_private_key) as p:
+            first = self._map_cert(key_pem)
+            second = self._map_cert(key_pem)
+        self.assertEqual(2, p.call_count)
+        self.assertEqual(first.private_key, second.private_key)
+        self.assertEqual('www.example.com', second.primary_cn)
+        self.assertEqual(1, cert_parser.get_parsed_cert_cache().stats()[
+            'entries'])
+
+    def test_private_keys_cached(self):
+        self.conf.config(group='certificates', cache_private_keys=True)
+        key_pem = _make_key_pem(b'secret')
+        with mock.patch.object(cert_parser, 'prepare_private_key',
+                               wraps=cert_parser.prepare_private_key) as p:
+            first = self._map_cert(key_pem)
+            second = self._map_cert(key_pem)
+        p.assert_called_once_with(key_pem, b'secret')
+        self.assertEqual(first.private_key, second.private_key)
+        self.assertIn(b'BEGIN RSA PRIVATE KEY', second.private_key)
+
+
+class _FakeCertManager(object):
+    """Returns the certificate of each ref after a delay.
+
+    With wait_for, the retrievals are held until that many of them are in
+    flight at once.
+    """
+
+    def __init__(self, certs, latency=0.0, failing=(), wait_for=None):
+        self.certs = certs
+        self.latency = latency
+        self.failing = failing
+        self.wait_for = wait_for
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._gate = threading.Event()
+
+    def get_cert(self, context, ref, check_only=False):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.wait_for and self.in_flight >= self.wait_for:
+                self._gate.set()
+        try:
+            if self.wait_for:
+                self._gate.wait(5)
+            time.sleep(self.latency)
+            if ref in self.failing:
+                raise Exception('{} not found'.format(ref))
+            cert = mock.Mock()
+            cert.get_certificate.return_value = self.certs[ref]
+            cert.get_private_key.return_value = _KEY_PEM
+            cert.get_private_key_passphrase.return_value = None
+            cert.get_intermediates.return_value = None
+            return cert
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class TestLoadCertificatesData(base.TestCase):
+
+    def setUp(self):
+        super(TestLoadCertificatesData, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.config(group='certificates', cert_fetch_concurrency=4)
+        cert_parser.reset_parsed_cert_cache()
+        executor_patch = mock.patch.object(cert_parser, '_FETCH_EXECUTOR',
+                                           None)
+        executor_patch.start()
+        self.addCleanup(executor_patch.stop)
+        self.addCleanup(self._shutdown_executor)
+        self.certs = {'ref{}'.format(i): _make_cert('cn{}.example.com'.format(
+            i)) for i in range(9)}
+        self.listener = mock.Mock(
+            project_id='project', tls_certificate_id='ref0',
+            sni_containers=[mock.Mock(tls_container_id='ref{}'.format(i))
+                            for i in range(8, 0, -1)])
+
+    @staticmethod
+    def _shutdown_executor():
+        if cert_parser._FETCH_EXECUTOR is not None:
+            cert_parser._FETCH_EXECUTOR.shutdown(wait=True)
+
+    def test_load_concurrently_in_order(self):
+        cert_mngr = _FakeCertManager(self.certs, wait_for=4)
+        result = cert_parser.load_certificates_data(cert_mngr, self.listener)
+
+        self.assertEqual('cn0.example.com', result['tls_cert'].primary_cn)
+        self.assertEqual(['cn{}.example.com'.format(i)
+                          for i in range(8, 0, -1)],
+                         [cert.primary_cn for cert in result['sni_certs']])
+        self.assertEqual({'ref{}'.format(i): _EXPIRATION for i in range(9)},
+                         result['expirations'])
+        # The first 4 retrievals were only released once all of them were
+        # in flight.
+        self.assertEqual(4, cert_mngr.max_in_flight)
+
+    def test_no_certificates(self):
+        self.listener.tls_certificate_id = None
+        self.listener.sni_containers = []
+        self.assertEqual(
+            {'tls_cert': None, 'sni_certs': [], 'expirations': {}},
+            cert_parser.load_certificates_data(_FakeCertManager({}),
+                                               self.listener))
+
+    def test_failing_ref(self):
+        cert_mngr = _FakeCertManager(self.certs, failing=('ref2', 'ref5'))
+        e = self.assertRaises(exceptions.CertificateRetrievalException,
+                              cert_parser.load_certificates_data, cert_mngr,
+                              self.listener)
+        # The first failing one in the order of the listener.
+        self.assertIn('ref5', str(e))
+
+    def test_timeout(self):
+        self.conf.config(group='certificates', cert_fetch_timeout=1)
+        cert_mngr = _FakeCertManager(self.certs, latency=2)
+        self.listener.sni_containers = []
+        with mock.patch.object(cert_parser.LOG, 'warning') as warning:
+            e = self.assertRaises(exceptions.CertificateRetrievalException,
+                                  cert_parser.load_certificates_data,
+                                  cert_mngr, self.listener)
+        self.assertIn('ref0', str(e))
+        warning.assert_called_once_with(
+            'Unable to retrieve certificate: %s due to %s.', 'ref0',
+            'TimeoutError')
+
+
+def _legacy_split_x509s(xstr):
+    # cert_parser._split_x509s before the block scanner.
+    curr_pem_block = []
+    inside_x509 = False
+    if type(xstr) == six.binary_type:
+        xstr = xstr.decode('utf-8')
+    for line in xstr.replace("\r", "").split("\n"):
+        if inside_x509:
+            curr_pem_block.append(line)
+            if line == cert_parser.X509_END.decode('utf-8'):
+                yield six.b("\n".join(curr_pem_block))
+                curr_pem_block = []
+                inside_x509 = False
+            continue
+        if line == cert_parser.X509_BEG.decode('utf-8'):
+            curr_pem_block.append(line)
+            inside_x509 = True
+
+
+def _legacy_read_pem_blocks(data):
+    # cert_parser._read_pem_blocks before the block scanner.
+    stSpam, stHam, stDump = 0, 1, 2
+    startMarkers = {cert_parser.PKCS7_BEG.decode('utf-8'): 0}
+    stopMarkers = {cert_parser.PKCS7_END.decode('utf-8'): 0}
+    idx = -1
+    state = stSpam
+    if type(data) == six.binary_type:
+        data = data.decode('utf-8')
+    for certLine in data.replace('\r', '').split('\n'):
+        if not certLine:
+            continue
+        certLine = certLine.strip()
+        if state == stSpam:
+            if certLine in startMarkers:
+                certLines = []
+                idx = startMarkers[certLine]
+                state = stHam
+                continue
+        if state == stHam:
+            if certLine in stopMarkers and stopMarkers[certLine] == idx:
+                state = stDump
+            else:
+                certLines.append(certLine)
+        if state == stDump:
+            yield b''.join([base64.b64decode(x) for x in certLines])
+            state = stSpam
+
+
+class TestPemBlockScanner(base.TestCase):
+    """The scanner finds the blocks the line based parsers found.
+
+    Random documents mix blocks of both kinds, truncated and nested ones,
+    markers with surrounding spaces, blank lines, garbage and both line
+    endings. Documents the former parsers rejected are skipped.
+    """
+
+    def _make_line(self, rnd):
+        choice = rnd.random()
+        if choice < 0.1:
+            return ''
+        if choice < 0.2:
+            return rnd.choice([cert_parser.X509_BEG, cert_parser.X509_END,
+                               cert_parser.PKCS7_BEG,
+                               cert_parser.PKCS7_END]).decode('utf-8')[
+                rnd.randrange(3):]
+        if choice < 0.3:
+            return ''.join(rnd.choice('-ABC=+/ \t') for _ in range(
+                rnd.randrange(30)))
+        return base64.b64encode(bytes(
+            rnd.randrange(256) for _ in range(3 * rnd.randrange(1, 20)))
+        ).decode('ascii')
+
+    def _make_block(self, rnd):
+        begin, end = rnd.choice([
+            (cert_parser.X509_BEG, cert_parser.X509_END),
+            (cert_parser.PKCS7_BEG, cert_parser.PKCS7_END)])
+        data = bytes(rnd.randrange(256) for _ in range(rnd.randrange(200)))
+        width = rnd.choice([4, 64, 76])
+        if rnd.random() < 0.2:
+            # Each line encoded on its own, padded in the middle of the body.
+            lines = [base64.b64encode(data[i:i + width]).decode('ascii')
+                     for i in range(0, len(data), width)]
+        else:
+            body = base64.b64encode(data)
+            lines = [body[i:i + width].decode('ascii')
+                     for i in range(0, len(body), width)]
+        if rnd.random() < 0.3:
+            lines = [rnd.choice(['', ' ', '\t']) + line +
+                     rnd.choice(['', ' ']) for line in lines]
+        pad = rnd.choice(['', '', '', ' ', '\t '])
+        lines.insert(0, pad + begin.decode('utf-8') + pad)
+        if rnd.random() < 0.9:
+            lines.append(rnd.choice(['', '', ' ']) + end.decode('utf-8'))
+        return lines
+
+    def _make_document(self, rnd):
+        lines = []
+        for _ in range(rnd.randrange(8)):
+            if rnd.random() < 0.5:
+                lines.extend(self._make_block(rnd))
+            else:
+                lines.append(self._make_line(rnd))
+        newline = rnd.choice(['\n', '\r\n'])
+        return (newline.join(lines) + rnd.choice(['', newline])).encode(
+            'utf-8')
+
+    def _assert_same_blocks(self, legacy, scanner, document):
+        try:
+            expected = list(legacy(document))
+        except Exception:
+            return False
+        self.assertEqual(expected, list(scanner(document)), document)
+        self.assertEqual(expected, list(scanner(document.decode('utf-8'))))
+        self.assertEqual(expected, list(scanner(io.BytesIO(document))))
+        self.assertEqual(expected,
+                         list(scanner(io.StringIO(document.decode('utf-8')))))
+        return True
+
+    def test_fuzz(self):
+        rnd = random.Random(1234)
+        compared = 0
+        # Small chunks, so that markers and blocks straddle them.
+        with mock.patch.object(cert_parser, '_PEM_CHUNK_SIZE', 7):
+            for _ in range(1000):
+                document = self._make_document(rnd)
+                compared += self._assert_same_blocks(
+                    _legacy_split_x509s, cert_parser._split_x509s, document)
+                compared += self._assert_same_blocks(
+                    _legacy_read_pem_blocks, cert_parser._read_pem_blocks,
+                    document)
+        self.assertGreater(compared, 1500)
+
+    def test_padded_lines(self):
+        document = b'\n'.join([cert_parser.PKCS7_BEG, b'QQ==', b' Qg== ',
+                               b'Q0Q=', cert_parser.PKCS7_END])
+        self.assertEqual([b'ABCD'],
+                         list(cert_parser._read_pem_blocks(document)))
+        self.assertEqual(list(_legacy_read_pem_blocks(document)),
+                         list(cert_parser._read_pem_blocks(document)))
+
+    def test_mmap(self):
+        certs = [_make_cert('cn{}.example.com'.format(i)) for i in range(3)]
+        with tempfile.TemporaryFile() as f:
+            f.write(b'\n'.join(certs))
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                self.assertEqual([cert.strip() for cert in certs],
+                                 list(cert_parser._split_x509s(m)))
@@ -0,0 +1,146 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import datetime
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.common import config  # noqa: F401
+from starfish.common import data_models
+from starfish.controller.housekeeping import house_keeping
+import starfish.tests.unit.base as base
+
+
+class TestDatabaseCleanup(base.TestCase):
+
+    def setUp(self):
+        super(TestDatabaseCleanup, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.config(group='house_keeping', cleanup_batch_size=2,
+                         cleanup_batch_interval=0, amphora_expiry_age=60,
+                         load_balancer_expiry_age=120)
+        patcher = mock.patch.object(house_keeping.db_api, 'get_session')
+        self.get_session = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db_cleanup = house_keeping.DatabaseCleanup()
+        self.amphora_repo = mock.Mock()
+        self.db_cleanup.repositories = mock.Mock(
+            spec=['amphora'], amphora=self.amphora_repo)
+
+    def test_cleanup(self):
+        self.amphora_repo.purge_deleted_expiring.side_effect = [
+            (2, 'id2'), (1, 'id4'), (0, None)]
+        self.assertEqual(3, self.db_cleanup.cleanup())
+        session = self.get_session.return_value
+        age = datetime.timedelta(seconds=60)
+        self.assertEqual(
+            [mock.call(session, age, 2, after_id=None),
+             mock.call(session, age, 2, after_id='id2'),
+             mock.call(session, age, 2, after_id='id4')],
+            self.amphora_repo.purge_deleted_expiring.call_args_list)
+        # A completed purge starts over the next time.
+        self.assertEqual({}, self.db_cleanup.watermarks)
+
+    def test_cleanup_resumes_from_watermark(self):
+        def _purge(session, exp_age, batch_size, after_id=None):
+            self.db_cleanup.exit_event.set()
+            return 2, 'id2'
+
+        self.amphora_repo.purge_deleted_expiring.side_effect = _purge
+        self.assertEqual(2, self.db_cleanup.cleanup())
+        self.assertEqual({'amphora': 'id2'}, self.db_cleanup.watermarks)
+
+        self.db_cleanup.exit_event.clear()
+        self.amphora_repo.purge_deleted_expiring.side_effect = [(0, None)]
+        self.db_cleanup.cleanup()
+        self.amphora_repo.purge_deleted_expiring.assert_called_with(
+            mock.ANY, mock.ANY, 2, after_id='id2')
+
+
+class TestCertRotation(base.TestCase):
+
+    def setUp(self):
+        super(TestCertRotation, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.config(group='house_keeping', cert_rotate_threads=3)
+        self.cert_rotate = house_keeping.CertRotation()
+        self.repo = mock.Mock()
+        self.cert_rotate.cert_expiry_repo = self.repo
+        self.certs = [data_models.CertificateExpiry(
+            id='id{}'.format(i), project_id='project',
+            cert_ref='ref{}'.format(i)) for i in range(5)]
+        self.expires_before = datetime.datetime(2026, 1, 15)
+        for target, name in ((house_keeping.db_api, 'get_session'),
+                             (house_keeping.utils, 'load_driver')):
+            patcher = mock.patch.object(target, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.cert_manager = self.load_driver.return_value
+
+    @mock.patch('concurrent.futures.ThreadPoolExecutor')
+    def test_rotate(self, executor_cls):
+        self.repo.claim_expiring.return_value = self.certs
+        executor = executor_cls.return_value.__enter__.return_value
+        done = futures.Future()
+        done.set_result(None)
+        executor.submit.return_value = done
+
+        self.assertEqual(5, self.cert_rotate.rotate())
+
+        executor_cls.assert_called_once_with(max_workers=3)
+        self.assertEqual(
+            [mock.call(self.cert_rotate.rotate_cert, cert, mock.ANY)
+             for cert in self.certs], executor.submit.call_args_list)
+
+    @mock.patch.object(house_keeping, 'LOG')
+    def test_rotate_release_failure_logged(self, mock_log):
+        self.conf.config(group='house_keeping', cert_rotate_threads=1)
+        self.repo.claim_expiring.return_value = self.certs[:2]
+        failure = Exception('database unavailable')
+        with mock.patch.object(self.cert_rotate, 'rotate_cert',
+                               side_effect=[failure, None]):
+            self.assertEqual(2, self.cert_rotate.rotate())
+        mock_log.error.assert_called_once_with(
+            mock.ANY, 'ref0', exc_info=failure)
+
+    def test_rotate_nothing_expiring(self):
+        self.repo.claim_expiring.return_value = []
+        self.assertEqual(0, self.cert_rotate.rotate())
+
+    @mock.patch('starfish.common.tls_utils.cert_parser.get_cert_expiration')
+    def test_rotate_cert(self, get_cert_expiration):
+        renewed = datetime.datetime(2027, 1, 1)
+        get_cert_expiration.return_value = renewed
+
+        self.cert_rotate.rotate_cert(self.certs[0], self.expires_before)
+
+        self.cert_manager.get_cert.assert_called_once_with(
+            mock.ANY, 'ref0', check_only=True)
+        get_cert_expiration.assert_called_once_with(
+            self.cert_manager.get_cert.return_value.get_certificate
+            .return_value)
+        self.repo.release.assert_called_once_with(
+            self.get_session.return_value, 'id0', renewed)
+
+    def test_rotate_cert_failure_kept(self):
+        self.cert_manager.get_cert.side_effect = Exception('unavailable')
+        self.cert_rotate.rotate_cert(self.certs[0], self.expires_before)
+        self.repo.release.assert_not_called()
+
+    @mock.patch('starfish.common.tls_utils.cert_parser.get_cert_expiration')
+    def test_rotate_cert_not_renewed_kept(self, get_cert_expiration):
+        get_cert_expiration.return_value = datetime.datetime(2026, 1, 2)
+        self.cert_rotate.rotate_cert(self.certs[0], self.expires_before)
+        self.repo.release.assert_not_called()
@@ -0,0 +1,106 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+from unittest import mock
+
+import oslo_messaging as messaging
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+
+from starfish.common import config  # noqa: F401
+from starfish.common import constants
+from starfish.common import rpc
+from starfish.controller.queue.v1 import endpoints
+from starfish.controller.worker.v1 import controller_worker
+from starfish.frame_api.driver import provider
+import starfish.tests.unit.base as base
+
+
+class TestEndpoints(base.TestCase):
+
+    def setUp(self):
+        super(TestEndpoints, self).setUp()
+        mock.patch.object(controller_worker, 'ControllerWorker').start()
+        self.ep = endpoints.Endpoints()
+        self.context = {}
+
+    def test_get_agent_info(self):
+        self.ep.get_agent_info(self.context, [{'ip': '192.0.2.1'}])
+        self.ep.worker.get_agent_info.assert_called_once_with(
+            [{'ip': '192.0.2.1'}])
+
+    def test_get_agent_info_batch(self):
+        self.ep.get_agent_info_batch(
+            self.context, [{}, {'agent_targets': [{'ip': '192.0.2.1'}]}])
+        self.ep.worker.get_agent_info_many.assert_called_once_with(
+            [None, [{'ip': '192.0.2.1'}]])
+
+
+class TestControllerWorkerBatch(base.TestCase):
+
+    def test_get_agent_info_many(self):
+        conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        conf.config(group='controller_worker',
+                    agent_endpoints=['192.0.2.1:9443'])
+        worker = controller_worker.ControllerWorker()
+        one = {'ip': '192.0.2.1', 'port': '9443'}
+        two = {'ip': '192.0.2.2', 'port': 9443}
+        with mock.patch.object(worker, 'get_agent_info') as get_agent_info:
+            get_agent_info.side_effect = lambda targets: [
+                dict(target, info=target['ip']) for target in targets]
+            infos = worker.get_agent_info_many([None, [two, one], [two]])
+
+        get_agent_info.assert_called_once_with([one, two])
+        self.assertEqual(
+            [['192.0.2.1'], ['192.0.2.2', '192.0.2.1'], ['192.0.2.2']],
+            [[info['info'] for info in result] for result in infos])
+
+
+class TestAgentInfoCoalescing(base.TestRpc):
+
+    def setUp(self):
+        super(TestAgentInfoCoalescing, self).setUp()
+        conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        conf.config(group='oslo_messaging', cast_batch_size=4,
+                    cast_batch_interval=60)
+        mock.patch.object(controller_worker, 'ControllerWorker').start()
+        self.addCleanup(mock.patch.stopall)
+
+        self.endpoint = endpoints.Endpoints()
+        self.batches = []
+        self.handled = threading.Semaphore(0)
+
+        def _get_agent_info_many(agent_target_lists):
+            self.batches.append(agent_target_lists)
+            self.handled.release()
+        self.endpoint.worker.get_agent_info_many.side_effect = (
+            _get_agent_info_many)
+
+        server = rpc.get_server(
+            messaging.Target(topic=constants.TOPIC_AMPHORA_V2,
+                             server='consumer'),
+            [self.endpoint])
+        server.start()
+        self.addCleanup(server.wait)
+        self.addCleanup(server.stop)
+
+    def test_casts_are_coalesced(self):
+        driver = provider.TestProviderDriver()
+        for _ in range(10):
+            driver.get_agent_test_info()
+        driver._agent_info_batcher.flush()
+
+        for _ in range(3):
+            self.assertTrue(self.handled.acquire(timeout=5))
+        self.assertEqual([4, 4, 2], [len(batch) for batch in self.batches])
+        self.endpoint.worker.get_agent_info.assert_not_called()
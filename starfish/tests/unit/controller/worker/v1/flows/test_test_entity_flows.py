@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+from unittest import mock
+
+from oslo_config import cfg
+from oslo_config import fixture as oslo_fixture
+from taskflow.patterns import linear_flow
+
+from starfish.amphorae.driver_exceptions import exceptions as driver_except
+from starfish.common import base_taskflow
+from starfish.common import config  # noqa: F401
+from starfish.common import constants
+from starfish.common import utils
+from starfish.controller.worker.v1.flows import test_entity_flows
+import starfish.tests.unit.base as base
+
+
+class _FakeDriver(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def get_version_info(self, bind_ip_port, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        if bind_ip_port['port'] == 'down':
+            raise driver_except.TimeOutException()
+        return {'api_version': '1.0'}
+
+
+class TestTestEntityFlows(base.TestCase):
+
+    def setUp(self):
+        super(TestTestEntityFlows, self).setUp()
+        self.conf = self.useFixture(oslo_fixture.Config(cfg.CONF))
+        self.conf.config(group='task_flow', engine='parallel', max_workers=4)
+        self.driver = _FakeDriver()
+        mock_driver = mock.patch.object(utils, 'stevedore_driver').start()
+        mock_driver.DriverManager.return_value.driver = self.driver
+        self.te_flows = test_entity_flows.TestEntityFlows()
+
+    def _targets(self, count, down=()):
+        return [{'ip': '192.0.2.{}'.format(i),
+                 'port': 'down' if i in down else '9443'}
+                for i in range(count)]
+
+    def test_get_backend_info_flow(self):
+        flow = self.te_flows.get_backend_info_flow(3)
+
+        self.assertIsInstance(flow, linear_flow.Flow)
+        self.assertIn(constants.AGENT_INFOS, flow.provides)
+        self.assertEqual({'agent_target-0', 'agent_target-1',
+                          'agent_target-2'}, set(flow.requires))
+        self.assertEqual(2, len(flow))
+
+    def test_get_backend_info_flow_run(self):
+        targets = self._targets(12, down=(3, 7))
+        engine = base_taskflow.BaseTaskFlowEngine()
+        self.addCleanup(engine.executor.shutdown)
+        flow = engine._taskflow_load(
+            self.te_flows.get_backend_info_flow(len(targets)),
+            store=self.te_flows.get_backend_info_store(targets))
+        flow.run()
+
+        infos = flow.storage.fetch(constants.AGENT_INFOS)
+        self.assertEqual([t['ip'] for t in targets], [i['ip'] for i in infos])
+        self.assertEqual(
+            [3, 7], [i for i, info in enumerate(infos) if info['error']])
+        self.assertEqual({'api_version': '1.0'}, infos[0]['info'])
+        self.assertEqual(4, self.driver.peak)
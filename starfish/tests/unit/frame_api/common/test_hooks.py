@@ -0,0 +1,80 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from starfish.common import context
+from starfish.db import api as db_api
+from starfish.frame_api.common import hooks
+from starfish.tests.unit import base
+
+
+class TestDBSessionHook(base.TestCase):
+
+    def setUp(self):
+        super(TestDBSessionHook, self).setUp()
+        self.get_session = mock.patch.object(db_api, 'get_session').start()
+        self.session = self.get_session.return_value
+        self.hook = hooks.DBSessionHook()
+
+    def _state(self, method, status_int=200, app_iter=None,
+               use_session=True):
+        ctx = context.Context()
+        if use_session:
+            self.assertIs(self.session, ctx.session)
+        state = mock.MagicMock()
+        state.request.method = method
+        state.request.context = {'octavia_context': ctx}
+        state.response.status_int = status_int
+        state.response.app_iter = [b''] if app_iter is None else app_iter
+        return state
+
+    def test_write_committed(self):
+        self.hook.after(self._state('POST', 201))
+        self.get_session.assert_called_once_with(autocommit=False)
+        self.session.commit.assert_called_once_with()
+        self.session.rollback.assert_not_called()
+        self.session.close.assert_called_once_with()
+
+    def test_failed_write_rolled_back(self):
+        self.hook.after(self._state('PUT', 409))
+        self.session.commit.assert_not_called()
+        self.session.rollback.assert_called_once_with()
+        self.session.close.assert_called_once_with()
+
+    def test_read_not_committed(self):
+        self.hook.after(self._state('GET'))
+        self.session.commit.assert_not_called()
+        self.session.close.assert_called_once_with()
+
+    def test_error_rolled_back_once(self):
+        state = self._state('POST')
+        self.hook.on_error(state, Exception())
+        self.hook.after(state)
+        self.session.rollback.assert_called_once_with()
+        self.session.commit.assert_not_called()
+        self.session.close.assert_called_once_with()
+
+    def test_unused_session(self):
+        self.hook.after(self._state('POST', use_session=False))
+        self.get_session.assert_not_called()
+
+    def test_stream_closed_after_body(self):
+        state = self._state('GET', app_iter=iter([b'a\n', b'b\n']))
+        self.hook.after(state)
+        self.session.close.assert_not_called()
+
+        body = state.response.app_iter
+        self.assertEqual([b'a\n', b'b\n'], list(body))
+        self.session.close.assert_not_called()
+        body.close()
+        self.session.close.assert_called_once_with()
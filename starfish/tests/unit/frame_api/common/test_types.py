@@ -0,0 +1,101 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from wsme import types as wtypes
+
+from starfish.common import data_models
+from starfish.frame_api.common import types
+from starfish.tests.unit import base
+
+
+class _MappedType(types.BaseType):
+    _type_to_model_map = {'admin_state_up': 'enabled',
+                          'vip_address': 'vip.ip_address'}
+    _child_map = {}
+    id = wtypes.wsattr(wtypes.StringType())
+    name = wtypes.wsattr(wtypes.StringType())
+    description = wtypes.wsattr(wtypes.StringType())
+    admin_state_up = wtypes.wsattr(bool)
+    vip_ip_address = wtypes.wsattr(wtypes.StringType())
+
+
+class _FakeDataModel(object):
+    def __init__(self, **values):
+        self.values = values
+
+    def to_dict(self):
+        return dict(self.values)
+
+
+class TestConversionPlan(base.TestCase):
+
+    def test_plan(self):
+        plan = _MappedType._conversion_plan
+        self.assertEqual((('enabled', 'admin_state_up'),), plan.renames)
+        self.assertEqual((('vip', 'ip_address', 'vip_ip_address'),),
+                         plan.flattened)
+        self.assertEqual(('admin_state_up', 'description', 'id', 'name',
+                          'vip_ip_address'), plan.attributes)
+
+    def test_from_data_model(self):
+        result = _MappedType.from_data_model(_FakeDataModel(
+            id='1', name=None, description='d', enabled=True,
+            vip={'ip_address': '192.0.2.1'}, unknown='x'))
+        self.assertEqual('1', result.id)
+        self.assertEqual('', result.name)
+        self.assertEqual('d', result.description)
+        self.assertTrue(result.admin_state_up)
+        self.assertEqual('192.0.2.1', result.vip_ip_address)
+        self.assertEqual({'id': '1', 'name': '', 'description': 'd',
+                          'enabled': True, 'vip_ip_address': '192.0.2.1'},
+                         result.to_dict())
+
+    def test_unmapped_type(self):
+        self.assertFalse(types.PageType._conversion_plan.mapped)
+        page = types.PageType.from_data_model(_FakeDataModel(
+            href='http://localhost', rel='next'))
+        self.assertEqual('next', page.rel)
+
+    def test_from_data_models(self):
+        entities = [data_models.TestEntity(id=str(i), name=None,
+                                           manage_ip='192.0.2.{}'.format(i))
+                    for i in range(3)]
+
+        class _Custom(_MappedType):
+            @classmethod
+            def from_data_model(cls, data_model, children=False):
+                result = super(_Custom, cls).from_data_model(data_model)
+                result.description = 'custom'
+                return result
+
+        for to_type, description in ((_MappedType, wtypes.Unset),
+                                     (_Custom, 'custom')):
+            results = to_type.from_data_models(entities)
+            self.assertEqual(['0', '1', '2'], [r.id for r in results])
+            self.assertEqual([''] * 3, [r.name for r in results])
+            self.assertEqual([description] * 3,
+                             [r.description for r in results])
+
+    def test_from_data_models_fields(self):
+        entities = [_FakeDataModel(id='1', name='n', description='d',
+                                   enabled=True)]
+        result = _MappedType.from_data_models(
+            entities, fields=['id', 'admin_state_up'])[0]
+        self.assertEqual('1', result.id)
+        self.assertTrue(result.admin_state_up)
+        self.assertEqual(wtypes.Unset, result.name)
+        self.assertEqual(wtypes.Unset, result.description)
+
+    def test_translate_keys_to_data_model(self):
+        self.assertEqual(['id', 'enabled', 'vip'],
+                         _MappedType.translate_keys_to_data_model(
+                             ['id', 'admin_state_up', 'vip_address']))
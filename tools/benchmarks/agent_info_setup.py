@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the latency from a get_agent_info RPC to its first task start.
+
+The 'rebuild' mode reproduces the former per-request setup: the flow is
+built and its engine loaded, compiled and prepared for every call, and
+every task looks its amphora driver up through stevedore. The 'cached'
+mode is the current ControllerWorker.get_agent_info, which reuses loaded
+engines and the process-wide driver registry. The agents are not
+contacted; GetVersionInfo returns as soon as it starts.
+
+The amphora driver entry point must be installed (pip install -e .).
+
+Usage: python -m tools.benchmarks.agent_info_setup [--agents 50]
+                                                   [--calls 200]
+"""
+
+import argparse
+import statistics
+import time
+from unittest import mock
+
+from oslo_config import cfg
+from stevedore import driver as stevedore_driver
+
+from starfish.common import config  # noqa: F401
+from starfish.common import constants
+from starfish.common import utils
+from starfish.controller.queue.v1 import endpoints
+from starfish.controller.worker.v1.tasks import amphora_driver_tasks
+
+
+def _uncached_load_driver(namespace, name):
+    return stevedore_driver.DriverManager(
+        namespace=namespace, name=name, invoke_on_load=True).driver
+
+
+def _rebuild_get_agent_info(worker, agent_targets):
+    te_flows = worker._te_flows
+    with mock.patch.object(utils, 'load_driver', _uncached_load_driver):
+        get_info_tf = worker._taskflow_load(
+            te_flows.get_backend_info_flow(len(agent_targets)),
+            store=te_flows.get_backend_info_store(agent_targets))
+    get_info_tf.run()
+    return get_info_tf.storage.fetch(constants.AGENT_INFOS)
+
+
+def _measure(call, calls):
+    first_start = []
+
+    def _execute(task_self, agent_target):
+        if not first_start:
+            first_start.append(time.perf_counter())
+        return {'ip': agent_target['ip'], 'port': agent_target['port'],
+                'info': None, 'error': None}
+
+    latencies = []
+    with mock.patch.object(amphora_driver_tasks.GetVersionInfo, 'execute',
+                           _execute):
+        for _ in range(calls):
+            del first_start[:]
+            start = time.perf_counter()
+            call()
+            latencies.append(first_start[0] - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--agents', type=int, default=50)
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+
+    cfg.CONF([], project='starfish')
+    agent_targets = [{'ip': '192.0.2.{}'.format(i % 250), 'port': '9443'}
+                     for i in range(args.agents)]
+    endpoint = endpoints.Endpoints()
+    worker = endpoint.worker
+
+    print('agents: {}, calls: {}'.format(args.agents, args.calls))
+    for mode, call in (
+            ('rebuild', lambda: _rebuild_get_agent_info(worker,
+                                                        agent_targets)),
+            ('cached', lambda: endpoint.get_agent_info({}, agent_targets))):
+        latencies = _measure(call, args.calls)
+        print('{:>8}: median {:.2f} ms, p95 {:.2f} ms, max {:.2f} ms'.format(
+            mode, statistics.median(latencies) * 1000,
+            sorted(latencies)[int(len(latencies) * 0.95)] * 1000,
+            max(latencies) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the requests/sec of starfish-api on GET /v1/testentities.
+
+For each worker count, starfish-api is started on a fresh port against a
+sqlite database of --rows test entities. Once it answers, --clients
+threads, each with its own keep-alive connection, send GET requests for
+--duration seconds. The throughput and latency percentiles are reported.
+
+Usage: python -m tools.benchmarks.api_throughput [--workers 1,4,16]
+           [--threads 4] [--clients 32] [--duration 10] [--rows 100]
+"""
+
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+
+from starfish.common import config  # noqa: F401
+from starfish.db import api as db_api
+from starfish.db import base_models
+from starfish.db import models
+
+HOST = '127.0.0.1'
+PATH = '/v1/testentities'
+
+
+def _load_rows(workdir, rows):
+    connection = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    cfg.CONF([], project='starfish')
+    cfg.CONF.set_override('connection', connection, group='database')
+    engine = db_api.get_engine()
+    base_models.BASE.metadata.create_all(engine)
+    now = timeutils.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.TestEntity.__table__.insert(), [
+            {'id': uuidutils.generate_uuid(), 'name': 'entity-{}'.format(i),
+             'manage_ip': '10.0.{}.{}'.format(i // 256 % 256, i % 256),
+             'created_at': now} for i in range(rows)])
+    return connection
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _start_api(workdir, connection, workers, threads):
+    port = _free_port()
+    conf_file = os.path.join(workdir, 'api-{}.conf'.format(workers))
+    with open(conf_file, 'w') as f:
+        f.write('[DEFAULT]\n'
+                'use_stderr = false\n'
+                'log_file = {log}\n'
+                '[database]\nconnection = {connection}\n'
+                '[api_settings]\nbind_host = {host}\nbind_port = {port}\n'
+                'workers = {workers}\nthreads = {threads}\n'
+                'pagination_cursor_key = bench\n'.format(
+                    log=os.path.join(workdir, 'api.log'),
+                    connection=connection, host=HOST, port=port,
+                    workers=workers, threads=threads))
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'starfish.cmd.api', '--config-file',
+         conf_file], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=1)
+            conn.request('GET', PATH)
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError('starfish-api did not start, see {}'.format(
+        os.path.join(workdir, 'api.log')))
+
+
+def _client(port, stop_at, latencies, errors):
+    conn = http.client.HTTPConnection(HOST, port, timeout=30)
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', PATH)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(e)
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def _load(port, clients, duration):
+    latencies = []
+    errors = []
+    stop_at = time.monotonic() + duration
+    threads = [threading.Thread(target=_client,
+                                args=(port, stop_at, latencies, errors))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', default='1,4,16',
+                        help='comma separated API worker counts')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    connection = _load_rows(workdir, args.rows)
+
+    print('{:>8} {:>8} {:>10} {:>12} {:>12} {:>8}'.format(
+        'workers', 'threads', 'req/s', 'median (ms)', 'p99 (ms)', 'errors'))
+    for workers in [int(w) for w in args.workers.split(',')]:
+        proc, port = _start_api(workdir, connection, workers, args.threads)
+        try:
+            latencies, errors = _load(port, args.clients, args.duration)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+        latencies.sort()
+        print('{:>8} {:>8} {:>10.1f} {:>12.2f} {:>12.2f} {:>8}'.format(
+            workers, args.threads, len(latencies) / args.duration,
+            statistics.median(latencies) * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000, len(errors)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the throughput of cert_batch.validate_many and parse_many.
+
+Certificates are generated with their private key and a chain of two
+intermediates, given as PEM to half of them and as a PKCS7 bundle to the
+other half. Each batch is processed in the calling 'thread' and in the
+batch 'processes'. While a batch runs, another thread wakes up every
+millisecond, as an API worker thread would; the longest delay it sees is
+how long the API would be frozen.
+
+Usage: python -m tools.benchmarks.cert_batch [--certs 1000] [--workers N]
+"""
+
+import argparse
+import datetime
+import threading
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import pkcs7
+from cryptography.x509 import oid
+from oslo_config import cfg
+
+from starfish.common import config  # noqa: F401
+from starfish.common.tls_utils import cert_batch
+
+
+def _make_cert(cn, key, issuer_cert=None, issuer_key=None):
+    name = x509.Name([x509.NameAttribute(oid.NameOID.COMMON_NAME, cn)])
+    builder = x509.CertificateBuilder().subject_name(name).issuer_name(
+        issuer_cert.subject if issuer_cert else name).public_key(
+        key.public_key()).serial_number(
+        x509.random_serial_number()).not_valid_before(
+        datetime.datetime(2020, 1, 1)).not_valid_after(
+        datetime.datetime(2030, 1, 1)).add_extension(
+        x509.SubjectAlternativeName([x509.DNSName(cn)]), critical=False)
+    return builder.sign(issuer_key or key, hashes.SHA256())
+
+
+def _make_certificates(count):
+    root_key = ec.generate_private_key(ec.SECP256R1())
+    root = _make_cert('root.example.com', root_key)
+    inter_key = ec.generate_private_key(ec.SECP256R1())
+    inter = _make_cert('intermediate.example.com', inter_key, root,
+                       root_key)
+    pem_chain = b''.join(cert.public_bytes(serialization.Encoding.PEM)
+                         for cert in (inter, root))
+    pkcs7_chain = pkcs7.serialize_certificates([inter, root],
+                                               serialization.Encoding.PEM)
+    certificates = []
+    for i in range(count):
+        key = ec.generate_private_key(ec.SECP256R1())
+        cert = _make_cert('www{}.example.com'.format(i), key, inter,
+                          inter_key)
+        certificates.append({
+            'certificate': cert.public_bytes(serialization.Encoding.PEM),
+            'private_key': key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption()),
+            'intermediates': pkcs7_chain if i % 2 else pem_chain})
+    return certificates
+
+
+def _measure(func, certificates):
+    stalls = []
+    done = threading.Event()
+
+    def _tick():
+        while not done.is_set():
+            start = time.perf_counter()
+            time.sleep(0.001)
+            stalls.append(time.perf_counter() - start)
+
+    ticker = threading.Thread(target=_tick)
+    ticker.start()
+    start = time.perf_counter()
+    errors = sum(1 for result in func(certificates) if result.error)
+    elapsed = time.perf_counter() - start
+    done.set()
+    ticker.join()
+    return elapsed, max(stalls), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--certs', type=int, default=1000)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    cfg.CONF([], project='starfish')
+    cfg.CONF.set_override('batch_workers', args.workers,
+                          group='certificates')
+    certificates = _make_certificates(args.certs)
+    parse_items = [{'certificate': item['certificate'],
+                    'intermediates': item['intermediates']}
+                   for item in certificates]
+
+    # Start the processes before measuring.
+    cfg.CONF.set_override('batch_process_threshold', 1,
+                          group='certificates')
+    list(cert_batch.parse_many(parse_items[:1]))
+
+    print('{:>9} {:>10} {:>10} {:>12} {:>7}'.format(
+        'operation', 'mode', 'certs/s', 'max stall ms', 'errors'))
+    for mode, threshold in (('thread', args.certs + 1), ('processes', 1)):
+        cfg.CONF.set_override('batch_process_threshold', threshold,
+                              group='certificates')
+        for name, func, items in (
+                ('validate', cert_batch.validate_many, certificates),
+                ('parse', cert_batch.parse_many, parse_items)):
+            elapsed, stall, errors = _measure(func, items)
+            print('{:>9} {:>10} {:>10.0f} {:>12.1f} {:>7}'.format(
+                name, mode, len(items) / elapsed, stall * 1000, errors))
+    cert_batch.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the cost of polling the test entity read endpoints.
+
+A page of GET /v1/testentities and one GET /v1/testentities/{id} are
+polled straight through the WSGI app in four modes: 'plain' requests,
+'etag' requests revalidated with If-None-Match (answered 304 after a
+lookup of the index columns), and the same two with the 'memory' response
+cache enabled. The mean time per request and the number of SQL statements
+per request are reported.
+
+Usage: python -m tools.benchmarks.conditional_get [--rows 1000]
+                                                  [--limit 100]
+                                                  [--polls 500]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import sqlalchemy as sa
+from oslo_config import cfg
+from webob import request as webob_request
+
+from starfish.common import cache
+from starfish.db import api as db_api
+from tools.benchmarks import list_streaming
+
+
+def _poll(app, path, etag, polls, statements):
+    headers = {'If-None-Match': etag} if etag else {}
+    environ = webob_request.Request.blank(path, headers=headers).environ
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(status_line[:3])
+
+    del statements[:]
+    start = time.perf_counter()
+    for _ in range(polls):
+        body = app(dict(environ), start_response)
+        for _ in body:
+            pass
+        if hasattr(body, 'close'):
+            body.close()
+    elapsed = time.perf_counter() - start
+    return elapsed / polls, len(statements) / polls, status[-1]
+
+
+def _get_etag(app, path):
+    response = webob_request.Request.blank(path).get_response(app)
+    assert response.status_int == 200, response.status
+    return response.etag, response.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--polls', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    cfg.CONF([], project='starfish')
+    cfg.CONF.set_override(
+        'connection', 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+        group='database')
+    list_streaming._load_rows(args.rows)
+    app = list_streaming._make_app()
+
+    statements = []
+    sa.event.listen(db_api.get_engine(), 'before_cursor_execute',
+                    lambda *args: statements.append(args[2]))
+
+    list_path = '/v1/testentities?limit={}'.format(args.limit)
+    _, page = _get_etag(app, list_path)
+    one_path = '/v1/testentities/' + page['testentities'][0]['id']
+
+    print('{:>6} {:>8} {:>8} {:>6} {:>10} {:>10}'.format(
+        'path', 'cache', 'mode', 'status', 'ms/req', 'sql/req'))
+    for backend in (None, cache.MEMORY_BACKEND):
+        cfg.CONF.set_override('response_cache_backend', backend,
+                              group='api_settings')
+        cache.reset_response_cache()
+        for name, path in (('list', list_path), ('one', one_path)):
+            etag, _ = _get_etag(app, path)
+            for mode, sent_etag in (('plain', None), ('etag', etag)):
+                per_request, sql, status = _poll(
+                    app, path, sent_etag, args.polls, statements)
+                print('{:>6} {:>8} {:>8} {:>6} {:>10.3f} {:>10.1f}'.format(
+                    name, backend or 'none', mode, status,
+                    per_request * 1000, sql))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the compiled data model converter with the reflective one.
+
+Usage: python -m tools.benchmarks.data_model_conversion [--rows 10000]
+"""
+
+import argparse
+import time
+
+import sqlalchemy as sa
+from oslo_utils import uuidutils
+from sqlalchemy import orm
+from sqlalchemy.orm import collections
+
+from starfish.db import base_models
+from starfish.db import models
+
+
+def reflective_to_data_model(obj, _graph_nodes=None):
+    """The dir()/getattr() based conversion the converter replaced."""
+    _graph_nodes = _graph_nodes or {}
+    dm_kwargs = {}
+    for column in obj.__table__.columns:
+        dm_kwargs[column.name] = getattr(obj, column.name)
+    attr_names = [attr_name for attr_name in dir(obj)
+                  if not attr_name.startswith('_')]
+    dm_self = obj.__data_model__(**dm_kwargs)
+    _graph_nodes.update({obj._get_unique_key(dm_self): dm_self})
+    for attr_name in attr_names:
+        attr = getattr(obj, attr_name)
+        if isinstance(attr, base_models.OctaviaBase):
+            ukey = obj._get_unique_key(attr)
+            if ukey in _graph_nodes.keys():
+                setattr(dm_self, attr_name, _graph_nodes[ukey])
+            else:
+                setattr(dm_self, attr_name, reflective_to_data_model(
+                    attr, _graph_nodes=_graph_nodes))
+        elif isinstance(attr, (collections.InstrumentedList, list)):
+            setattr(dm_self, attr_name, [])
+            listref = getattr(dm_self, attr_name)
+            for item in attr:
+                if isinstance(item, base_models.OctaviaBase):
+                    ukey = obj._get_unique_key(item)
+                    if ukey in _graph_nodes.keys():
+                        listref.append(_graph_nodes[ukey])
+                    else:
+                        listref.append(reflective_to_data_model(
+                            item, _graph_nodes=_graph_nodes))
+                else:
+                    listref.append(item)
+    return dm_self
+
+
+def _load_rows(rows):
+    engine = sa.create_engine('sqlite://')
+    base_models.BASE.metadata.create_all(engine)
+    session = orm.sessionmaker(bind=engine)()
+    session.bulk_insert_mappings(models.TestEntity, [
+        {'id': uuidutils.generate_uuid(),
+         'name': 'entity-{}'.format(i),
+         'manage_ip': '10.0.{}.{}'.format(i // 256 % 256, i % 256)}
+        for i in range(rows)])
+    session.commit()
+    return session.query(models.TestEntity).all()
+
+
+def _time(func, model_list, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for model in model_list:
+            func(model)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    model_list = _load_rows(args.rows)
+    reflective = _time(reflective_to_data_model, model_list, args.repeat)
+    compiled = _time(lambda m: m.to_data_model(), model_list, args.repeat)
+    print('rows: {}'.format(args.rows))
+    print('reflective to_data_model: {:.3f}s'.format(reflective))
+    print('compiled to_data_model:   {:.3f}s'.format(compiled))
+    print('speedup: {:.1f}x'.format(reflective / compiled))
+
+
+if __name__ == '__main__':
+    main()
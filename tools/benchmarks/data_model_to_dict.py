@@ -0,0 +1,144 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the slotted data models with the former __dict__ based ones.
+
+For --count objects of each flavour, the python heap taken by the list
+(tracemalloc), the time to convert the list with to_dict() and the time
+to compare it element-wise with an equal copy are reported.
+
+Usage: python -m tools.benchmarks.data_model_to_dict [--count 50000]
+"""
+
+import argparse
+import datetime
+import time
+import tracemalloc
+
+from starfish.common import data_models
+
+
+class LegacyTestEntity(object):
+    """TestEntity with the __dict__ based to_dict the slots replaced."""
+
+    def __init__(self, id=None, name=None, manage_ip=None,
+                 created_at=None, updated_at=None):
+        self.id = id
+        self.name = name
+        self.manage_ip = manage_ip
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    def to_dict(self, calling_classes=None, recurse=False, **kwargs):
+        calling_classes = calling_classes or []
+        ret = {}
+        for attr in self.__dict__:
+            if attr.startswith('_') or not kwargs.get(attr, True):
+                continue
+            value = self.__dict__[attr]
+            if attr == 'tags':
+                ret[attr] = value
+                continue
+            if recurse:
+                if isinstance(getattr(self, attr), list):
+                    ret[attr] = []
+                    for item in value:
+                        if isinstance(item, LegacyTestEntity):
+                            if type(self) not in calling_classes:
+                                ret[attr].append(
+                                    item.to_dict(calling_classes=(
+                                        calling_classes + [type(self)]),
+                                        recurse=recurse))
+                            else:
+                                ret[attr] = None
+                                break
+                        else:
+                            ret[attr].append(item)
+                elif isinstance(getattr(self, attr), LegacyTestEntity):
+                    if type(self) not in calling_classes:
+                        ret[attr] = value.to_dict(
+                            calling_classes=calling_classes + [type(self)],
+                            recurse=recurse)
+                    else:
+                        ret[attr] = None
+                else:
+                    ret[attr] = value
+            else:
+                if isinstance(getattr(self, attr), LegacyTestEntity):
+                    ret[attr] = None
+                elif isinstance(getattr(self, attr), list):
+                    ret[attr] = []
+                else:
+                    ret[attr] = value
+        return ret
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self.to_dict() == other.to_dict()
+        return False
+
+
+def _build(cls, count):
+    now = datetime.datetime(2020, 2, 26)
+    return [cls(id='{:032x}'.format(i), name='entity-{}'.format(i),
+                manage_ip='10.0.{}.{}'.format(i // 256 % 256, i % 256),
+                created_at=now, updated_at=now) for i in range(count)]
+
+
+def _measure(cls, count, rounds):
+    tracemalloc.start()
+    objects = _build(cls, count)
+    with_objects = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The strings are shared with the copy, only the objects differ.
+    copies = [cls(id=o.id, name=o.name, manage_ip=o.manage_ip,
+                  created_at=o.created_at, updated_at=o.updated_at)
+              for o in objects]
+    strings = sum(len(o.id) + len(o.name) + len(o.manage_ip) + 3 * 49
+                  for o in objects)
+
+    to_dict = []
+    eq = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        [o.to_dict() for o in objects]
+        to_dict.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        assert all(a == b for a, b in zip(objects, copies))
+        eq.append(time.perf_counter() - start)
+    return (with_objects - strings) / count, min(to_dict), min(eq)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=50000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{} objects, best of {} rounds'.format(args.count, args.rounds))
+    print('{:>8} {:>18} {:>14} {:>14}'.format(
+        'models', 'bytes/object', 'to_dict (ms)', '__eq__ (ms)'))
+    results = {}
+    for label, cls in (('legacy', LegacyTestEntity),
+                       ('slotted', data_models.TestEntity)):
+        results[label] = _measure(cls, args.count, args.rounds)
+        per_object, to_dict, eq = results[label]
+        print('{:>8} {:>18.0f} {:>14.1f} {:>14.1f}'.format(
+            label, per_object, to_dict * 1000, eq * 1000))
+    legacy, slotted = results['legacy'], results['slotted']
+    print('{:>8} {:>17.1f}x {:>13.1f}x {:>13.1f}x'.format(
+        'gain', legacy[0] / slotted[0], legacy[1] / slotted[1],
+        legacy[2] / slotted[2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the size and the CPU cost of the heartbeat encodings.
+
+Heartbeats of amphorae with 1 to 64 listeners, UUIDs and realistic
+counters, are signed and encoded as json, binary and compressed binary,
+then checked and decoded as a health manager would.
+
+Usage: python -m tools.benchmarks.heartbeat_encoding [--repeat 2000]
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from starfish.amphorae.backends.health_daemon import status_message
+
+_KEY = 'benchmark-key'
+_ENCODINGS = (('json', status_message.ENCODING_JSON, True),
+              ('binary', status_message.ENCODING_BINARY, False),
+              ('binary+zlib', status_message.ENCODING_BINARY, True))
+
+
+def _heartbeat(listeners, rnd):
+    return {
+        'id': str(uuid.UUID(int=rnd.getrandbits(128))), 'seq': 123456,
+        'ver': 1,
+        'listeners': {
+            str(uuid.UUID(int=rnd.getrandbits(128))): {
+                'status': 'OPEN',
+                'stats': {'rx': rnd.randrange(10 ** 12),
+                          'tx': rnd.randrange(10 ** 12),
+                          'conns': rnd.randrange(10 ** 4),
+                          'totconns': rnd.randrange(10 ** 9),
+                          'ereq': rnd.randrange(10 ** 3)}}
+            for _ in range(listeners)}}
+
+
+def _time(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    print('{:>9} {:>12} {:>8} {:>11} {:>11}'.format(
+        'listeners', 'encoding', 'bytes', 'encode us', 'decode us'))
+    for listeners in (1, 4, 16, 64):
+        heartbeat = _heartbeat(listeners, rnd)
+        for name, encoding, compress in _ENCODINGS:
+            envelope = status_message.wrap_envelope(
+                heartbeat, _KEY, encoding=encoding, compress=compress)
+            decoded = status_message.unwrap_envelope(envelope, _KEY)
+            assert decoded['listeners'] == heartbeat['listeners']
+            encode = _time(lambda: status_message.wrap_envelope(
+                heartbeat, _KEY, encoding=encoding, compress=compress),
+                args.repeat)
+            decode = _time(lambda: status_message.unwrap_envelope(
+                envelope, _KEY), args.repeat)
+            print('{:>9} {:>12} {:>8} {:>11.1f} {:>11.1f}'.format(
+                listeners, name, len(envelope), encode, decode))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Drive the health manager with a steady rate of UDP heartbeats.
+
+A sender process signs and sends the heartbeats of --amphorae amphorae,
+each with --listeners listeners, at --rate heartbeats per second, round
+robin. Without --target, a health manager receiver is started in this
+process on an ephemeral port with a temporary SQLite database, and the
+numbers of heartbeats received, of batches and of rows written are
+reported against what was sent.
+
+Usage: python -m tools.benchmarks.heartbeat_load [--rate 10000]
+           [--amphorae 5000] [--listeners 2] [--duration 10]
+           [--encoding json|binary] [--target HOST:PORT --key KEY]
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from oslo_config import cfg
+import sqlalchemy as sa
+
+from starfish.amphorae.backends.health_daemon import status_message
+from starfish.common import config  # noqa: F401
+from starfish.db import api as db_api
+from starfish.db import base_models
+from starfish.db import models
+
+_KEY = 'benchmark-key'
+
+
+def _heartbeat(amphora, seq, listeners):
+    return {
+        'id': 'amphora-{:08d}'.format(amphora), 'seq': seq, 'ver': 1,
+        'listeners': {
+            'listener-{:08d}-{}'.format(amphora, i): {
+                'status': 'OPEN',
+                'stats': {'rx': seq * 1000, 'tx': seq * 2000, 'conns': 3,
+                          'totconns': seq * 10, 'ereq': 0}}
+            for i in range(listeners)}}
+
+
+def _send(address, key, encoding, rate, amphorae, listeners, duration,
+          results):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    now = start
+    while now < deadline:
+        # Catch up with the rate in bursts, then yield the CPU for a
+        # millisecond.
+        due = int((now - start) * rate)
+        while sent < due:
+            sock.sendto(status_message.wrap_envelope(
+                _heartbeat(sent % amphorae, sent // amphorae, listeners),
+                key, encoding=encoding, compress=False), address)
+            sent += 1
+        time.sleep(0.001)
+        now = time.perf_counter()
+    results.put((sent, time.perf_counter() - start))
+
+
+def _serialize_sqlite_writes(engine):
+    # The health and statistics writers run concurrently; SQLite fails
+    # transactions that read and then write concurrently instead of making
+    # them wait, unless they lock the database from the start. The BEGIN
+    # that oslo.db emits is replaced by a BEGIN IMMEDIATE.
+    for listener in list(engine.dispatch.begin):
+        sa.event.remove(engine, 'begin', listener)
+
+    @sa.event.listens_for(engine, 'begin')
+    def _begin(connection):
+        if 'in_transaction' not in connection.info:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.info['in_transaction'] = True
+
+
+def _count_rows(session, model_class):
+    return session.query(model_class).count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rate', type=int, default=10000)
+    parser.add_argument('--amphorae', type=int, default=5000)
+    parser.add_argument('--listeners', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--target')
+    parser.add_argument('--key', default=_KEY)
+    parser.add_argument('--encoding', default=status_message.ENCODING_JSON,
+                        choices=[status_message.ENCODING_JSON,
+                                 status_message.ENCODING_BINARY])
+    args = parser.parse_args()
+
+    if args.target:
+        host, port = args.target.rsplit(':', 1)
+        address = (host, int(port))
+        getter = None
+    else:
+        # Import late, the receiver is only needed without --target.
+        from starfish.amphorae.drivers.health import heartbeat_udp
+
+        db_dir = tempfile.mkdtemp()
+        db_file = os.path.join(db_dir, 'health.db')
+        cfg.CONF([], project='starfish')
+        cfg.CONF.set_override('connection', 'sqlite:///' + db_file,
+                              group='database')
+        cfg.CONF.set_override('heartbeat_key', args.key,
+                              group='health_manager')
+        cfg.CONF.set_override('bind_port', 0, group='health_manager')
+        cfg.CONF.set_override('sock_rlimit', 4 * 1024 * 1024,
+                              group='health_manager')
+        _serialize_sqlite_writes(db_api.get_engine())
+        base_models.BASE.metadata.create_all(db_api.get_engine())
+        getter = heartbeat_udp.UDPStatusGetter()
+        address = getter.sockaddr
+        exit_event = threading.Event()
+        receiver = threading.Thread(target=getter.run, args=(exit_event,))
+        receiver.start()
+
+    results = multiprocessing.get_context('spawn').Queue()
+    sender = multiprocessing.get_context('spawn').Process(
+        target=_send, args=(address, args.key, args.encoding, args.rate,
+                            args.amphorae, args.listeners, args.duration,
+                            results))
+    sender.start()
+    sent, elapsed = results.get()
+    sender.join()
+
+    print('sent        {:>10} {:>10.0f}/s'.format(sent, sent / elapsed))
+    if getter is None:
+        return
+    # Let the receiver catch up and write its last batch.
+    time.sleep(cfg.CONF.health_manager.heartbeat_flush_interval)
+    exit_event.set()
+    receiver.join()
+    session = db_api.get_session()
+    print('received    {:>10} {:>10.0f}/s'.format(
+        getter.received, getter.received / elapsed))
+    print('dropped     {:>10}'.format(sent - getter.received))
+    print('flushes     {:>10}'.format(getter.flushes))
+    for name, writer, model_class in (
+            ('health', getter.health_writer, models.AmphoraHealth),
+            ('stats', getter.stats_writer, models.ListenerStatistics)):
+        print('{:<11} {:>10} rows in {} batches, {} in the table'.format(
+            name, writer.rows, writer.batches,
+            _count_rows(session, model_class)))
+    os.remove(db_file)
+    os.rmdir(db_dir)
+
+
+if __name__ == '__main__':
+    main()
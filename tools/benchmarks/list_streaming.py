@@ -0,0 +1,127 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare buffered and NDJSON streamed listings of the test entities.
+
+For each table size, GET /v1/testentities is sent straight to the WSGI app
+once as a regular JSON listing and once with ?stream=true. The body is
+consumed and dropped chunk by chunk; the time to the first body chunk, the
+total time and the peak python heap (tracemalloc) are reported.
+
+Usage: python -m tools.benchmarks.list_streaming [--rows 1000,100000,1000000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pecan
+import sqlalchemy as sa
+from oslo_config import cfg
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from webob import request as webob_request
+
+from starfish.common import config  # noqa: F401
+from starfish.db import api as db_api
+from starfish.db import base_models
+from starfish.db import models
+from starfish.frame_api import config as app_config
+
+
+def _load_rows(rows):
+    engine = db_api.get_engine()
+    base_models.BASE.metadata.drop_all(engine)
+    base_models.BASE.metadata.create_all(engine)
+    now = timeutils.utcnow()
+    table = models.TestEntity.__table__
+    with engine.begin() as conn:
+        for start in range(0, rows, 10000):
+            conn.execute(table.insert(), [
+                {'id': uuidutils.generate_uuid(),
+                 'name': 'entity-{}'.format(i),
+                 'manage_ip': '10.{}.{}.{}'.format(
+                     i // 65536 % 256, i // 256 % 256, i % 256),
+                 'created_at': now}
+                for i in range(start, min(start + 10000, rows))])
+
+
+def _make_app():
+    pc = pecan.configuration.conf_from_file(app_config.__file__)
+    return pecan.make_app(pc.app.root, hooks=pc.app.hooks, wsme=pc.wsme,
+                          debug=False)
+
+
+def _request(app, query):
+    environ = webob_request.Request.blank(
+        '/v1/testentities?' + query).environ
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(status_line)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    body = app(environ, start_response)
+    try:
+        for chunk in body:
+            if chunk and first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(chunk)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert status[0].startswith('200'), status[0]
+    return first_byte, total, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', default='1000,100000,1000000',
+                        help='comma separated table sizes')
+    parser.add_argument('--skip-buffered-above', type=int, default=None,
+                        help='only stream tables larger than this')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    cfg.CONF([], project='starfish')
+    cfg.CONF.set_override(
+        'connection', 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+        group='database')
+    cfg.CONF.set_override('pagination_max_limit', 'infinite',
+                          group='api_settings')
+    app = _make_app()
+
+    print('{:>9} {:>9} {:>10} {:>10} {:>12} {:>12}'.format(
+        'rows', 'mode', 'ttfb (s)', 'total (s)', 'peak (MiB)', 'body (MiB)'))
+    for rows in [int(r) for r in args.rows.split(',')]:
+        _load_rows(rows)
+        modes = [('stream', 'stream=true')]
+        if (args.skip_buffered_above is None or
+                rows <= args.skip_buffered_above):
+            modes.insert(0, ('buffered', ''))
+        for mode, query in modes:
+            first_byte, total, peak, size = _request(app, query)
+            print('{:>9} {:>9} {:>10.3f} {:>10.3f} {:>12.1f} {:>12.1f}'
+                  .format(rows, mode, first_byte, total,
+                          peak / 2 ** 20, size / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
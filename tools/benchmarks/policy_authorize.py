@@ -0,0 +1,100 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the throughput of Policy.authorize and Policy.check_is_admin.
+
+Requests are drawn from a few hundred credential shapes (a project and a
+set of roles), each with its own request id and token as real requests
+have, against the read and write actions of the load balancers, on
+objects of their own project or of another one. Every run is made with
+the policy decision cache disabled and enabled.
+
+Usage: python -m tools.benchmarks.policy_authorize [--shapes 300]
+                                                   [--calls 100000]
+"""
+
+import argparse
+import random
+import time
+
+from oslo_config import cfg
+
+from starfish.common import config  # noqa: F401
+from starfish.common import constants
+from starfish.common import context
+from starfish.common import exceptions
+from starfish.common import policy
+
+_ROLES = (['load-balancer_member'], ['load-balancer_observer'],
+          ['load-balancer_global_observer'], ['member', 'reader'],
+          ['load-balancer_admin'])
+_ACTIONS = ['{}{}'.format(constants.RBAC_LOADBALANCER, action) for action in
+            (constants.RBAC_GET_ONE, constants.RBAC_GET_ALL,
+             constants.RBAC_PUT, constants.RBAC_DELETE)]
+
+
+def _make_requests(shapes, calls):
+    rnd = random.Random(0)
+    credentials = [('project{}'.format(i % (shapes // len(_ROLES) or 1)),
+                    _ROLES[i % len(_ROLES)]) for i in range(shapes)]
+    requests = []
+    for i in range(calls):
+        project_id, roles = rnd.choice(credentials)
+        ctx = context.Context(project_id=project_id, roles=roles,
+                              request_id='req-{}'.format(i),
+                              auth_token='token-{}'.format(i))
+        target = {'project_id': project_id if rnd.random() < 0.9
+                  else 'project-other'}
+        requests.append((rnd.choice(_ACTIONS), target, ctx))
+    return requests
+
+
+def _run(enforcer, requests):
+    start = time.perf_counter()
+    allowed = 0
+    for action, target, ctx in requests:
+        try:
+            enforcer.authorize(action, target, ctx)
+            allowed += 1
+        except exceptions.PolicyForbidden:
+            pass
+    authorize = time.perf_counter() - start
+    start = time.perf_counter()
+    for _, _, ctx in requests:
+        enforcer.check_is_admin(ctx)
+    check_is_admin = time.perf_counter() - start
+    return authorize, check_is_admin, allowed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--shapes', type=int, default=300)
+    parser.add_argument('--calls', type=int, default=100000)
+    args = parser.parse_args()
+
+    cfg.CONF([], project='starfish')
+    requests = _make_requests(args.shapes, args.calls)
+
+    print('{:>8} {:>14} {:>20} {:>8}'.format(
+        'cache', 'authorize/s', 'check_is_admin/s', 'allowed'))
+    for size in (0, cfg.CONF.api_settings.policy_cache_size):
+        cfg.CONF.set_override('policy_cache_size', size,
+                              group='api_settings')
+        enforcer = policy.Policy()
+        authorize, check_is_admin, allowed = _run(enforcer, requests)
+        print('{:>8} {:>14.0f} {:>20.0f} {:>8}'.format(
+            'on' if size else 'off', len(requests) / authorize,
+            len(requests) / check_is_admin, allowed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the WSME conversion plans with the former per-object conversion.
+
+--count test entity data models are converted to TestEntityResponse and
+serialized as a TestEntitiesRootResponse, once with the map inversion and
+deepcopy the plans replaced and once with from_data_models.
+
+Usage: python -m tools.benchmarks.wsme_conversion [--count 10000]
+"""
+
+import argparse
+import copy
+import datetime
+import time
+
+from wsme.rest import json as wsme_json
+
+from starfish.common import data_models
+from starfish.frame_api.v1.types import test_entity as te_types
+
+
+def legacy_from_data_model(cls, data_model):
+    """The conversion done on every object before the plans."""
+    dm_to_type_map = {value: key
+                      for key, value in cls._type_to_model_map.items()}
+    type_dict = data_model.to_dict()
+    new_dict = copy.deepcopy(type_dict)
+    for key, value in type_dict.items():
+        if isinstance(value, dict):
+            for child_key, child_value in value.items():
+                if '.'.join([key, child_key]) in dm_to_type_map:
+                    new_dict['_'.join([key, child_key])] = child_value
+        elif key in ['name', 'description'] and value is None:
+            new_dict[key] = ''
+        else:
+            if key in dm_to_type_map:
+                new_dict[dm_to_type_map[key]] = value
+                del new_dict[key]
+    return cls(**new_dict)
+
+
+def _build(count):
+    now = datetime.datetime(2020, 2, 26)
+    return [data_models.TestEntity(
+        id='6f3c1c2e-0b7e-4f0e-9b8a-{:012d}'.format(i),
+        name='entity-{}'.format(i),
+        manage_ip='10.0.{}.{}'.format(i // 256 % 256, i % 256),
+        created_at=now, updated_at=now) for i in range(count)]
+
+
+def _measure(convert, entities, rounds):
+    conversions = []
+    totals = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        converted = convert(entities)
+        conversions.append(time.perf_counter() - start)
+        wsme_json.tojson(te_types.TestEntitiesRootResponse,
+                         te_types.TestEntitiesRootResponse(
+                             testentities=converted,
+                             testentities_links=[]))
+        totals.append(time.perf_counter() - start)
+    return min(conversions), min(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    entities = _build(args.count)
+    to_type = te_types.TestEntityResponse
+    print('{} entities, best of {} rounds'.format(args.count, args.rounds))
+    print('{:>8} {:>16} {:>20}'.format('mode', 'convert (ms)',
+                                       'convert+json (ms)'))
+    for mode, convert in (
+            ('legacy', lambda dms: [legacy_from_data_model(to_type, dm)
+                                    for dm in dms]),
+            ('plan', to_type.from_data_models)):
+        conversion, total = _measure(convert, entities, args.rounds)
+        print('{:>8} {:>16.1f} {:>20.1f}'.format(mode, conversion * 1000,
+                                                  total * 1000))
+
+
+if __name__ == '__main__':
+    main()